@@ -0,0 +1,66 @@
+"""Browser startup time and per-page latency, default vs fast profile, against the local fixture server.
+
+    python -m benchmarks.bench_browser --pages 20 --latency 0.02
+
+Needs Chrome and a matching chromedriver on the PATH.
+"""
+import argparse
+import statistics
+import time
+
+from selenium.webdriver.common.by import By
+
+from driver_pool import DriverPool, start_driver
+from fixture_server import FixtureServer
+
+
+def measure(url, fast, pages):
+    start = time.perf_counter()
+    driver = start_driver(fast=fast)
+    startup = time.perf_counter() - start
+    try:
+        latencies = []
+        for _ in range(pages):
+            start = time.perf_counter()
+            driver.get(url)
+            driver.find_element(By.XPATH, "//table[@id='gvInmate']")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        driver.quit()
+    return startup, latencies
+
+
+def measure_pool(fast, scrapers):
+    """Time `scrapers` successive driver checkouts from a one-driver pool."""
+    with DriverPool(size=1, fast=fast) as pool:
+        start = time.perf_counter()
+        for _ in range(scrapers):
+            pool.release(pool.acquire())
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20, help="page loads per profile")
+    parser.add_argument("--scrapers", type=int, default=5, help="driver checkouts for the pool comparison")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fixture response")
+    args = parser.parse_args()
+
+    with FixtureServer(latency=args.latency) as server:
+        for fast in (False, True):
+            startup, latencies = measure(server.url, fast, args.pages)
+            latencies.sort()
+            label = "fast" if fast else "default"
+            print(f"{label:8} startup {startup:6.2f}s  "
+                  f"page p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+                  f"p90 {latencies[int(len(latencies) * 0.9) - 1] * 1000:7.1f}ms")
+
+        for fast in (False, True):
+            label = "fast" if fast else "default"
+            cold = sum(measure(server.url, fast, 0)[0] for _ in range(args.scrapers))
+            warm = measure_pool(fast, args.scrapers)
+            print(f"{label:8} {args.scrapers} scrapers: {cold:6.2f}s cold starts, {warm:6.2f}s from a DriverPool")
+
+
+if __name__ == "__main__":
+    main()
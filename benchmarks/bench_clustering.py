@@ -0,0 +1,78 @@
+"""The clustering notebook's exact Ward clustering vs clustering.ward_clusters as the inmate count grows.
+
+    python -m benchmarks.bench_clustering --sizes 2000 5000 10000 50000 100000 --clusters 500
+
+Builds synthetic inmates' features (see bench_features), then for each size
+times the notebook's path (scipy linkage for the dendrogram plus
+AgglomerativeClustering, both O(n^2) memory; skipped above --exact-max) and
+ward_clusters with k-means and BIRCH pre-clustering, and prints seconds,
+peak traced memory and, where the exact run exists, how each approximate
+clustering compares with it: the adjusted Rand index of the two partitions
+and the ratio of their within-cluster sums of squares (Ward's objective).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.bench_features import synthetic_inmate
+from clustering import impute_mean, ward_clusters
+from feature_store import FEATURES, inmate_features
+
+
+def measured(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+
+def within_ss(X, labels):
+    _, labels = np.unique(labels, return_inverse=True)
+    sizes = np.bincount(labels)[:, None]
+    means = np.stack([np.bincount(labels, weights=column) for column in X.T], axis=1) / sizes
+    return ((X - means[labels]) ** 2).sum()
+
+
+def notebook(X, n_clusters):
+    linkage(X, method="ward")
+    return AgglomerativeClustering(n_clusters=n_clusters, linkage="ward").fit_predict(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 5000, 10000, 50000, 100000])
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--exact-max", type=int, default=10000, help="largest size the exact clustering runs at")
+    parser.add_argument("--birch-threshold", type=float, default=4.0)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    features = np.stack([inmate_features(*synthetic_inmate(n, rng)) for n in range(max(args.sizes))])
+    features = impute_mean(features[:, FEATURES.index("male") + 1:])
+
+    print(f"{'inmates':>8} {'method':8} {'seconds':>8} {'peak MB':>8} {'ARI':>6} {'SS ratio':>8}")
+    for size in args.sizes:
+        X = features[:size]
+        exact = None
+        if size <= args.exact_max:
+            exact, seconds, peak = measured(lambda: notebook(X, args.clusters))
+            print(f"{size:8} {'exact':8} {seconds:8.2f} {peak:8.1f}")
+        for method, options in (("kmeans", {}), ("birch", {"threshold": args.birch_threshold})):
+            (labels, _, _), seconds, peak = measured(
+                lambda: ward_clusters(X, args.clusters, method=method, **options))
+            agreement = ""
+            if exact is not None:
+                agreement = f"{adjusted_rand_score(exact, labels):6.3f} {within_ss(X, labels) / within_ss(X, exact):8.3f}"
+            print(f"{size:8} {method:8} {seconds:8.2f} {peak:8.1f} {agreement}")
+
+
+if __name__ == "__main__":
+    main()
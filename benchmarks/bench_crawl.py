@@ -0,0 +1,156 @@
+"""End-to-end crawl benchmark against a synthetic population on the local fixture server.
+
+    python -m benchmarks.bench_crawl --result-pages 8 --detail-pages 500 --latency 0.02 \\
+        --last-names 4 --first-initials 5 --detail-workers 4 --output bench_results.jsonl
+
+Runs InmateScraper.search_inmates over a last name x first initial grid and
+appends one JSON object per run to --output: the commit, the parameters,
+inmates/second, p50/p99 per-inmate latency (time between consecutive saved
+inmates), peak RSS, CSV bytes written and the per-stage Metrics snapshot.
+The fixture server runs in its own process so it does not share the
+scraper's CPU or memory numbers.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from instrumentation import Metrics
+from mugshot_bot import InmateScraper
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones",
+              "Garcia", "Miller", "Davis", "Rodriguez", "Wilson",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Perez",
+              "Taylor", "Anderson", "Thomas", "Jackson", "White"]
+
+
+class TimedScraper(InmateScraper):
+    """InmateScraper that records when each inmate is saved."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saved_at = []
+
+    def _save_inmate(self, inmate_data, details, page_hash=None):
+        super()._save_inmate(inmate_data, details, page_hash=page_hash)
+        self.saved_at.append(time.perf_counter())
+
+
+def _serve(options, urls, stop):
+    from fixture_server import FixtureServer
+
+    with FixtureServer(record_requests=False, **options) as server:
+        urls.put(server.url)
+        stop.wait()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _section_sizes(values):
+    sizes = {}
+    for value in values:
+        key, _, count = value.partition("=")
+        sizes[key] = int(count)
+    return sizes
+
+
+def run(args):
+    server_options = {
+        "latency": args.latency,
+        "result_pages": args.result_pages,
+        "detail_pages": args.detail_pages,
+        "rows_per_page": args.rows_per_page,
+        "section_sizes": _section_sizes(args.section_size),
+    }
+    context = multiprocessing.get_context("spawn")
+    urls, stop = context.Queue(), context.Event()
+    server = context.Process(target=_serve, args=(server_options, urls, stop), daemon=True)
+    server.start()
+    try:
+        url = urls.get(timeout=30)
+        with tempfile.TemporaryDirectory() as output_dir:
+            metrics = Metrics()
+            scraper = TimedScraper(output_dir=output_dir, engine=args.engine, base_url=url,
+                                   detail_workers=args.detail_workers, metrics=metrics)
+            last_names = LAST_NAMES[:args.last_names]
+            first_initials = [chr(ord("A") + i) for i in range(args.first_initials)]
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    found = scraper.search_inmates(last_names, first_initials)
+            finally:
+                scraper.close()
+            elapsed = time.perf_counter() - start
+
+            csv_bytes = sum(os.path.getsize(os.path.join(output_dir, name))
+                            for name in os.listdir(output_dir) if name.endswith(".csv"))
+    finally:
+        stop.set()
+        server.join(timeout=10)
+
+    saved_at = [start] + scraper.saved_at
+    latencies = [b - a for a, b in zip(saved_at, saved_at[1:])]
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "commit": _git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": dict(vars(args), section_size=server_options["section_sizes"]),
+        "inmates": found,
+        "seconds": elapsed,
+        "inmates_per_second": found / elapsed if elapsed else None,
+        "latency_p50": _percentile(latencies, 0.5),
+        "latency_p99": _percentile(latencies, 0.99),
+        "peak_rss_bytes": peak_rss,
+        "csv_bytes": csv_bytes,
+        "stages": metrics.snapshot()["stages"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--result-pages", type=int, default=8, help="results pages per search")
+    parser.add_argument("--detail-pages", type=int, default=500, help="distinct inmates in the population")
+    parser.add_argument("--rows-per-page", type=int, default=5)
+    parser.add_argument("--section-size", action="append", default=[], metavar="KEY=N",
+                        help="rows per detail page section, e.g. infractions=10 (default 2 each)")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fixture response")
+    parser.add_argument("--last-names", type=int, default=2)
+    parser.add_argument("--first-initials", type=int, default=5)
+    parser.add_argument("--engine", default="http", choices=["http", "selenium"])
+    parser.add_argument("--detail-workers", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.jsonl", help="JSON lines file the result is appended to")
+    args = parser.parse_args()
+
+    result = run(args)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    print(f"{result['inmates']} inmates in {result['seconds']:.2f}s: {result['inmates_per_second']:.1f} inmates/s")
+    print(f"per-inmate latency p50 {result['latency_p50'] * 1000:.1f}ms, p99 {result['latency_p99'] * 1000:.1f}ms")
+    print(f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB, CSV {result['csv_bytes'] / 1024:.1f} KiB")
+    print(f"appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
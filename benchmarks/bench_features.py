@@ -0,0 +1,95 @@
+"""Rebuilding the feature matrix from the CSV files vs updating it as a recrawl saves inmates.
+
+    python -m benchmarks.bench_features --inmates 100000 --touched 0.01 0.1
+
+Writes a synthetic crawl of --inmates inmates to CSV and backfills a
+FeatureStore from it, the way a notebook would rebuild its feature matrix
+from scratch. Then, for each --touched fraction, recrawls that share of the
+inmates through a FeatureStore (update() at save, commit() at flush) and
+checks the updated rows against a full rebuild.
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from feature_store import FeatureStore, backfill_from_csv, load_features
+from result_writer import ResultWriter
+
+VERDICTS = ["Major - Guilty", "Minor - Guilty", "Not Guilty", "Dismissed"]
+RISKS = [("Minimum", "Low"), ("Medium", "Moderate"), ("Close", "High"), ("Maximum", "High")]
+
+
+def _date(rng):
+    return f"{rng.randint(1, 12):02}/{rng.randint(1, 28):02}/{rng.randint(2000, 2024)}"
+
+
+def synthetic_inmate(n, rng):
+    inmate_id = str(100000 + n)
+    inmate_data = {"inmate_id": inmate_id, "last_name": f"Name{n}", "gender": rng.choice(["Male", "Female"]),
+                   "height": f"{rng.randint(4, 6)} f {rng.randint(0, 11)}", "weight": str(rng.randint(100, 300))}
+    details = {
+        "sentences": [{"commit_num": f"A{i}", "sentence_length":
+                       f"{rng.randint(0, 40):03} Y/{rng.randint(0, 11):02} M/{rng.randint(0, 29):02} D"}
+                      for i in range(rng.randint(1, 4))],
+        "infractions": [{"violation_date": _date(rng), "verdict": rng.choice(VERDICTS)}
+                        for _ in range(rng.randint(0, 6))],
+        "appeals": [{"appeal_date": _date(rng)} for _ in range(rng.randint(0, 1))],
+        "classifications": [{"complete_date": _date(rng), "custody_risk": custody, "internal_risk": internal}
+                            for custody, internal in rng.sample(RISKS, rng.randint(1, 3))],
+        "parole_actions": [{"hearing_date": _date(rng)} for _ in range(rng.randint(0, 2))],
+        "work_programs": [{"assigned_date": "01/01/2023", "completed_date": _date(rng)}
+                          for _ in range(rng.randint(0, 3))],
+        "detainers": [{"detainer_date": _date(rng)} for _ in range(rng.randint(0, 2))],
+    }
+    return inmate_data, details
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inmates", type=int, default=100000)
+    parser.add_argument("--touched", type=float, nargs="+", default=[0.01, 0.1], help="shares of inmates recrawled")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    crawl = [synthetic_inmate(n, rng) for n in range(args.inmates)]
+
+    with tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as store_dir:
+        with ResultWriter(output_dir, flush_rows=10000) as writer:
+            for inmate_data, details in crawl:
+                writer.write_details(inmate_data["inmate_id"], details)
+                writer.write_inmate(inmate_data)
+        start = time.perf_counter()
+        store = FeatureStore(store_dir)
+        backfill_from_csv(store, output_dir)
+        rebuild = time.perf_counter() - start
+        print(f"rebuild from CSV   {args.inmates:7} inmates  {rebuild:7.3f}s")
+
+        for share in args.touched:
+            touched = rng.sample(range(args.inmates), int(args.inmates * share))
+            recrawled = {}
+            start = time.perf_counter()
+            for n in touched:
+                inmate_data, details = synthetic_inmate(n, random.Random(n))
+                store.update(inmate_data, details)
+                recrawled[inmate_data["inmate_id"]] = (inmate_data, details)
+            store.commit(list(recrawled))
+            seconds = time.perf_counter() - start
+            print(f"recrawl {share:6.1%}    {len(touched):7} inmates  {seconds:7.3f}s  "
+                  f"({seconds / rebuild:.1%} of the rebuild)")
+
+            with tempfile.TemporaryDirectory() as check_dir:
+                check = FeatureStore(check_dir)
+                for inmate_data, details in recrawled.values():
+                    check.update(inmate_data, details)
+                check.commit(list(recrawled))
+                check.close()
+                expected = load_features(check_dir)
+            actual = load_features(store_dir).loc[expected.index]
+            assert np.allclose(actual.to_numpy(), expected.to_numpy(), equal_nan=True)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Refreshing known inmates by name search vs by ADC number lookup, and sweeping an ID range.
+
+    python -m benchmarks.bench_lookup --population 5000 --refresh 200 --latency 0.005
+
+Against a FixtureServer population, refreshes --refresh already known
+inmates twice: once the way a crawl reaches them today (a name search per
+last name and first initial, then a click per row) and once with
+InmateScraper.lookup_inmates. Then sweeps ADC numbers around the population
+with IdSweep, twice, the second time from the first sweep's bitmap. Prints
+requests, seconds and inmates saved for each.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from fixture_server import FixtureServer
+from id_sweep import IdSweep
+from mugshot_bot import InmateScraper
+
+
+def measured(server, fn):
+    before = len(server.requests)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, len(server.requests) - before, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--population", type=int, default=5000)
+    parser.add_argument("--refresh", type=int, default=200, help="known inmates to refresh")
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--detail-workers", type=int, default=4)
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    with FixtureServer(population=args.population, latency=args.latency) as server:
+        inmates = random.Random(0).sample(server._population, args.refresh)
+        ids = [str(100000 + inmate[3]) for inmate in inmates]
+        keys = sorted({(inmate[0], inmate[1][0], inmate[4], inmate[5]) for inmate in inmates})
+
+        print(f"{'':22} {'requests':>9} {'seconds':>8} {'saved':>6}")
+        for label, run in (("name search refresh", lambda scraper: scraper.search_keys(keys)),
+                           ("ADC number lookup", lambda scraper: scraper.lookup_inmates(ids))):
+            with tempfile.TemporaryDirectory() as output_dir:
+                scraper = InmateScraper(output_dir=output_dir, engine="http", base_url=server.url,
+                                        detail_workers=args.detail_workers, number_search=True)
+                try:
+                    saved, requests, seconds = measured(server, lambda: run(scraper))
+                    refreshed = len(set(ids) & {inmate["inmate_id"] for inmate in scraper.iter_inmates()})
+                finally:
+                    scraper.close()
+            print(f"{label:22} {requests:9} {seconds:8.2f} {saved:6}  ({refreshed}/{len(ids)} of the known inmates)")
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            scraper = InmateScraper(output_dir=output_dir, engine="http", base_url=server.url,
+                                    detail_workers=args.detail_workers, number_search=True)
+            start, stop = 100000 - 4 * args.block_size, 100000 + args.population + 4 * args.block_size
+            try:
+                for sweep_number in (1, 2):
+                    sweep = IdSweep(scraper, bitmap_path=os.path.join(output_dir, "ids.sqlite"),
+                                    block_size=args.block_size)
+                    saved, requests, seconds = measured(server, lambda: sweep.run(start, stop))
+                    print(f"{f'sweep {sweep_number} ({stop - start} ids)':22} {requests:9} {seconds:8.2f} {saved:6}  "
+                          f"({sweep.stats['dead_blocks']}/{sweep.stats['blocks']} blocks dead, "
+                          f"{sweep.stats['lookups']} lookups)")
+                    sweep.close()
+            finally:
+                scraper.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Raw strings vs normalized columns: memory of the inmates and sentences tables and parse time.
+
+    python -m benchmarks.bench_normalize --inmates 100000
+
+Builds synthetic raw rows the way the parser produces them (heights like
+"5 f 9", sentences like "008 Y/06 M/00 D", MM/DD/YYYY dates, a few
+malformed values), then compares the memory of the raw string DataFrame
+with the normalized one, and row-by-row parsing with Series.apply (what the
+notebooks do) with normalize_table.
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from normalize import normalize_table
+from result_writer import CHILD_TABLES, INMATE_COLUMNS
+
+GENDERS = ["Male", "Female"]
+ETHNIC = ["White", "Hispanic", "Black", "Native American", "Asian", "Other"]
+COLORS = ["Brown", "Black", "Blonde", "Red", "Gray", "Bald"]
+CUSTODY = ["Minimum", "Medium", "Close", "Maximum"]
+COUNTIES = ["Maricopa", "Pima", "Pinal", "Yavapai", "Mohave", "Yuma", "Coconino", "Cochise"]
+CRIMES = ["Theft", "Burglary", "Aggravated Assault", "Possession Of Dangerous Drugs", "Robbery", "Murder 2nd Degree"]
+
+
+def _date(rng):
+    if rng.random() < 0.01:
+        return "unknown"
+    return f"{rng.randint(1, 12):02}/{rng.randint(1, 28):02}/{rng.randint(1980, 2024)}"
+
+
+def raw_tables(inmates, seed=0):
+    rng = random.Random(seed)
+    inmate_rows, sentence_rows = [], []
+    for n in range(inmates):
+        inmate_id = str(100000 + n)
+        row = {column: "" for column in INMATE_COLUMNS}
+        row.update(inmate_id=inmate_id, last_name=f"Name{n % 5000}", first_name_middle_initial=f"First{n % 700}",
+                   gender=rng.choice(GENDERS), hair_color=rng.choice(COLORS), eye_color=rng.choice(COLORS),
+                   ethnic_origin=rng.choice(ETHNIC), custody_class=rng.choice(CUSTODY), status="Active",
+                   height="?" if rng.random() < 0.01 else f"{rng.randint(4, 6)} f {rng.randint(0, 11)}",
+                   weight=str(rng.randint(100, 300)), admitted_date=_date(rng), admission=_date(rng),
+                   release_date=_date(rng), last_movement=_date(rng))
+        inmate_rows.append(row)
+        for i in range(2):
+            sentence = {column: "" for column in CHILD_TABLES["sentences"]}
+            roll = rng.random()
+            sentence.update(commit_num=f"{inmate_id}-{i}", county=rng.choice(COUNTIES), crime=rng.choice(CRIMES),
+                            sentence_status="Imposed", offense_date=_date(rng), sentence_date=_date(rng),
+                            sentence_length="LIFE" if roll < 0.02 else
+                            f"{rng.randint(0, 40):03} Y/{rng.randint(0, 11):02} M/{rng.randint(0, 29):02} D")
+            sentence_rows.append({"inmate_id": inmate_id, **sentence})
+    return {"inmates": pd.DataFrame(inmate_rows, dtype=str), "sentences": pd.DataFrame(sentence_rows, dtype=str)}
+
+
+def _apply_date(value):
+    try:
+        return datetime.strptime(value, "%m/%d/%Y")
+    except ValueError:
+        return None
+
+
+def _apply_height(value):
+    match = re.match(r"(\d+) f (\d+)", value)
+    return int(match.group(1)) * 12 + int(match.group(2)) if match else None
+
+
+def _apply_sentence(value):
+    match = re.match(r"(\d+) Y/(\d+) M/(\d+) D", value)
+    return round(int(match.group(1)) * 365.25 + int(match.group(2)) * 30.4375 + int(match.group(3))) if match else None
+
+
+def parse_with_apply(name, df):
+    df = df.copy()
+    for column in df.columns:
+        if column.endswith("_date") or column in ("admission", "last_movement"):
+            df[column] = df[column].apply(_apply_date)
+    if name == "inmates":
+        df["height_in"] = df.pop("height").apply(_apply_height)
+        df["weight"] = df["weight"].apply(lambda value: int(value) if value.isdigit() else None)
+    else:
+        df["sentence_days"] = df.pop("sentence_length").apply(_apply_sentence)
+    return df
+
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inmates", type=int, default=100000)
+    args = parser.parse_args()
+    tables = raw_tables(args.inmates)
+
+    print(f"{'':10} {'rows':>8} {'raw':>9} {'typed':>9} {'apply':>8} {'vectorized':>11}")
+    malformed = {}
+    for name, df in tables.items():
+        start = time.perf_counter()
+        parse_with_apply(name, df)
+        apply_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        typed = normalize_table(name, df, malformed)
+        vectorized_seconds = time.perf_counter() - start
+        print(f"{name:10} {len(df):8} {megabytes(df):7.1f}MB {megabytes(typed):7.1f}MB "
+              f"{apply_seconds:7.2f}s {vectorized_seconds:10.2f}s")
+    print("malformed:", ", ".join(f"{table}.{column} {count}" for (table, column), count in sorted(malformed.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Serial vs multi-process crawl against the local fixture server.
+
+    python -m benchmarks.bench_parallel --processes 4 --keys 16 --latency 0.02 --max-rps 100
+
+The parallel run shares one --max-rps rate limit across its processes, as a
+crawl of the live site would; the requests per second it reached are printed
+next to the limit.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from fixture_server import FixtureServer
+from mugshot_bot import InmateScraper
+from parallel_runner import ParallelRunner
+from result_writer import iter_inmates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=16, help="number of (last name, initial) searches")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fixture response")
+    parser.add_argument("--max-rps", type=float, default=100.0,
+                        help="shared rate limit for the parallel run, 0 for none")
+    args = parser.parse_args()
+
+    keys = [("Smith", chr(ord("A") + i % 26), "Male", "Active") for i in range(args.keys)]
+
+    with FixtureServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        serial_dir = os.path.join(tmp, "serial")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper = InmateScraper(output_dir=serial_dir, engine="http", base_url=server.url)
+            try:
+                scraper.search_keys(keys)
+            finally:
+                scraper.close()
+        serial = time.perf_counter() - start
+
+        parallel_dir = os.path.join(tmp, "parallel")
+        runner = ParallelRunner(output_dir=parallel_dir, processes=args.processes, engine="http",
+                                base_url=server.url, max_requests_per_second=args.max_rps)
+        before = len(server.requests)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner.run(keys)
+        parallel = time.perf_counter() - start
+        parallel_requests = len(server.requests) - before
+
+        serial_ids = {inmate["inmate_id"] for inmate in iter_inmates(serial_dir)}
+        parallel_ids = [inmate["inmate_id"] for inmate in iter_inmates(parallel_dir)]
+
+    print(f"serial:   {serial:.2f}s for {len(keys)} searches")
+    print(f"parallel: {parallel:.2f}s with {args.processes} processes, "
+          f"{parallel_requests / parallel:.1f} requests/s (limit {args.max_rps or 'none'})")
+    print(f"speedup:  {serial / parallel:.2f}x")
+    print(f"inmates:  {len(serial_ids)} serial, {len(parallel_ids)} merged, "
+          f"{'match' if set(parallel_ids) == serial_ids and len(parallel_ids) == len(serial_ids) else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
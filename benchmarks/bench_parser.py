@@ -0,0 +1,38 @@
+"""Micro-benchmark for page_parser.parse_inmate_details.
+
+    python -m benchmarks.bench_parser --iterations 500
+"""
+import argparse
+import os
+import time
+
+from page_parser import parse_inmate_details
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DETAIL_PAGE = os.path.join(HERE, os.pardir, "inmate_data.html")
+
+
+def run(html, iterations):
+    parse_inmate_details(html)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parse_inmate_details(html)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--page", default=DETAIL_PAGE)
+    args = parser.parse_args()
+
+    with open(args.page, encoding="utf-8") as f:
+        html = f.read()
+
+    elapsed = run(html, args.iterations)
+    print(f"parsed {args.iterations} pages in {elapsed:.3f}s: "
+          f"{args.iterations / elapsed:.1f} pages/s, {elapsed / args.iterations * 1000:.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Name grid vs adaptive query planner, against a synthetic population on the local fixture server.
+
+    python -m benchmarks.bench_planner --population 3000 --latency 0
+
+Runs the original 20 last names x 26 first initials grid and a QueryPlanner
+over the same population (searches only, no detail pages) and prints, for
+each, the searches issued, requests the server saw, distinct inmates found
+and the share of the Male/Active population reached. The planner is run a
+second time on its stored plan to show the cost of a repeat crawl.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from fixture_server import FixtureServer
+from mugshot_bot import InmateScraper
+from query_planner import QueryPlanner
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones",
+              "Garcia", "Miller", "Davis", "Rodriguez", "Wilson",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Perez",
+              "Taylor", "Anderson", "Thomas", "Jackson", "White"]
+FIRST_INITIALS = [chr(ord("A") + i) for i in range(26)]
+
+
+def grid(scraper):
+    ids = set()
+    for last_name in LAST_NAMES:
+        for first_initial in FIRST_INITIALS:
+            ids.update(row["inmate_id"] for row, _ in scraper._harvest_search(last_name, first_initial, "Male", "Active"))
+    return len(LAST_NAMES) * len(FIRST_INITIALS), ids
+
+
+def planned(scraper, plan_path):
+    planner = QueryPlanner(scraper, plan_path=plan_path)
+    try:
+        ids = {row["inmate_id"] for row, _ in planner.harvest()}
+        return planner.stats["searches"], ids
+    finally:
+        planner.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--population", type=int, default=3000, help="inmates in the synthetic population")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fixture response")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with FixtureServer(population=args.population, latency=args.latency, seed=args.seed) as server, \
+            tempfile.TemporaryDirectory() as output_dir:
+        truth = {str(100000 + inmate[3]) for inmate in server._population
+                 if inmate[4] == "Male" and inmate[5] == "Active"}
+        scraper = InmateScraper(output_dir=output_dir, engine="http", base_url=server.url)
+        plan_path = os.path.join(output_dir, "query_plan.sqlite")
+        try:
+            for label, search in (("name grid", grid),
+                                  ("planner", lambda s: planned(s, plan_path)),
+                                  ("planner, stored plan", lambda s: planned(s, plan_path))):
+                requests_before = len(server.requests)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    searches, ids = search(scraper)
+                elapsed = time.perf_counter() - start
+                print(f"{label:21} {searches:5} searches {len(server.requests) - requests_before:6} requests "
+                      f"{len(ids):5} inmates  coverage {len(ids & truth) / len(truth):6.1%}  {elapsed:6.2f}s")
+        finally:
+            scraper.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Fixed detail workers vs a RequestScheduler, against a fixture server with limited capacity.
+
+    python -m benchmarks.bench_scheduler --capacity 4 --latency 0.02 --detail-workers 16
+
+The server serves --capacity responses at once and answers 503 once too
+many requests are queued. Both runs crawl the same searches with the same
+number of pipeline workers. The first run sends as many requests at once as
+it has workers. The second lets the scheduler find the concurrency the
+server tolerates. For each run it prints inmates saved, inmates/second, the
+503s the server sent, and the scheduler's final limit and retries.
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+from fixture_server import FixtureServer
+from instrumentation import Metrics
+from mugshot_bot import InmateScraper
+from scheduler import RequestScheduler
+
+
+def crawl(server, args, scheduler):
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = InmateScraper(output_dir=output_dir, engine="http", base_url=server.url,
+                                detail_workers=args.detail_workers, scheduler=scheduler)
+        rejected = server.rejected
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                found = scraper.search_inmates([f"Name{i}" for i in range(args.searches)], ["A"])
+        finally:
+            scraper.close()
+        return found, time.perf_counter() - start, server.rejected - rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--capacity", type=int, default=4, help="responses the server serves at once")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds each response takes")
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--result-pages", type=int, default=8)
+    parser.add_argument("--detail-workers", type=int, default=16)
+    args = parser.parse_args()
+
+    with FixtureServer(result_pages=args.result_pages, detail_pages=100000, latency=args.latency,
+                       capacity=args.capacity, record_requests=False) as server:
+        expected = args.searches * args.result_pages * server.rows_per_page
+        found, seconds, rejected = crawl(server, args, None)
+        print(f"fixed {args.detail_workers:2} workers  {found:4}/{expected} inmates  {found / seconds:6.1f}/s  "
+              f"{rejected:4} x 503")
+
+        metrics = Metrics()
+        scheduler = RequestScheduler(max_limit=args.detail_workers, metrics=metrics)
+        found, seconds, rejected = crawl(server, args, scheduler)
+        counters = metrics.snapshot()["counters"]
+        print(f"scheduler         {found:4}/{expected} inmates  {found / seconds:6.1f}/s  {rejected:4} x 503  "
+              f"limit {scheduler.limit:.1f}, {counters.get('retries', 0)} retries, "
+              f"{counters.get('limit_decreases', 0)} decreases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""CSV vs Parquet output store: write time, size on disk and the notebooks' lookups.
+
+    python -m benchmarks.bench_store --inmates 100000 --lookup 1000
+
+Writes the same synthetic inmates (2 rows per child table each, with
+values shaped like the site's, see fixture_server.synthetic_value) through
+ResultWriter and ColumnarWriter, then times what the analysis notebooks do:
+read every table and keep the rows of a set of inmate_ids, once with
+pd.read_csv + isin and once with load_table(inmate_ids=...), plus a
+two-column read of inmates.
+"""
+import argparse
+import hashlib
+import os
+import random
+import string
+import tempfile
+import time
+
+import pandas as pd
+
+from columnar_store import ColumnarWriter, load_table
+from fixture_server import COMMON_SURNAMES, FIRST_NAMES, synthetic_value
+from result_writer import CHILD_TABLES, INMATE_COLUMNS, ResultWriter
+
+
+def populate(writer, inmates):
+    rng = random.Random(0)
+    for n in range(inmates):
+        inmate_id = str(100000 + n)
+        details = {name: [{column: synthetic_value(column, rng, n, i) for column in columns} for i in range(2)]
+                   for name, columns in CHILD_TABLES.items()}
+        photo = hashlib.sha256(inmate_id.encode("utf-8")).hexdigest()
+        inmate = {column: synthetic_value(column, rng, n) for column in INMATE_COLUMNS} | {
+            "inmate_id": inmate_id, "last_name": rng.choice(COMMON_SURNAMES),
+            "first_name_middle_initial": f"{rng.choice(FIRST_NAMES)} {rng.choice(string.ascii_uppercase)}.",
+            "photo_filename": f"{photo[:2]}/{photo}.jpg"}
+        writer.write_details(inmate_id, details)
+        writer.write_inmate(inmate)
+    writer.close()
+
+
+def disk_bytes(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inmates", type=int, default=100000)
+    parser.add_argument("--lookup", type=int, default=1000, help="inmate_ids in the lookup set")
+    args = parser.parse_args()
+    tables = ["inmates", *CHILD_TABLES]
+    ids = [str(100000 + n) for n in random.Random(0).sample(range(args.inmates), args.lookup)]
+
+    with tempfile.TemporaryDirectory() as csv_dir, tempfile.TemporaryDirectory() as parquet_dir:
+        csv_write, _ = timed(lambda: populate(ResultWriter(csv_dir, flush_rows=10000), args.inmates))
+        parquet_write, _ = timed(lambda: populate(ColumnarWriter(parquet_dir, flush_rows=10000), args.inmates))
+
+        def csv_lookup():
+            return sum(int(pd.read_csv(os.path.join(csv_dir, f"{name}.csv"), dtype=str)
+                           .inmate_id.isin(ids).sum()) for name in tables)
+
+        def parquet_lookup():
+            return sum(len(load_table(parquet_dir, name, inmate_ids=ids)) for name in tables)
+
+        csv_seconds, csv_rows = timed(csv_lookup)
+        parquet_seconds, parquet_rows = timed(parquet_lookup)
+        csv_columns, _ = timed(lambda: pd.read_csv(os.path.join(csv_dir, "inmates.csv"), dtype=str,
+                                                   usecols=["inmate_id", "gender"]))
+        parquet_columns, _ = timed(lambda: load_table(parquet_dir, "inmates", columns=["gender"]))
+
+        print(f"{'':8} {'write':>8} {'on disk':>10} {'lookup':>8} {'2 columns':>10}")
+        print(f"{'csv':8} {csv_write:7.2f}s {disk_bytes(csv_dir) / 2 ** 20:8.1f}MB "
+              f"{csv_seconds:7.3f}s {csv_columns:9.3f}s")
+        print(f"{'parquet':8} {parquet_write:7.2f}s {disk_bytes(parquet_dir) / 2 ** 20:8.1f}MB "
+              f"{parquet_seconds:7.3f}s {parquet_columns:9.3f}s")
+        print(f"lookup of {args.lookup} inmates: {csv_rows} rows from CSV, {parquet_rows} from Parquet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from result_writer import CHILD_TABLES
+
+# inmates.csv columns that describe the file rather than the inmate
+_IGNORED_FIELDS = ("inmate_id", "photo_filename")
+
+
+def _snapshot(inmate_data, details):
+    """Reduce one parsed inmate to {"fields": {...}, "sections": {name: [row, ...]}}."""
+    fields = {k: v for k, v in inmate_data.items() if k not in _IGNORED_FIELDS}
+    sections = {
+        name: [[record.get(column, "") for column in columns] for record in details.get(name, [])]
+        for name, columns in CHILD_TABLES.items()
+    }
+    return {"fields": fields, "sections": sections}
+
+
+def _row_diff(old_rows, new_rows):
+    """Return (inserted, removed), treating each section as a multiset of rows."""
+    remaining = [tuple(row) for row in old_rows]
+    inserted = []
+    for row in new_rows:
+        try:
+            remaining.remove(tuple(row))
+        except ValueError:
+            inserted.append(row)
+    return inserted, [list(row) for row in remaining]
+
+
+def diff_snapshots(old, new):
+    """Return the field and section changes from old to new; old may be None for a new inmate."""
+    old = old or {"fields": {}, "sections": {}}
+    fields = {}
+    for field in sorted(set(old["fields"]) | set(new["fields"])):
+        before = old["fields"].get(field)
+        after = new["fields"].get(field)
+        if before != after and (before or after):
+            fields[field] = [before, after]
+
+    sections = {}
+    for name in CHILD_TABLES:
+        inserted, removed = _row_diff(old["sections"].get(name, []), new["sections"].get(name, []))
+        if inserted or removed:
+            sections[name] = {"columns": CHILD_TABLES[name], "inserted": inserted, "removed": removed}
+    return fields, sections
+
+
+class ChangeCapture:
+    """Emit only what changed for each inmate between crawls.
+
+    The last known state of every inmate (its inmates.csv fields and child
+    table rows) is kept in a SQLite file keyed by inmate_id, next to the
+    content hash of the detail page it was parsed from. capture() diffs a
+    freshly parsed inmate against that state; commit() appends the changes as
+    one JSON object per inmate to log_path and stores the new state, so the
+    log and the store move together with the CSV flushes.
+
+    Each change log line has the inmate_id, "new" or "updated", the crawl
+    time, {field: [old, new]} and {section: {"inserted": rows, "removed": rows}}.
+    An inmate whose detail page hash has not changed is skipped before
+    parsing (see is_unchanged).
+    """
+
+    def __init__(self, path, log_path):
+        self.path = path
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS inmates (
+                inmate_id TEXT PRIMARY KEY, page_hash TEXT, snapshot TEXT NOT NULL, updated_at REAL
+            )
+        """)
+        self.conn.commit()
+        self._hashes = dict(self.conn.execute("SELECT inmate_id, page_hash FROM inmates"))
+        self.pending = {}
+
+    def is_unchanged(self, inmate_id, page_hash):
+        """True if the inmate's state was last taken from a detail page with this hash."""
+        return page_hash is not None and self._hashes.get(inmate_id) == page_hash
+
+    def _load(self, inmate_id):
+        with self._lock:
+            row = self.conn.execute("SELECT snapshot FROM inmates WHERE inmate_id = ?", (inmate_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def capture(self, inmate_data, details, page_hash=None):
+        """Diff one parsed inmate against its last known state; the result waits for commit()."""
+        inmate_id = inmate_data["inmate_id"]
+        new = _snapshot(inmate_data, details)
+        # a second capture before the commit still diffs against the stored state
+        old = self.pending[inmate_id][1] if inmate_id in self.pending else self._load(inmate_id)
+        self.pending[inmate_id] = (new, old, page_hash)
+
+    def commit(self, inmate_ids):
+        """Log the changes of the given captured inmates and make their new state current."""
+        now = time.time()
+        lines = []
+        updates = []
+        for inmate_id in inmate_ids:
+            if inmate_id not in self.pending:
+                continue
+            new, old, page_hash = self.pending.pop(inmate_id)
+            updates.append((inmate_id, page_hash, json.dumps(new), now))
+            fields, sections = diff_snapshots(old, new)
+            if fields or sections:
+                lines.append(json.dumps({
+                    "inmate_id": inmate_id,
+                    "change": "new" if old is None else "updated",
+                    "crawled_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+                    "fields": fields,
+                    "sections": sections,
+                }))
+        if lines:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO inmates (inmate_id, page_hash, snapshot, updated_at) VALUES (?, ?, ?, ?)",
+                updates)
+        self._hashes.update((inmate_id, page_hash) for inmate_id, page_hash, _, _ in updates)
+
+    def close(self):
+        self.conn.close()
+
+
+def iter_changes(log_path):
+    """Yield the change log's records one dict at a time."""
+    if not os.path.exists(log_path):
+        return
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlCheckpoint:
+    """Durable work queue for one crawl, kept in a local SQLite file.
+
+    Tracks the state of every search key (pending / in_progress / done /
+    failed, with an attempt count), every inmate_id whose rows have been
+    flushed to the output files, and the size of each output file at that
+    point. A restarted crawl truncates the files back to the last committed
+    sizes, skips keys that are done and never fetches a committed inmate
+    again, so child table rows are written exactly once per inmate.
+
+    Delete the file, or call reset(), to start a new crawl.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS search_keys (
+                last_name TEXT, first_initial TEXT, gender TEXT, status TEXT,
+                state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT, updated_at REAL,
+                PRIMARY KEY (last_name, first_initial, gender, status)
+            );
+            CREATE TABLE IF NOT EXISTS inmates (
+                inmate_id TEXT PRIMARY KEY, committed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, size INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self._committed = {row[0] for row in self.conn.execute("SELECT inmate_id FROM inmates")}
+
+    def add_keys(self, keys):
+        """Register search keys as pending; keys already known keep their state."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO search_keys (last_name, first_initial, gender, status, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, PENDING, time.time()) for key in keys])
+
+    def pending_keys(self, keys):
+        """Return the keys, in the given order, that still need to run."""
+        with self._lock:
+            states = {
+                tuple(row[:4]): (row[4], row[5]) for row in
+                self.conn.execute("SELECT last_name, first_initial, gender, status, state, attempts FROM search_keys")
+            }
+        runnable = []
+        for key in keys:
+            state, attempts = states.get(tuple(key), (PENDING, 0))
+            if state in (PENDING, IN_PROGRESS) or (state == FAILED and attempts < self.max_attempts):
+                runnable.append(tuple(key))
+        return runnable
+
+    def _set_state(self, key, state, error=None, attempt=False):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE search_keys SET state = ?, error = ?, updated_at = ?, attempts = attempts + ? "
+                "WHERE last_name = ? AND first_initial = ? AND gender = ? AND status = ?",
+                (state, error, time.time(), 1 if attempt else 0, *key))
+
+    def start_key(self, key):
+        self._set_state(key, IN_PROGRESS, attempt=True)
+
+    def finish_key(self, key):
+        self._set_state(key, DONE)
+
+    def fail_key(self, key, error):
+        self._set_state(key, FAILED, error=str(error))
+
+    def key_counts(self):
+        """Return {state: number of keys}."""
+        with self._lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM search_keys GROUP BY state"))
+
+    def is_committed(self, inmate_id):
+        return inmate_id in self._committed
+
+    def commit(self, inmate_ids, file_sizes):
+        """Record flushed inmates and the output file sizes they were flushed at, atomically."""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO inmates (inmate_id, committed_at) VALUES (?, ?)",
+                                  [(inmate_id, now) for inmate_id in inmate_ids])
+            self.conn.executemany("INSERT OR REPLACE INTO files (path, size) VALUES (?, ?)",
+                                  list(file_sizes.items()))
+        self._committed.update(inmate_ids)
+
+    def committed_sizes(self):
+        """Return {path: size} as of the last commit, empty for a new crawl."""
+        with self._lock:
+            return dict(self.conn.execute("SELECT path, size FROM files"))
+
+    def reset(self):
+        """Forget all state so the next crawl starts from scratch."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM search_keys")
+            self.conn.execute("DELETE FROM inmates")
+            self.conn.execute("DELETE FROM files")
+        self._committed = set()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,187 @@
+import numpy as np
+from scipy.cluster.hierarchy import fcluster
+from sklearn.cluster import Birch, MiniBatchKMeans
+
+# point-to-center distances computed per block (8192 rows x 1024 centers, 64MB)
+CHUNK_CELLS = 2 ** 23
+
+
+def impute_mean(X):
+    """X as float64 with missing values replaced by their column mean (0 for all-missing columns)."""
+    X = np.array(X, dtype=np.float64)
+    counts = (~np.isnan(X)).sum(axis=0)
+    means = np.divide(np.nansum(X, axis=0), counts, out=np.zeros(X.shape[1]), where=counts > 0)
+    missing = np.isnan(X)
+    X[missing] = np.take(means, np.nonzero(missing)[1])
+    return X
+
+
+def nearest_center(X, centers, chunk_cells=CHUNK_CELLS):
+    """Index of and squared distance to the nearest center of each row of X, chunk_cells distances at a time."""
+    chunk_rows = max(1, chunk_cells // len(centers))
+    center_norms = (centers ** 2).sum(axis=1)
+    labels = np.empty(len(X), dtype=np.int64)
+    distances = np.empty(len(X))
+    for start in range(0, len(X), chunk_rows):
+        chunk = X[start:start + chunk_rows]
+        squared = (chunk ** 2).sum(axis=1)[:, None] - 2 * chunk @ centers.T + center_norms
+        nearest = squared.argmin(axis=1)
+        labels[start:start + chunk_rows] = nearest
+        distances[start:start + chunk_rows] = np.maximum(squared[np.arange(len(chunk)), nearest], 0)
+    return labels, distances
+
+
+def ward_tree(points, weights=None):
+    """Ward linkage of weighted points, as a scipy linkage matrix.
+
+    A point of weight w stands for w identical observations, so with unit
+    weights this is scipy.cluster.hierarchy.linkage(points, "ward") up to
+    ties: equal distances are broken like scipy's chain does (lowest index
+    first, a merged cluster takes the higher index), but where scipy's
+    distance updates round a tie apart the two can order it differently.
+    Merges are found with the nearest-neighbour chain algorithm from the
+    cluster centroids and sizes, which needs O(len(points)) memory instead
+    of a pairwise distance matrix.
+    """
+    centers = np.array(points, dtype=np.float64)
+    m = len(centers)
+    sizes = np.ones(m) if weights is None else np.array(weights, dtype=np.float64)
+    active = np.ones(m, dtype=bool)
+    merges = []
+    chain = []
+    while len(merges) < m - 1:
+        if not chain:
+            chain.append(int(np.argmax(active)))
+        x = chain[-1]
+        costs = 2 * sizes[x] * sizes / (sizes[x] + sizes) * ((centers - centers[x]) ** 2).sum(axis=1)
+        costs[~active] = np.inf
+        costs[x] = np.inf
+        y = int(costs.argmin())
+        if len(chain) > 1 and costs[chain[-2]] <= costs[y]:
+            y = chain[-2]
+        if len(chain) > 1 and y == chain[-2]:
+            del chain[-2:]
+            keep, gone = max(x, y), min(x, y)
+            centers[keep] = (sizes[x] * centers[x] + sizes[y] * centers[y]) / (sizes[x] + sizes[y])
+            sizes[keep] = sizes[x] + sizes[y]
+            active[gone] = False
+            merges.append((keep, gone, np.sqrt(costs[y])))
+        else:
+            chain.append(y)
+    return _linkage_matrix(merges, m)
+
+
+def _linkage_matrix(merges, m):
+    """Sort the merges by height and number the clusters the way scipy does (sizes count points, not weights)."""
+    parent = list(range(m))
+    cluster_id = list(range(m))
+    size = [1] * m
+    Z = np.empty((len(merges), 4))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for k, (a, b, distance) in enumerate(sorted(merges, key=lambda merge: merge[2])):
+        a, b = root(a), root(b)
+        first, second = sorted((cluster_id[a], cluster_id[b]))
+        parent[b] = a
+        size[a] += size[b]
+        cluster_id[a] = m + k
+        Z[k] = first, second, distance, size[a]
+    return Z
+
+
+def _group_means(X, groups):
+    """(groups renumbered 0..k-1, mean row of each group, group sizes)."""
+    _, groups = np.unique(groups, return_inverse=True)
+    sizes = np.bincount(groups).astype(np.float64)
+    means = np.stack([np.bincount(groups, weights=X[:, j]) for j in range(X.shape[1])], axis=1) / sizes[:, None]
+    return groups, means, sizes
+
+
+def _pre_cluster(X, pre_clusters, method, batch_size, threshold, random_state, chunk_cells):
+    """Group X into at most pre_clusters groups; returns (group of each row, group means, group sizes)."""
+    kmeans = MiniBatchKMeans(n_clusters=pre_clusters, batch_size=batch_size, n_init=3, random_state=random_state)
+    if method == "kmeans":
+        centers = kmeans.fit(X).cluster_centers_
+    elif method == "birch":
+        model = Birch(n_clusters=None, threshold=threshold)
+        for start in range(0, len(X), batch_size):
+            model.partial_fit(X[start:start + batch_size])
+        centers = model.subcluster_centers_
+    else:
+        raise ValueError(f"Unknown method {method!r}, expected 'kmeans' or 'birch'")
+    groups, means, sizes = _group_means(X, nearest_center(X, centers, chunk_cells)[0])
+    if len(means) > pre_clusters:
+        # BIRCH's threshold left too many subclusters: merge them with k-means weighted by their sizes
+        groups, means, sizes = _group_means(X, kmeans.fit(means, sample_weight=sizes).labels_[groups])
+    return groups, means, sizes
+
+
+def ward_clusters(X, n_clusters, pre_clusters=None, method="kmeans", batch_size=4096, threshold=0.5,
+                  random_state=42, chunk_cells=CHUNK_CELLS):
+    """Ward clustering of the rows of X into n_clusters clusters in bounded memory.
+
+    With more rows than pre_clusters (default max(2 * n_clusters, 1024)),
+    the rows are first grouped by mini-batch k-means (method="kmeans") or
+    BIRCH (method="birch", see threshold), and Ward linkage runs on the group
+    means weighted by group size; otherwise it runs on the rows themselves
+    and matches AgglomerativeClustering(n_clusters, linkage="ward"). Memory
+    is O(len(X) + pre_clusters) rows plus chunk_cells distances, and time
+    O(pre_clusters ** 2).
+
+    Returns (labels, Z, leaves): the cluster (0..n_clusters-1) of each row,
+    the linkage matrix, for scipy's dendrogram, and the leaf of Z each row
+    belongs to.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if pre_clusters is None:
+        pre_clusters = max(2 * n_clusters, 1024)
+    if len(X) <= pre_clusters:
+        leaves, points, weights = np.arange(len(X)), X, None
+    else:
+        leaves, points, weights = _pre_cluster(X, pre_clusters, method, batch_size, threshold, random_state,
+                                               chunk_cells)
+    if len(points) < 2:
+        return np.zeros(len(X), dtype=np.int64), np.empty((0, 4)), leaves
+    Z = ward_tree(points, weights)
+    leaf_labels = fcluster(Z, n_clusters, criterion="maxclust") - 1
+    return leaf_labels[leaves], Z, leaves
+
+
+def representatives(X, labels):
+    """Index of the row of each cluster closest to the cluster mean, ordered by cluster label."""
+    X = np.asarray(X, dtype=np.float64)
+    labels, means, _ = _group_means(X, labels)
+    distances = np.empty(len(X))
+    chunk_rows = max(1, CHUNK_CELLS // X.shape[1])
+    for start in range(0, len(X), chunk_rows):
+        chunk = slice(start, start + chunk_rows)
+        distances[chunk] = ((X[chunk] - means[labels[chunk]]) ** 2).sum(axis=1)
+    order = np.lexsort((np.arange(len(X)), distances, labels))
+    first = np.r_[0, np.flatnonzero(np.diff(labels[order])) + 1]
+    return order[first]
+
+
+def balance_by_gender(features, n_clusters=None, **options):
+    """The clustering notebook's male/female balancing, on a load_features DataFrame.
+
+    Male inmates are clustered by their mean-imputed features into as many
+    clusters as there are female inmates (or n_clusters), and the male
+    closest to each cluster mean is kept. Returns (kept, dropped) inmate_ids:
+    all female inmates plus the kept males, and the other males. options go
+    to ward_clusters.
+    """
+    female = features.index[features["male"] == 0]
+    males = features[features["male"] == 1]
+    n_clusters = n_clusters or len(female)
+    if n_clusters >= len(males):
+        return list(female) + list(males.index), []
+    X = impute_mean(males.drop(columns="male").to_numpy())
+    labels, _, _ = ward_clusters(X, n_clusters, **options)
+    keep = np.zeros(len(males), dtype=bool)
+    keep[representatives(X, labels)] = True
+    return list(female) + list(males.index[keep]), list(males.index[~keep])
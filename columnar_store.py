@@ -0,0 +1,388 @@
+import bisect
+import glob
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from normalize import arrow_to_pandas, normalize_table, normalized_schema, to_arrow
+from result_writer import CHILD_TABLES, INMATE_COLUMNS, SAVED_AT, save_stamp
+
+# Rows per Parquet row group: the unit an inmate_id lookup reads.
+ROW_GROUP_ROWS = 8192
+
+PARTITIONING = ds.partitioning(pa.schema([("crawl_date", pa.string())]), flavor="hive")
+
+
+def table_columns(name):
+    """Raw column order of the "inmates" table or a CHILD_TABLES table, as the parser produces them, plus saved_at."""
+    return (INMATE_COLUMNS if name == "inmates" else ["inmate_id"] + CHILD_TABLES[name]) + [SAVED_AT]
+
+
+def _read_schema(name, columns=None):
+    """The stored (normalized) schema of a table, limited to columns, plus the crawl_date partition."""
+    schema = normalized_schema(name)
+    if columns is not None:
+        schema = pa.schema([schema.field(column) for column in columns])
+    return schema.append(pa.field("crawl_date", pa.string()))
+
+
+def _write_atomic(table, path, row_group_size=ROW_GROUP_ROWS):
+    """Write a Parquet file under a temporary name, fsync it and move it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, row_group_size=row_group_size, compression="zstd")
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _ranges(inmate_ids, row_group_size=ROW_GROUP_ROWS):
+    """(row group, smallest inmate_id, largest inmate_id) of a file written with the ids in this order."""
+    return [(start // row_group_size, min(inmate_ids[start:start + row_group_size]),
+             max(inmate_ids[start:start + row_group_size]))
+            for start in range(0, len(inmate_ids), row_group_size)]
+
+
+class _Index:
+    """The inmate_id range of every row group of every file, in SQLite.
+
+    Compacted files are sorted by inmate_id, so their row groups hold
+    disjoint ranges and a lookup reads only the groups that can hold the
+    requested ids. Part files are unsorted, but there are at most
+    compact_parts of them per partition.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS row_groups (
+                table_name TEXT, path TEXT, row_group INTEGER, min_id TEXT, max_id TEXT,
+                PRIMARY KEY (table_name, path, row_group)
+            )
+        """)
+        self.conn.commit()
+
+    def replace(self, name, old_paths, path, ranges):
+        """Swap the entries of old_paths for those of a new file, in one transaction."""
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM row_groups WHERE table_name = ? AND path = ?",
+                                  [(name, p) for p in old_paths])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO row_groups (table_name, path, row_group, min_id, max_id) "
+                "VALUES (?, ?, ?, ?, ?)", [(name, path, *r) for r in ranges])
+
+    def paths(self):
+        with self._lock:
+            return {path for (path,) in self.conn.execute("SELECT DISTINCT path FROM row_groups")}
+
+    def remove(self, paths):
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM row_groups WHERE path = ?", [(p,) for p in paths])
+
+    def lookup(self, name, inmate_ids):
+        """Return {path: row groups} whose inmate_id range holds any of the inmate_ids."""
+        inmate_ids = sorted(inmate_ids)
+        found = {}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, row_group, min_id, max_id FROM row_groups WHERE table_name = ? "
+                "ORDER BY path, row_group", (name,)).fetchall()
+        for path, row_group, min_id, max_id in rows:
+            i = bisect.bisect_left(inmate_ids, min_id)
+            if i < len(inmate_ids) and inmate_ids[i] <= max_id:
+                found.setdefault(path, []).append(row_group)
+        return found
+
+    def close(self):
+        self.conn.close()
+
+
+class ColumnarWriter:
+    """Parquet output store with the same interface as ResultWriter.
+
+    Rows are typed on the way out: each flushed batch goes through
+    normalize_table, so dates, heights, weights and sentence lengths are
+    stored as dates and integers and low-cardinality fields as dictionary
+    columns (see normalize.normalized_schema). Values that do not parse are
+    stored as nulls and counted in `malformed` ({(table, column): count}),
+    and on the metrics, if given, as malformed_<table>_<column>.
+
+    Each table lives under output_dir/columnar/<table>/crawl_date=YYYY-MM-DD/
+    (hive partitioning, one partition per day the rows were crawled). Every
+    flush writes each table's buffered rows as one new, fsynced part file, so
+    rows already on disk are never rewritten. Once a partition has
+    compact_parts part files they are merged into one file sorted by
+    inmate_id, in row groups of ROW_GROUP_ROWS rows, and close() merges the
+    whole partition into a single sorted file.
+
+    index.sqlite keeps the inmate_id range of every row group, so
+    load_table() can read one inmate, or a set of them, without scanning
+    whole tables.
+
+    Rows carry ResultWriter's saved_at column, so an inmate saved twice in
+    one day is read back from its last save only (load_table(latest=True)).
+
+    Tables named in overwrite start today's partition over at their first
+    flush, like ResultWriter starts their CSV over. file_sizes() and
+    truncate() work on part files: resuming a checkpoint deletes parts
+    written after its last commit. A compaction is committed before the
+    files it merged are deleted, so a crash in between resumes from either
+    the merged files or the compacted one, never neither.
+    """
+
+    def __init__(self, output_dir, flush_rows=1000, flush_interval=30.0, overwrite=("inmates",), on_flush=None,
+                 compact_parts=16, crawl_date=None, metrics=None):
+        self.root = os.path.join(output_dir, "columnar")
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.compact_parts = compact_parts
+        self.crawl_date = crawl_date or time.strftime("%Y-%m-%d")
+        self.metrics = metrics
+        self.malformed = {}
+        self.pending_ids = []
+        self._save = None
+        self.overwrite = set(overwrite)
+        os.makedirs(self.root, exist_ok=True)
+        self.index = _Index(os.path.join(self.root, "index.sqlite"))
+
+        self.rows = {name: [] for name in ["inmates", *CHILD_TABLES]}
+        self.columns = {name: table_columns(name) for name in self.rows}
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def _partition(self, name):
+        return os.path.join(self.root, name, f"crawl_date={self.crawl_date}")
+
+    def write_inmate(self, inmate):
+        """Buffer one inmates record (a dict keyed by INMATE_COLUMNS)."""
+        self.pending_ids.append(inmate["inmate_id"])
+        record = {SAVED_AT: self._saved_at(inmate["inmate_id"]), **inmate}
+        self._save = None
+        self.write_row("inmates", record)
+
+    def write_row(self, name, record):
+        self._add(name, record)
+        self._maybe_flush()
+
+    def write_details(self, inmate_id, details):
+        saved_at = self._saved_at(inmate_id)
+        for name in CHILD_TABLES:
+            for record in details.get(name, []):
+                self._add(name, {SAVED_AT: saved_at, **record, "inmate_id": inmate_id})
+
+    def _saved_at(self, inmate_id):
+        if self._save is None or self._save[0] != inmate_id:
+            self._save = (inmate_id, save_stamp())
+        return self._save[1]
+
+    def _add(self, name, record):
+        self.rows[name].append(tuple(record.get(column, "") for column in self.columns[name]))
+        self.buffered += 1
+
+    def _maybe_flush(self):
+        if self.buffered >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write every table's buffered rows as a new part file."""
+        wrote = False
+        merged = []
+        for name, rows in self.rows.items():
+            if not rows:
+                continue
+            if name in self.overwrite:
+                self._clear_partition(name)
+            table = self._normalize(name, rows)
+            path = os.path.join(self._partition(name), f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+            _write_atomic(table, path)
+            self.index.replace(name, [], self._relative(path), _ranges([row[0] for row in rows]))
+            self.rows[name] = []
+            wrote = True
+            if len(self._parts(name)) >= self.compact_parts:
+                merged.append(self._merge(name))
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        if wrote:
+            self._commit(self.pending_ids, [m for m in merged if m])
+        self.pending_ids = []
+
+    def _normalize(self, name, rows):
+        before = dict(self.malformed)
+        df = normalize_table(name, pd.DataFrame(rows, columns=self.columns[name], dtype=str), self.malformed)
+        if self.metrics is not None:
+            for (table, column), count in self.malformed.items():
+                if count != before.get((table, column), 0):
+                    self.metrics.count(f"malformed_{table}_{column}", count - before.get((table, column), 0))
+        return to_arrow(name, df)
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root)
+
+    def _parts(self, name):
+        return sorted(glob.glob(os.path.join(self._partition(name), "part-*.parquet")))
+
+    def _clear_partition(self, name):
+        paths = glob.glob(os.path.join(self._partition(name), "*.parquet"))
+        for path in paths:
+            os.remove(path)
+        self.index.remove([self._relative(path) for path in paths])
+        self.overwrite.discard(name)
+
+    def compact(self, name=None, full=False):
+        """Merge today's part files of one table (all tables by default) into one file sorted by inmate_id.
+
+        Compacted files are left alone until there are compact_parts of them,
+        or full=True, and then merged as well.
+        """
+        merged = [self._merge(name, full) for name in ([name] if name else self.rows)]
+        self._commit([], [m for m in merged if m])
+
+    def _merge(self, name, full=False):
+        """Write the compacted file of one table; returns (table, merged paths, new path, ranges) or None."""
+        merge = self._parts(name)
+        compacted = sorted(glob.glob(os.path.join(self._partition(name), "compacted-*.parquet")))
+        if full or len(compacted) >= self.compact_parts:
+            merge = compacted + merge
+        if not merge or merge == compacted[-1:]:
+            return None
+        schema = normalized_schema(name)
+        table = pa.concat_tables(pq.read_table(path, schema=schema) for path in merge)
+        table = table.sort_by("inmate_id")
+        path = os.path.join(self._partition(name), f"compacted-{time.time_ns()}.parquet")
+        _write_atomic(table, path)
+        return name, merge, path, _ranges(table.column("inmate_id").to_pylist())
+
+    def _commit(self, inmate_ids, merged):
+        """Commit the files as they are once the merged ones are gone, then index the new ones and delete the old."""
+        if self.on_flush is not None:
+            replaced = {old for _, merge, _, _ in merged for old in merge}
+            self.on_flush(inmate_ids, {path: size for path, size in self.file_sizes().items() if path not in replaced})
+        for name, merge, path, ranges in merged:
+            self.index.replace(name, [self._relative(p) for p in merge], self._relative(path), ranges)
+            for old in merge:
+                os.remove(old)
+
+    def start_fresh(self):
+        for name in list(self.overwrite):
+            self._clear_partition(name)
+
+    def file_sizes(self):
+        """Return {path: size} of every Parquet file in the store."""
+        return {path: os.path.getsize(path) for path in glob.glob(os.path.join(self.root, "*", "*", "*.parquet"))}
+
+    def truncate(self, sizes):
+        """Delete the files a checkpoint has not committed, i.e. parts written after its last commit.
+
+        A compacted file committed just before a crash may not be indexed
+        yet; it is indexed here.
+        """
+        stale = [path for path in glob.glob(os.path.join(self.root, "*", "*", "*.parquet*")) if path not in sizes]
+        for path in stale:
+            os.remove(path)
+        self.index.remove([self._relative(path) for path in stale])
+        indexed = self.index.paths()
+        for path in glob.glob(os.path.join(self.root, "*", "*", "*.parquet")):
+            if self._relative(path) not in indexed:
+                inmate_ids = pq.read_table(path, columns=["inmate_id"]).column("inmate_id").to_pylist()
+                self.index.replace(self._relative(path).split(os.sep)[0], [], self._relative(path),
+                                   _ranges(inmate_ids))
+
+    def close(self):
+        self.flush()
+        self.compact(full=True)
+        self.index.close()
+        for (table, column), count in sorted(self.malformed.items()):
+            print(f"{count} malformed {table}.{column} values stored as missing")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_table(output_dir, name, columns=None, inmate_ids=None, crawl_dates=None, latest=False):
+    """Read one table of a ColumnarWriter store as a typed DataFrame.
+
+    Only the requested columns are read (inmate_id and crawl_date always
+    come along); they are the normalized names, e.g. height_in and
+    sentence_days, see normalize.normalized_schema. With inmate_ids, the index picks the row groups holding
+    those inmates and nothing else is read. crawl_dates restricts the
+    partitions, and latest=True keeps only each inmate's rows from its last
+    save: the most recent day it was crawled, and the last saved_at that day.
+    """
+    root = os.path.join(output_dir, "columnar")
+    read_columns = ["inmate_id"] + [c for c in (columns or normalized_schema(name).names) if c != "inmate_id"]
+    if latest and SAVED_AT not in read_columns:
+        return load_table(output_dir, name, read_columns + [SAVED_AT], inmate_ids, crawl_dates, latest).drop(
+            columns=SAVED_AT)
+    crawl_dates = None if crawl_dates is None else {str(d) for d in crawl_dates}
+
+    if inmate_ids is not None:
+        inmate_ids = [str(i) for i in inmate_ids]
+        index = _Index(os.path.join(root, "index.sqlite"))
+        try:
+            located = index.lookup(name, inmate_ids)
+        finally:
+            index.close()
+        wanted = pa.array(inmate_ids, pa.string())
+        tables = []
+        for path, row_groups in sorted(located.items()):
+            crawl_date = os.path.basename(os.path.dirname(path)).partition("=")[2]
+            if crawl_dates is not None and crawl_date not in crawl_dates:
+                continue
+            table = pq.ParquetFile(os.path.join(root, path)).read_row_groups(row_groups, columns=read_columns)
+            table = table.filter(pc.is_in(table.column("inmate_id"), value_set=wanted))
+            tables.append(table.append_column("crawl_date", pa.array([crawl_date] * table.num_rows, pa.string())))
+        table = pa.concat_tables(tables) if tables else _read_schema(name, read_columns).empty_table()
+    else:
+        table_dir = os.path.join(root, name)
+        if not os.path.isdir(table_dir):
+            return arrow_to_pandas(_read_schema(name, read_columns).empty_table())
+        dataset = ds.dataset(table_dir, schema=_read_schema(name), format="parquet", partitioning=PARTITIONING,
+                             exclude_invalid_files=True)
+        where = None if crawl_dates is None else pc.field("crawl_date").isin(sorted(crawl_dates))
+        table = dataset.to_table(columns=read_columns + ["crawl_date"], filter=where)
+
+    df = arrow_to_pandas(table)
+    if latest and len(df):
+        saves = df if name == "inmates" else load_table(output_dir, "inmates", [SAVED_AT], inmate_ids, crawl_dates)
+        df = _last_save(df, saves)
+    return df.reset_index(drop=True)
+
+
+def _last_save(df, saves):
+    """The rows of df from each inmate's last save in saves, an inmates table.
+
+    Rows from before saved_at existed count as the first save of their day,
+    and inmates with no row in saves keep their most recent crawl_date's rows.
+    """
+    order = saves.assign(_at=pd.to_numeric(saves[SAVED_AT])).sort_values(["crawl_date", "_at"], kind="stable",
+                                                                        na_position="first")
+    last = order.drop_duplicates("inmate_id", keep="last").drop(columns="_at")
+    if df is saves:
+        return last.sort_index()
+    last = last.set_index("inmate_id")
+    crawl_date = df["inmate_id"].map(last["crawl_date"])
+    saved_at = df["inmate_id"].map(last[SAVED_AT])
+    same_save = (df["crawl_date"] == crawl_date) & (
+        (df[SAVED_AT] == saved_at).fillna(False).astype(bool) | (df[SAVED_AT].isna() & saved_at.isna()))
+    newest_day = df["crawl_date"] == df.groupby("inmate_id")["crawl_date"].transform("max")
+    return df[same_save | (crawl_date.isna() & newest_day)]
+
+
+def iter_inmates(output_dir):
+    """Yield each inmate's most recent inmates record from a ColumnarWriter store, one dict at a time."""
+    df = load_table(output_dir, "inmates", latest=True).drop(columns="crawl_date")
+    yield from df.to_dict("records")
@@ -0,0 +1,301 @@
+import heapq
+import queue
+import threading
+import time
+
+from http_engine import InmateNotFound
+from response_cache import content_hash
+from scheduler import is_retryable
+
+_DONE = object()
+
+
+class DetailTask:
+    """One results row waiting for its detail page, in harvest order."""
+    __slots__ = ("seq", "row", "state", "detail_html", "photo_filename", "unchanged", "absent", "attempts")
+
+    def __init__(self, seq, row, state):
+        self.seq = seq
+        self.row = row
+        self.state = state
+        self.detail_html = None
+        self.photo_filename = "None"
+        self.unchanged = False
+        self.absent = False
+        self.attempts = 0
+
+
+class KeyEnd:
+    """Marks the end of one search key's tasks in the task stream."""
+    __slots__ = ("seq", "key", "error")
+
+    def __init__(self, seq, key, error=None):
+        self.seq = seq
+        self.key = key
+        self.error = error
+
+
+class CrawlPipeline:
+    """Three-stage crawl connected by queues.
+
+    1. harvest: one thread walks every search key and every pager link, queueing
+       a DetailTask per row with the form state of the page it came from.
+    2. fetch: `workers` threads, each with its own pooled HTTP session carrying
+       the search session's cookies, post the rows' LinkNumber postbacks and
+       download their photos.
+    3. persist: the calling thread parses the detail pages and writes them in
+       harvest order through the scraper's ResultWriter.
+
+    A KeyEnd follows each key's tasks through the queues. When persist reaches
+    it, every row of that key has been handled, so a checkpointed crawl can
+    flush and mark the key done, or failed if any of its rows could not be
+    fetched. Rows already saved by the checkpointed crawl are never queued.
+
+    With a response cache, detail pages are read from it when fresh, and rows
+    whose page has not changed since they were saved skip the photo download
+    and persist entirely.
+
+    Nothing ever navigates back to a results page, so detail fetching scales
+    with `workers` independently of the search itself.
+
+    With the scraper's RequestScheduler, `workers` is only a ceiling: the
+    scheduler's limit decides how many detail requests are in flight. A
+    detail page that fails with a retryable error is not retried in place
+    but put back to be fetched again after the scheduler's backoff, up to
+    its max_retries, while the worker moves on to other rows.
+
+    Rows can also be ADC number lookups (InmateScraper.lookup_inmates). After
+    run(), `found` holds the inmate_ids whose detail page was saved or
+    unchanged, and `absent` the looked up numbers with no inmate.
+    """
+
+    def __init__(self, scraper, workers=4, queue_size=100):
+        self.scraper = scraper
+        self.workers = workers
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self.fetched = queue.Queue()
+        self.cookies = None
+        self._cookies_ready = threading.Event()
+        self._retries = []
+        self._retry_lock = threading.Lock()
+        self.found = set()
+        self.absent = set()
+
+    def run(self, search_keys=(), rows=None):
+        """Crawl every (last_name, first_initial, gender, status) key and return the number of inmates saved.
+
+        rows, an iterable of already harvested (row, results_state) pairs, is
+        crawled instead of search keys when given; it is consumed on the
+        harvest thread.
+        """
+        target = self._harvest if rows is None else self._harvest_rows
+        harvester = threading.Thread(target=target, args=(search_keys if rows is None else rows,), daemon=True)
+        fetchers = [threading.Thread(target=self._fetch, daemon=True) for _ in range(self.workers)]
+        harvester.start()
+        for fetcher in fetchers:
+            fetcher.start()
+
+        saved = self._persist()
+
+        harvester.join()
+        for fetcher in fetchers:
+            fetcher.join()
+        return saved
+
+    def _harvest(self, search_keys):
+        seq = 0
+        queued = set()
+        try:
+            for key in search_keys:
+                last_name, first_initial, gender, status = key
+                print(f"Searching for {last_name}, {first_initial}")
+                self.scraper._start_key(key)
+                error = None
+                try:
+                    for row, state in self.scraper._harvest_search(last_name, first_initial, gender, status):
+                        if not self._cookies_ready.is_set():
+                            self.cookies = self.scraper._session_cookies()
+                            self._cookies_ready.set()
+                        if self.scraper.checkpoint is not None:
+                            if row["inmate_id"] in queued or self.scraper._already_saved(row["inmate_id"]):
+                                print(f"Skipping inmate {row['inmate_id']}, already saved in this crawl")
+                                continue
+                            queued.add(row["inmate_id"])
+                        self.tasks.put(DetailTask(seq, row, state))
+                        seq += 1
+                except Exception as e:
+                    print(f"Error searching for {last_name}, {first_initial}: {e}")
+                    error = e
+                self.tasks.put(KeyEnd(seq, key, error))
+                seq += 1
+        finally:
+            self._cookies_ready.set()
+            for _ in range(self.workers):
+                self.tasks.put(_DONE)
+
+    def _harvest_rows(self, rows):
+        seq = 0
+        queued = set()
+        try:
+            for row, state in rows:
+                if not self._cookies_ready.is_set():
+                    self.cookies = self.scraper._session_cookies()
+                    self._cookies_ready.set()
+                if row["inmate_id"] in queued or self.scraper._already_saved(row["inmate_id"]):
+                    continue
+                queued.add(row["inmate_id"])
+                self.tasks.put(DetailTask(seq, row, state))
+                seq += 1
+        except Exception as e:
+            print(f"Error harvesting results: {e}")
+        finally:
+            self._cookies_ready.set()
+            for _ in range(self.workers):
+                self.tasks.put(_DONE)
+
+    def _fetch(self):
+        engine = None
+        try:
+            while True:
+                task = self._due_retry()
+                if task is None:
+                    task = self.tasks.get()
+                if task is _DONE:
+                    break
+                if isinstance(task, KeyEnd):
+                    self.fetched.put(task)
+                    continue
+                if engine is None:
+                    engine = self._new_engine()
+                if self._fetch_task(engine, task):
+                    self.fetched.put(task)
+            # the harvest is over: fetch whatever is still waiting to be retried
+            while True:
+                task = self._due_retry(wait=True)
+                if task is None:
+                    break
+                if engine is None:
+                    engine = self._new_engine()
+                if self._fetch_task(engine, task):
+                    self.fetched.put(task)
+        finally:
+            if engine is not None:
+                engine.close()
+            self.fetched.put(_DONE)
+
+    def _new_engine(self):
+        self._cookies_ready.wait()
+        engine = self.scraper._new_http_engine()
+        if self.cookies is not None:
+            engine.copy_cookies(self.cookies)
+        return engine
+
+    def _due_retry(self, wait=False):
+        """Pop a task whose retry time has come; with wait, sleep until one has (None when none are left)."""
+        while True:
+            with self._retry_lock:
+                if not self._retries:
+                    return None
+                retry_at, seq, task = self._retries[0]
+                delay = retry_at - time.monotonic()
+                if delay <= 0:
+                    heapq.heappop(self._retries)
+                    return task
+            if not wait:
+                return None
+            time.sleep(delay)
+
+    def _fetch_task(self, engine, task):
+        """Fetch a task's detail page and photo; False if it was put back to be retried later."""
+        inmate_id = task.row["inmate_id"]
+        scheduler = self.scraper.scheduler
+        try:
+            print(f"Fetching detailed page for inmate {inmate_id}")
+            task.detail_html = self.scraper._fetch_detail(engine, task.row, task.state,
+                                                          retries=0 if scheduler is not None else None)
+        except InmateNotFound:
+            print(f"No inmate with ADC number {inmate_id}")
+            task.absent = True
+            return True
+        except Exception as e:
+            if scheduler is not None and is_retryable(e) and task.attempts < scheduler.max_retries:
+                delay = scheduler.backoff(task.attempts, e)
+                task.attempts += 1
+                print(f"Error fetching detailed page for inmate {inmate_id}, retrying in {delay:.1f}s: {e}")
+                with self._retry_lock:
+                    heapq.heappush(self._retries, (time.monotonic() + delay, task.seq, task))
+                return False
+            print(f"Error fetching detailed page for inmate {inmate_id}: {e}")
+            return True
+        if self.scraper._detail_unchanged(inmate_id, task.detail_html):
+            task.unchanged = True
+            return True
+
+        if task.row["photo_url"]:
+            try:
+                with self.scraper._timed("photo_fetch"):
+                    data = engine.fetch_photo(task.row["photo_url"])
+                task.photo_filename = self.scraper.photos.put(inmate_id, data, task.row["photo_url"])
+                print(f"Downloaded photo: {task.photo_filename}")
+            except Exception as e:
+                print(f"Error downloading photo for inmate {inmate_id}: {e}")
+        else:
+            print(f"No inmate photo for inmate {inmate_id}")
+        return True
+
+    def _persist(self):
+        saved = 0
+        lost = 0
+        next_seq = 0
+        pending = {}
+        running = self.workers
+        while running:
+            task = self.fetched.get()
+            if task is _DONE:
+                running -= 1
+                continue
+            pending[task.seq] = task
+            while next_seq in pending:
+                task = pending.pop(next_seq)
+                next_seq += 1
+                if isinstance(task, KeyEnd):
+                    error = task.error
+                    if error is None and lost:
+                        error = f"{lost} detail page(s) could not be fetched"
+                    self.scraper._finish_key(task.key, error=error)
+                    lost = 0
+                elif task.absent:
+                    self.absent.add(task.row["inmate_id"])
+                elif task.unchanged:
+                    self.found.add(task.row["inmate_id"])
+                elif self._save(task):
+                    self.found.add(task.row["inmate_id"])
+                    saved += 1
+                else:
+                    lost += 1
+        # rows whose predecessors were lost to a worker crash
+        for seq in sorted(pending):
+            task = pending[seq]
+            if isinstance(task, DetailTask) and not task.unchanged and not task.absent and self._save(task):
+                self.found.add(task.row["inmate_id"])
+                saved += 1
+        return saved
+
+    def _save(self, task):
+        if task.detail_html is None:
+            return False
+        row = task.row
+        print(f"Collecting detailed inmate information for inmate {row['inmate_id']}")
+        detailed_info = self.scraper._collect_inmate_details(task.detail_html)
+
+        inmate_data = {
+            "inmate_id": row["inmate_id"],
+            "last_name": row["last_name"],
+            "first_name_middle_initial": row["first_name_middle_initial"],
+            "admitted_date": row["admitted_date"],
+            "photo_filename": task.photo_filename
+        }
+        inmate_data.update(detailed_info['basic_info'])
+        self.scraper._save_inmate(inmate_data, detailed_info, page_hash=content_hash(task.detail_html))
+        print(f"Found inmate: {row['first_name_middle_initial']} {row['last_name']} (ID: {row['inmate_id']})")
+        return True
@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from normalize import DATE_MARKERS, HEIGHT_RE, SENTENCE_RE
+from result_writer import CHILD_TABLES, iter_inmates, read_table
+
+# columns of the feature matrix, in order
+FEATURES = [
+    "male", "height_in", "weight",
+    "sentences", "sentence_days", "life_sentence", "death_sentence",
+    "infractions", "infractions_guilty", "infractions_major", "appeals",
+    "custody_risk", "internal_risk", "parole_actions", "detainers",
+    "work_programs", "work_months",
+]
+
+# classification risk levels, lowest first; other values are read as numbers if they are numbers
+CUSTODY_RISK = {"minimum": 1, "medium": 2, "close": 3, "maximum": 4}
+INTERNAL_RISK = {"low": 1, "moderate": 2, "high": 3}
+
+_HEIGHT = re.compile(HEIGHT_RE, re.IGNORECASE)
+_SENTENCE = re.compile(SENTENCE_RE, re.IGNORECASE)
+
+
+def _date(value):
+    for date_format in ("%m/%d/%Y", "%m/%d/%y"):
+        try:
+            return datetime.strptime((value or "").strip(), date_format)
+        except ValueError:
+            pass
+    return None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _risk(levels, value):
+    value = (value or "").strip()
+    return levels.get(value.lower(), _number(value)) if value else np.nan
+
+
+def _latest_classification(rows):
+    """The active classification if there is one, else the most recently completed (the site lists newest first)."""
+    if not rows:
+        return {}
+    for row in rows:
+        if row.get("complete_date", "").strip() in DATE_MARKERS:
+            return row
+    dated = [(date, i) for i, row in enumerate(rows) if (date := _date(row.get("complete_date", ""))) is not None]
+    return rows[max(dated, key=lambda item: (item[0], -item[1]))[1]] if dated else rows[0]
+
+
+def inmate_features(inmate_data, details):
+    """One inmate's feature row (float32, in FEATURES order) from its inmates record and parsed child rows.
+
+    Values that are missing or do not parse are NaN.
+    """
+    values = dict.fromkeys(FEATURES, np.nan)
+    gender = (inmate_data.get("gender") or "").strip().lower()
+    if gender in ("male", "female"):
+        values["male"] = float(gender == "male")
+    height = _HEIGHT.match((inmate_data.get("height") or "").strip())
+    if height:
+        values["height_in"] = int(height.group(1)) * 12 + int(height.group(2) or 0)
+    values["weight"] = _number(inmate_data.get("weight"))
+
+    sentences = details.get("sentences", [])
+    values["sentences"] = len(sentences)
+    values["sentence_days"] = values["life_sentence"] = values["death_sentence"] = 0
+    for row in sentences:
+        length = (row.get("sentence_length") or "").strip()
+        match = _SENTENCE.match(length)
+        if match:
+            years, months, days = (int(part) for part in match.groups())
+            values["sentence_days"] += round(years * 365.25 + months * 30.4375 + days)
+        values["life_sentence"] += "LIFE" in length.upper()
+        values["death_sentence"] += "DEATH" in length.upper()
+
+    infractions = details.get("infractions", [])
+    verdicts = [(row.get("verdict") or "").lower() for row in infractions]
+    values["infractions"] = len(infractions)
+    values["infractions_guilty"] = sum("guilty" in verdict and "not guilty" not in verdict for verdict in verdicts)
+    values["infractions_major"] = sum(verdict.startswith("major") for verdict in verdicts)
+    values["appeals"] = len(details.get("appeals", []))
+
+    latest = _latest_classification(details.get("classifications", []))
+    values["custody_risk"] = _risk(CUSTODY_RISK, latest.get("custody_risk"))
+    values["internal_risk"] = _risk(INTERNAL_RISK, latest.get("internal_risk"))
+    values["parole_actions"] = len(details.get("parole_actions", []))
+    values["detainers"] = len(details.get("detainers", []))
+
+    programs = details.get("work_programs", [])
+    values["work_programs"] = len(programs)
+    values["work_months"] = 0
+    for row in programs:
+        assigned, completed = _date(row.get("assigned_date", "")), _date(row.get("completed_date", ""))
+        if assigned is not None and completed is not None and completed >= assigned:
+            values["work_months"] += (completed - assigned).days / 30.4375
+    return np.array([values[feature] for feature in FEATURES], dtype=np.float32)
+
+
+def _open_index(path):
+    conn = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS rows (inmate_id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """)
+    conn.commit()
+    return conn
+
+
+class FeatureStore:
+    """Per-inmate features for the clustering and metrics notebooks, kept up to date during the crawl.
+
+    The features (see FEATURES and inmate_features) live in a float32 matrix
+    memory-mapped from path/features.npy, one row per inmate, with the
+    inmate_id -> row index in path/index.sqlite. update() computes a saved
+    inmate's row; commit() writes the rows of the flushed inmates in place, so
+    a crawl that touches a few inmates rewrites a few rows instead of
+    rebuilding the matrix from the CSV files. The matrix doubles when it is
+    full.
+
+    A crawl interrupted before commit() leaves the index at its last commit;
+    rows written after it are reused. Read the features with load_features.
+    """
+
+    def __init__(self, path, capacity=4096):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = _open_index(path)
+        stored = self.conn.execute("SELECT value FROM meta WHERE key = 'features'").fetchone()
+        if stored is not None and json.loads(stored[0]) != FEATURES:
+            raise ValueError(f"{path} holds a different feature set; delete it and rebuild with backfill_from_csv")
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('features', ?)", (json.dumps(FEATURES),))
+        self.ids = [row[0] for row in self.conn.execute("SELECT inmate_id FROM rows ORDER BY row")]
+        self.index = {inmate_id: row for row, inmate_id in enumerate(self.ids)}
+        self.matrix_path = os.path.join(path, "features.npy")
+        if os.path.exists(self.matrix_path):
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+        else:
+            self.matrix = np.lib.format.open_memmap(self.matrix_path, mode="w+", dtype=np.float32,
+                                                    shape=(max(capacity, 1), len(FEATURES)))
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, inmate_data, details):
+        """Compute one saved inmate's features; they are written at commit()."""
+        with self._lock:
+            self.pending[inmate_data["inmate_id"]] = inmate_features(inmate_data, details)
+
+    def commit(self, inmate_ids):
+        """Write the features of the given updated inmates to the matrix and the index."""
+        with self._lock:
+            new = []
+            for inmate_id in inmate_ids:
+                values = self.pending.pop(inmate_id, None)
+                if values is None:
+                    continue
+                row = self.index.get(inmate_id)
+                if row is None:
+                    row = len(self.ids)
+                    if row >= len(self.matrix):
+                        self._grow(row + 1)
+                    self.index[inmate_id] = row
+                    self.ids.append(inmate_id)
+                    new.append((inmate_id, row))
+                self.matrix[row] = values
+            self.matrix.flush()
+            with self.conn:
+                self.conn.executemany("INSERT INTO rows (inmate_id, row) VALUES (?, ?)", new)
+
+    def _grow(self, rows):
+        capacity = max(rows, 2 * len(self.matrix))
+        temp_path = self.matrix_path + ".tmp"
+        grown = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(capacity, len(FEATURES)))
+        grown[:len(self.matrix)] = self.matrix
+        grown.flush()
+        del grown
+        self.matrix.flush()
+        self.matrix = None
+        os.replace(temp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+
+    def features(self, inmate_ids=None):
+        """The feature rows of the given inmates (all of them by default), in that order; unknown ids are NaN."""
+        with self._lock:
+            if inmate_ids is None:
+                return np.array(self.matrix[:len(self.ids)])
+            rows = np.array([self.index.get(inmate_id, -1) for inmate_id in inmate_ids], dtype=np.int64)
+            result = self.matrix[np.maximum(rows, 0)] if len(self.ids) else np.full((len(rows), len(FEATURES)), np.nan)
+            result[rows < 0] = np.nan
+            return result.astype(np.float32)
+
+    def close(self):
+        self.matrix.flush()
+        self.conn.close()
+
+
+def load_features(path):
+    """Read a FeatureStore as a DataFrame indexed by inmate_id, with one column per feature."""
+    conn = _open_index(path)
+    try:
+        ids = [row[0] for row in conn.execute("SELECT inmate_id FROM rows ORDER BY row")]
+    finally:
+        conn.close()
+    matrix_path = os.path.join(path, "features.npy")
+    matrix = np.load(matrix_path, mmap_mode="r") if ids else np.empty((0, len(FEATURES)), dtype=np.float32)
+    return pd.DataFrame(np.array(matrix[:len(ids)]), index=pd.Index(ids, name="inmate_id"), columns=FEATURES)
+
+
+def backfill_from_csv(store, output_dir):
+    """Compute the features of every inmate of a CSV crawl in output_dir into store. Returns the inmate count."""
+    details = defaultdict(lambda: defaultdict(list))
+    for name in CHILD_TABLES:
+        if not os.path.exists(os.path.join(output_dir, f"{name}.csv")):
+            continue
+        for row in read_table(output_dir, name).to_dict("records"):
+            details[row["inmate_id"]][name].append(row)
+    inmate_ids = []
+    for inmate_data in iter_inmates(output_dir):
+        store.update(inmate_data, details.get(inmate_data["inmate_id"], {}))
+        inmate_ids.append(inmate_data["inmate_id"])
+    store.commit(inmate_ids)
+    return len(inmate_ids)
@@ -0,0 +1,470 @@
+import bisect
+import os
+import random
+import re
+import string
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import lxml.html
+from lxml import etree
+
+from http_engine import NUMBER_SEARCH_FIELD, NUMBER_SEARCH_TARGET
+from page_parser import BASIC_INFO_TABLES, SECTIONS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PHOTO_HOST = "https://quickbase-uploads.s3.us-gov-west-1.amazonaws.com/"
+
+DETAIL_TARGET_RE = re.compile(r"^gvInmate\$ctl(\d+)\$LinkNumber$")
+PAGE_ARGUMENT_RE = re.compile(r"^Page\$(\d+)$")
+
+# Synthetic pages carry their page number in __VIEWSTATE, which every postback echoes back.
+VIEWSTATE_RE = re.compile(r"^synthetic:(\d+)$")
+
+# A synthetic detail page cell, filled in per inmate with synthetic_value(field, ...).
+VALUE_SLOT_RE = re.compile(r"@@V:(\w+):(\d+)@@")
+
+# Vocabularies of the categorical detail page fields, after the values on the checked-in page.
+CATEGORIES = {
+    "gender": ["Male", "Female"],
+    "hair_color": ["Black", "Brown", "Blonde", "Gray", "Red", "Bald"],
+    "eye_color": ["Brown", "Blue", "Green", "Hazel", "Black"],
+    "ethnic_origin": ["White", "Mexican American", "Black", "American Indian", "Hispanic", "Other"],
+    "custody_class": ["Minimum/Low", "Medium/Moderate", "Close/High", "Maximum/High"],
+    "release_type": ["ADD", "CSED", "TSED", "ERCD", "SED"],
+    "complex": ["YUMA", "TUCSON", "LEWIS", "EYMAN", "FLORENCE", "PERRYVILLE", "DOUGLAS", "SAFFORD", "WINSLOW"],
+    "unit": ["YUMA CHEYENNE", "TUCSON RINCON", "LEWIS MOREY", "EYMAN COOK", "FLORENCE EAST", "PERRYVILLE LUMLEY"],
+    "status": ["Active", "Inactive"],
+    "county": ["Maricopa County", "Pima County", "Pinal County", "Yavapai County", "Mohave County", "Yuma County"],
+    "sentence_status": ["Imposed", "Probation Revoked", "Vacated"],
+    "crime": ["AGGRAVATED ASSAULT", "ATTEMPTED ROBBERY", "THEFT", "BURGLARY 3RD DEGREE", "POSS NARCOTIC DRUG",
+              "DUI", "ARMED ROBBERY", "FORGERY"],
+    "infraction": ["Possession of a Weapon", "Threatening or Intimidating", "Fighting", "Disobeying an Order",
+                   "Possession of Drugs", "Tampering with Security Devices"],
+    "verdict": ["Major - Guilty", "Minor - Guilty", "Not Guilty", "Dismissed"],
+    "outcome": ["Affirmed", "Reversed", "Modified"],
+    "classification_type": ["Initial Classification", "Reclassification", "Override"],
+    "custody_risk": ["Minimum", "Medium", "Close", "Maximum"],
+    "internal_risk": ["Low", "Moderate", "High"],
+    "statute": ["ARS 31-412", "ARS 41-1604.09", "ARS 31-233"],
+    "action": ["Release Granted", "Release Denied", "Continued"],
+    "work_assignment": ["1 Orientation", "Kitchen", "Laundry", "Yard Crew", "Maintenance", "Education"],
+    "detainer_type": ["Notification Request", "Hold", "Immigration Detainer"],
+    "authority": ["In State Probation", "U.S. Marshal", "ICE", "Maricopa County Sheriff"],
+}
+
+FIRST_NAMES = ["JACOB", "MARIA", "JAMES", "ROSA", "DAVID", "ANA", "MICHAEL", "LUIS", "ROBERT", "ELENA",
+               "JOSE", "JOHN", "CARLOS", "WILLIAM", "JUAN", "RICHARD", "MIGUEL", "JOSEPH", "JESUS", "CHRISTOPHER",
+               "ANTHONY", "DANIEL", "MARK", "ALEJANDRO", "PAUL", "FRANCISCO", "STEVEN", "JORGE", "KEVIN", "MANUEL",
+               "BRIAN", "RAUL", "JASON", "ADRIAN", "ERIC", "VICTOR", "TIMOTHY", "SERGIO", "JEFFREY", "RUBEN"]
+
+COMMON_SURNAMES = ["SMITH", "GARCIA", "JOHNSON", "MARTINEZ", "WILLIAMS", "HERNANDEZ", "BROWN", "LOPEZ",
+                   "JONES", "GONZALEZ", "DAVIS", "RODRIGUEZ", "MILLER", "PEREZ", "WILSON", "SANCHEZ",
+                   "ANDERSON", "RAMIREZ", "TAYLOR", "TORRES", "THOMAS", "FLORES", "JACKSON", "RIVERA",
+                   "WHITE", "GOMEZ", "HARRIS", "DIAZ", "MARTIN", "REYES", "THOMPSON", "MORALES",
+                   "MOORE", "CRUZ", "CLARK", "ORTIZ", "LEWIS", "GUTIERREZ", "LEE", "CHAVEZ",
+                   "WALKER", "RAMOS", "HALL", "RUIZ", "ALLEN", "MENDOZA", "YOUNG", "CASTILLO",
+                   "KING", "VASQUEZ", "WRIGHT", "ROMERO", "SCOTT", "MORENO", "GREEN", "HERRERA",
+                   "NG", "LI", "OX", "BEGAY", "YAZZIE", "BENALLY", "TSOSIE", "NEZ",
+                   "DE LA ROSA", "DE LA CRUZ", "DEL RIO", "VAN DYKE", "O'BRIEN", "ST. JOHN", "SMITH-JONES"]
+
+_RESULT_ROW = (
+    '<tr class="GridViewRow" align="center"><td align="right">{number}</td>'
+    '<td align="center"><a id="gvInmate_ctl{ctl:02d}_LinkNumber" '
+    'href="javascript:__doPostBack(\'gvInmate$ctl{ctl:02d}$LinkNumber\',\'\')">{inmate_id}</a></td>'
+    '<td align="center"><input type="image" name="gvInmate$ctl{ctl:02d}$ImageIMNO" '
+    'src="{photo_host}MugPhotos/{inmate_id}.jpg" alt="Photo not available"></td>'
+    '<td>{last_name}</td><td>{first_name}, {initial}.</td>'
+    '<td><span id="gvInmate_ctl{ctl:02d}_Admitted">{admitted}</span></td></tr>'
+)
+
+
+def _synthetic_results_template(html):
+    """Turn the checked-in results page into a template with @@VIEWSTATE@@ and @@TABLE@@ slots."""
+    doc = lxml.html.fromstring(html)
+    for field in doc.xpath("//input[@name='__VIEWSTATE']"):
+        field.set("value", "@@VIEWSTATE@@")
+    table = doc.get_element_by_id("gvInmate")
+    placeholder = etree.Element("span", id="gvInmatePlaceholder")
+    placeholder.tail = table.tail
+    table.getparent().replace(table, placeholder)
+    html = lxml.html.tostring(doc, encoding="unicode")
+    return html.replace('<span id="gvInmatePlaceholder"></span>', "@@TABLE@@")
+
+
+def _generate_population(size, seed=0):
+    """Return `size` synthetic inmates as (last, first, initial, index, gender, status), sorted by name.
+
+    Surnames follow a long-tailed distribution: common names repeat, and
+    about a third are rare made-up names, so prefix searches see both
+    crowded and empty branches.
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(COMMON_SURNAMES))]
+    population = []
+    for index in range(size):
+        if rng.random() < 0.33:
+            last_name = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 9)))
+        else:
+            last_name = rng.choices(COMMON_SURNAMES, weights)[0]
+        if rng.random() < 0.3:
+            first_name = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))
+        else:
+            first_name = rng.choice(FIRST_NAMES)
+        gender = "Male" if rng.random() < 0.9 else "Female"
+        status = "Active" if rng.random() < 0.8 else "Inactive"
+        population.append((last_name, first_name, rng.choice(string.ascii_uppercase), index, gender, status))
+    population.sort()
+    return population
+
+
+def synthetic_value(field, rng, index=0, row=0):
+    """A plausible value of a detail page field for inmate index, drawn from rng.
+
+    Dates are MM/DD/YYYY, heights "5 f 9", sentence lengths "008 Y/06 M/00 D"
+    and categorical fields come from CATEGORIES; commitment, cause and
+    charge numbers carry index and row, so each inmate's rows are distinct.
+    """
+    if field.endswith("date") or field in ("admission", "last_movement"):
+        if field == "complete_date" and row == 0:
+            return "Active Classification"
+        return f"{rng.randint(1, 12):02}/{rng.randint(1, 28):02}/{rng.randint(1995, 2025)}"
+    if field == "height":
+        return f"{rng.randint(4, 6)} f {rng.randint(0, 11)}"
+    if field == "weight":
+        return str(rng.randint(110, 320))
+    if field == "sentence_length":
+        if rng.random() < 0.02:
+            return "LIFE"
+        return f"{rng.randint(0, 25):03} Y/{rng.randint(0, 11):02} M/{rng.randint(0, 29):02} D"
+    if field == "commit_num":
+        return f"{string.ascii_uppercase[row % 26]}01"
+    if field in ("cause_num", "charges"):
+        return f"{rng.randint(1995, 2025)}{index % 10000:04}-{row + 1:03}"
+    if field in CATEGORIES:
+        return rng.choice(CATEGORIES[field])
+    return f"{field} {index}-{row}"
+
+
+def _set_text(cell, text):
+    for child in cell:
+        cell.remove(child)
+    cell.text = text
+
+
+def _synthetic_detail_template(html, section_sizes):
+    """Turn the checked-in detail page into a template with section_sizes[key] rows per section.
+
+    The inmate number, photo and name at the top of the page are @@ID@@,
+    @@LAST@@, @@FIRST@@ and @@INITIAL@@, and every basic info and section
+    cell is a @@V:<field>:<row>@@ slot (see VALUE_SLOT_RE).
+    """
+    doc = lxml.html.fromstring(html)
+    doc.get_element_by_id("lblInmage").text = "Inmate @@ID@@"
+    photo = doc.get_element_by_id("ImgIMNOResult")
+    photo.set("src", re.sub(r"[^/]*\.jpg$", "@@ID@@.jpg", photo.get("src")))
+    name_cells = doc.xpath("//table[@id='GridView7']//tr[@class='GridViewRow']/td")
+    for cell, slot in zip(name_cells, ("@@LAST@@", "@@FIRST@@", "@@INITIAL@@.")):
+        _set_text(cell, slot)
+    for table_id, fields, _ in BASIC_INFO_TABLES:
+        cells = doc.xpath(f"//table[@id='{table_id}']//tr[@class='GridViewRow']/td")
+        for cell, field in zip(cells, fields):
+            _set_text(cell, f"@@V:{field}:0@@")
+    for key, section_id, table_id, fields, _ in SECTIONS:
+        count = section_sizes.get(key, 0)
+        label = doc.get_element_by_id(f"lbl{section_id}")
+        label.text = f"{count} records"
+
+        tables = doc.xpath(f"//table[@id='{table_id}']")
+        if tables:
+            table = tables[0]
+            for row in table.xpath(".//tr[@class='GridViewRow']"):
+                row.getparent().remove(row)
+        else:
+            table = etree.Element("table", {"class": "BorderGridView", "id": table_id})
+            header = etree.SubElement(table, "tr", {"class": "GridViewHead"})
+            for field in fields:
+                etree.SubElement(header, "th").text = field
+            label.addnext(table)
+        body = table.find("tbody") if table.find("tbody") is not None else table
+        for i in range(count):
+            row = etree.SubElement(body, "tr", {"class": "GridViewRow"})
+            for field in fields:
+                etree.SubElement(row, "td").text = f"@@V:{field}:{i}@@"
+    return lxml.html.tostring(doc, encoding="unicode")
+
+
+class FixtureServer:
+    """Local stand-in for inmatedatasearch.azcorrections.gov.
+
+    Serves the checked-in inmate_data_search.html for the landing page, name
+    searches and pager postbacks, inmate_data.html for any gvInmate LinkNumber
+    postback and for an ADC number search of its inmate (363906), and
+    placeholder bytes for mugshots. Photo URLs in the pages are
+    rewritten to point at the server itself. latency (seconds) is added to
+    every response to approximate the live site. Posted text fields are cut
+    to their maxlength on the search page (one letter of first name), as a
+    browser would.
+
+        with FixtureServer() as server:
+            scraper = InmateScraper(engine="http", base_url=server.url)
+
+    With result_pages set, the pages are synthesized from the checked-in ones
+    instead: every search returns result_pages pages of rows_per_page rows,
+    drawn from a population of detail_pages distinct inmates (so searches
+    overlap once it is used up; ADC numbers 100000 up to 100000 +
+    detail_pages are found by number search), and every detail page has
+    section_sizes[key] rows in each section (default 2). Page numbers
+    travel in __VIEWSTATE, so the Selenium and HTTP engines both work.
+
+    With population set, searches behave like the live site's instead: a
+    generated population of that many inmates is filtered by last name
+    prefix, first name prefix, gender and status, and results stop at
+    max_results rows (max_results / rows_per_page pages).
+
+    With capacity set, at most that many responses are served at once and
+    the rest queue for a slot, so latency grows with load like a busy
+    server's; past backlog queued requests the server answers
+    503 Service Unavailable with Retry-After: 1.
+    """
+
+    def __init__(self, search_page=os.path.join(HERE, "inmate_data_search.html"),
+                 detail_page=os.path.join(HERE, "inmate_data.html"), host="127.0.0.1", port=0, latency=0.0,
+                 result_pages=None, detail_pages=1000, rows_per_page=5, section_sizes=None, record_requests=True,
+                 population=None, max_results=40, seed=0, capacity=None, backlog=None):
+        self.latency = latency
+        self.record_requests = record_requests
+        self.requests = []
+        self.capacity = capacity
+        self.backlog = backlog if backlog is not None else (capacity or 0) * 2
+        self.rejected = 0
+        self._slots = threading.Semaphore(capacity) if capacity else None
+        self._queued = 0
+        self._queue_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.url = f"http://{host}:{self._httpd.server_address[1]}/"
+
+        with open(search_page, encoding="utf-8") as f:
+            search_html = f.read().replace(PHOTO_HOST, self.url)
+        with open(detail_page, encoding="utf-8") as f:
+            detail_html = f.read().replace(PHOTO_HOST, self.url)
+        self.search_html = search_html.encode("utf-8")
+        self.detail_html = detail_html.encode("utf-8")
+        self.maxlength = {field.get("name"): int(field.get("maxlength"))
+                          for field in lxml.html.fromstring(search_html).xpath("//input[@name][@maxlength]")}
+
+        self.result_pages = result_pages
+        self.detail_pages = detail_pages
+        self.rows_per_page = rows_per_page
+        self.population = population
+        self.max_results = max_results
+        if population:
+            self._population = _generate_population(population, seed)
+            self._surnames = [inmate[0] for inmate in self._population]
+            self._by_index = {inmate[3]: inmate for inmate in self._population}
+        if result_pages or population:
+            sizes = {key: 2 for key, *_ in SECTIONS}
+            sizes.update(section_sizes or {})
+            self._results_template = _synthetic_results_template(search_html)
+            self._detail_template = _synthetic_detail_template(detail_html, sizes)
+
+        self._thread = None
+
+    def _inmate_index(self, form, page, row):
+        key = zlib.crc32(f"{form.get('txtLName', '')}|{form.get('txtFName', '')}".encode("utf-8"))
+        return (key * self.result_pages * self.rows_per_page
+                + (page - 1) * self.rows_per_page + row) % self.detail_pages
+
+    def _generated_inmate(self, form, page, row):
+        index = self._inmate_index(form, page, row)
+        last_name = (form.get("txtLName", "") or "SMITH").upper()
+        first_name = FIRST_NAMES[index % len(FIRST_NAMES)]
+        return (last_name, first_name, chr(ord("A") + index % 26), index)
+
+    def _matches(self, form):
+        """The population's inmates matching a search form, in the site's order, capped at max_results."""
+        last = form.get("txtLName", "").upper()
+        first = form.get("txtFName", "").upper()
+        gender = form.get("rblGender", "Male")
+        status = form.get("rblStaus", "Active")
+        matches = []
+        start = bisect.bisect_left(self._surnames, last)
+        for inmate in self._population[start:]:
+            if not inmate[0].startswith(last):
+                break
+            if inmate[1].startswith(first) and inmate[4] == gender and inmate[5] == status:
+                matches.append(inmate)
+                if len(matches) == self.max_results:
+                    break
+        return matches
+
+    def _page_inmates(self, form, page):
+        """Return (inmates on the page, number of pages) for a search."""
+        if self.population:
+            matches = self._matches(form)
+            start = (page - 1) * self.rows_per_page
+            return matches[start:start + self.rows_per_page], -(-len(matches) // self.rows_per_page)
+        return [self._generated_inmate(form, page, row) for row in range(self.rows_per_page)], self.result_pages
+
+    def synthetic_results(self, form, page):
+        inmates, pages = self._page_inmates(form, page)
+        if not inmates:
+            html = self._results_template.replace("@@VIEWSTATE@@", f"synthetic:{page}").replace("@@TABLE@@", "")
+            return html.encode("utf-8")
+        rows = []
+        for row, inmate in enumerate(inmates):
+            last_name, first_name, initial, index = inmate[:4]
+            rows.append(_RESULT_ROW.format(
+                number=(page - 1) * self.rows_per_page + row + 1,
+                ctl=row + 3,
+                inmate_id=100000 + index,
+                photo_host=self.url,
+                last_name=last_name,
+                first_name=first_name,
+                initial=initial,
+                admitted=f"{index % 12 + 1:02d}/{index % 28 + 1:02d}/{2000 + index % 25}",
+            ))
+        pager = "".join(
+            f"<td><span>{n}</span></td>" if n == page else
+            f"<td><a href=\"javascript:__doPostBack('gvInmate','Page${n}')\">{n}</a></td>"
+            for n in range(1, pages + 1)
+        )
+        pager_row = f'<tr><td colspan="6"><table border="0"><tbody><tr>{pager}</tr></tbody></table></td></tr>'
+        header = ('<tr class="GridViewHead" align="center"><th>#</th><th>Inmate Info</th><th>Photo</th>'
+                  '<th>Last Name</th><th>First Name,MI</th><th>Admitted</th></tr>')
+        table = (f'<table class="BorderGridView" id="gvInmate"><tbody>'
+                 f'{pager_row}{header}{"".join(rows)}{pager_row}</tbody></table>')
+        html = self._results_template.replace("@@VIEWSTATE@@", f"synthetic:{page}").replace("@@TABLE@@", table)
+        return html.encode("utf-8")
+
+    def synthetic_detail(self, form, row):
+        match = VIEWSTATE_RE.match(form.get("__VIEWSTATE", ""))
+        page = int(match.group(1)) if match else 1
+        inmates, _ = self._page_inmates(form, page)
+        return self._detail_page(inmates[row])
+
+    def _detail_page(self, inmate):
+        last_name, first_name, initial, index = inmate[:4]
+        known = dict(zip(("gender", "status"), inmate[4:]))
+        rng = random.Random(index)
+        html = VALUE_SLOT_RE.sub(
+            lambda m: known.get(m.group(1)) or synthetic_value(m.group(1), rng, index, int(m.group(2))),
+            self._detail_template)
+        html = html.replace("@@ID@@", str(100000 + index)).replace("@@LAST@@", last_name)
+        return html.replace("@@FIRST@@", first_name).replace("@@INITIAL@@", initial).encode("utf-8")
+
+    def synthetic_lookup(self, number):
+        """The detail page of the inmate with ADC number `number`, or None if there is none."""
+        index = int(number) - 100000 if number.isdigit() else -1
+        if self.population:
+            inmate = self._by_index.get(index)
+        elif 0 <= index < self.detail_pages:
+            inmate = ("SMITH", FIRST_NAMES[index % len(FIRST_NAMES)], chr(ord("A") + index % 26), index)
+        else:
+            inmate = None
+        return self._detail_page(inmate) if inmate is not None else None
+
+    def _number_search(self, form):
+        """Response to the "Search by ADC Number" button or to a number search.
+
+        The number search's controls are http_engine's assumed ones, not the
+        live site's (see NUMBER_SEARCH_TARGET).
+        """
+        number = form.get(NUMBER_SEARCH_FIELD, "").strip()
+        if not (self.result_pages or self.population):
+            return self.detail_html if number == "363906" else self.search_html
+        detail = self.synthetic_lookup(number) if "btnSearchNumber" not in form else None
+        if detail is not None:
+            return detail
+        html = self._results_template.replace("@@VIEWSTATE@@", "synthetic:1").replace("@@TABLE@@", "")
+        return html.encode("utf-8")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.record_requests:
+                    server.requests.append(("GET", self.path, None))
+                if self.path.startswith("/MugPhotos/"):
+                    name = self.path.rsplit("/", 1)[-1].encode("utf-8")
+                    self._send(b"\xff\xd8\xff\xe0" + name + b"\xff\xd9", "image/jpeg")
+                elif server.result_pages or server.population:
+                    self._send(server.synthetic_results({}, 1))
+                else:
+                    self._send(server.search_html)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0][:server.maxlength.get(k)] for k, v in
+                        parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                target = form.get("__EVENTTARGET", "")
+                if server.record_requests:
+                    server.requests.append(("POST", self.path, form))
+                detail = DETAIL_TARGET_RE.match(target)
+                if "btnSearchNumber" in form or target == NUMBER_SEARCH_TARGET:
+                    self._send(server._number_search(form))
+                elif not (server.result_pages or server.population):
+                    self._send(server.detail_html if detail else server.search_html)
+                elif detail:
+                    self._send(server.synthetic_detail(form, int(detail.group(1)) - 3))
+                else:
+                    page = PAGE_ARGUMENT_RE.match(form.get("__EVENTARGUMENT", ""))
+                    self._send(server.synthetic_results(form, int(page.group(1)) if page else 1))
+
+            def _send(self, body, content_type="text/html; charset=utf-8"):
+                if server._slots is None:
+                    if server.latency:
+                        time.sleep(server.latency)
+                elif not self._serve_slot():
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve_slot(self):
+                with server._queue_lock:
+                    if server._queued >= server.backlog:
+                        server.rejected += 1
+                        overloaded = True
+                    else:
+                        server._queued += 1
+                        overloaded = False
+                if overloaded:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return False
+                with server._slots:
+                    with server._queue_lock:
+                        server._queued -= 1
+                    if server.latency:
+                        time.sleep(server.latency)
+                return True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+import time
+
+
+class IdSweep:
+    """Find inmates by probing ADC numbers directly instead of searching by name.
+
+    ADC numbers are handed out in runs, so the range [start, stop) is
+    walked in blocks of block_size numbers. A block with no known inmate is
+    first sampled with `probes` evenly spaced lookups; if none of them finds
+    an inmate the block is taken to be dead and the rest of it is skipped.
+    Every other block has all of its remaining numbers looked up. Lookups
+    go through InmateScraper's ADC number search, batch_blocks blocks at a
+    time, so with detail_workers they are pipelined, and inmates found are
+    saved like any other crawl's.
+
+    Each block's state is kept in a SQLite file (bitmap_path) as two
+    bitmaps, one bit per number: known (an inmate was found, or is already
+    in the scraper's output) and absent (no inmate has that number). A later
+    sweep looks up neither, unless refresh is set for known numbers or the
+    block was last checked more than recheck_absent_after seconds ago for
+    absent ones, so a resumed or repeated sweep only probes what it has not
+    settled.
+
+    Like lookup_inmates, a sweep needs a scraper created with
+    number_search=True.
+    """
+
+    def __init__(self, scraper, bitmap_path=None, block_size=1024, probes=8, batch_blocks=16, refresh=False,
+                 recheck_absent_after=30 * 24 * 3600):
+        if not scraper.number_search:
+            raise ValueError("IdSweep needs a scraper created with number_search=True")
+        self.scraper = scraper
+        self.block_size = block_size
+        self.probes = probes
+        self.batch_blocks = batch_blocks
+        self.refresh = refresh
+        self.recheck_absent_after = recheck_absent_after
+        self.stats = {"blocks": 0, "dead_blocks": 0, "lookups": 0, "found": 0, "absent": 0, "saved": 0,
+                      "skipped": 0}
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(bitmap_path or ":memory:", check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blocks (
+                block_size INTEGER, block INTEGER, known BLOB NOT NULL, absent BLOB NOT NULL, checked_at REAL,
+                PRIMARY KEY (block_size, block)
+            )
+        """)
+        self.conn.commit()
+
+    def _load(self, block):
+        """(known, absent) bitmaps of a block; absent comes back empty once it is due for a recheck."""
+        with self._lock:
+            row = self.conn.execute("SELECT known, absent, checked_at FROM blocks WHERE block_size = ? AND block = ?",
+                                    (self.block_size, block)).fetchone()
+        empty = bytearray(-(-self.block_size // 8))
+        if row is None:
+            return empty, bytearray(empty)
+        known, absent, checked_at = row
+        if time.time() - checked_at >= self.recheck_absent_after:
+            absent = empty
+        return bytearray(known), bytearray(absent)
+
+    def _store(self, block, known, absent):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)",
+                              (self.block_size, block, bytes(known), bytes(absent), time.time()))
+
+    @staticmethod
+    def _get(bitmap, offset):
+        return bitmap[offset >> 3] >> (offset & 7) & 1
+
+    @staticmethod
+    def _set(bitmap, offset):
+        bitmap[offset >> 3] |= 1 << (offset & 7)
+
+    def _numbers(self, block, start, stop):
+        first = block * self.block_size
+        return range(max(first, start), min(first + self.block_size, stop))
+
+    def _lookup(self, numbers, blocks):
+        """Look numbers up and record the outcome in their blocks' bitmaps."""
+        if not numbers:
+            return
+        saved, found, absent = self.scraper._lookup(numbers)
+        found = {int(inmate_id) for inmate_id in found}
+        absent = {int(inmate_id) for inmate_id in absent}
+        for number in numbers:
+            known_bits, absent_bits = blocks[number // self.block_size]
+            if number in found:
+                self._set(known_bits, number % self.block_size)
+            elif number in absent:
+                self._set(absent_bits, number % self.block_size)
+        self.stats["lookups"] += len(numbers)
+        self.stats["found"] += len(found)
+        self.stats["absent"] += len(absent)
+        self.stats["saved"] += saved
+
+    def _sweep_batch(self, block_ids, start, stop, saved_ids):
+        blocks = {block: self._load(block) for block in block_ids}
+        todo = {}
+        for block, (known, absent) in blocks.items():
+            numbers = self._numbers(block, start, stop)
+            for number in numbers:
+                if number in saved_ids:
+                    self._set(known, number % self.block_size)
+            todo[block] = [number for number in numbers
+                           if not self._get(absent, number % self.block_size)
+                           and (self.refresh or not self._get(known, number % self.block_size))]
+            self.stats["skipped"] += len(numbers) - len(todo[block])
+
+        # sample the blocks with no known inmate; the rest of one is looked up only if a sample finds an inmate
+        stride = max(1, self.block_size // self.probes)
+        unknown = {block for block, (known, _) in blocks.items() if not any(known)}
+        self._lookup([number for block in sorted(unknown) for number in todo[block] if number % stride == 0], blocks)
+        rest = []
+        for block in block_ids:
+            known, absent = blocks[block]
+            sampled = [number % self.block_size for number in self._numbers(block, start, stop) if number % stride == 0]
+            if block in unknown and sampled and not any(known) and all(self._get(absent, i) for i in sampled):
+                self.stats["dead_blocks"] += 1
+                continue
+            rest += [number for number in todo[block] if block not in unknown or number % stride]
+        self._lookup(rest, blocks)
+        for block, (known, absent) in blocks.items():
+            self._store(block, known, absent)
+
+    def run(self, start, stop):
+        """Sweep ADC numbers start to stop - 1 and return the number of inmates saved."""
+        saved_before = self.stats["saved"]
+        saved_ids = {int(inmate["inmate_id"]) for inmate in self.scraper.iter_inmates()
+                     if str(inmate["inmate_id"]).isdigit()}
+        block_ids = list(range(start // self.block_size, -(-stop // self.block_size)))
+        self.stats["blocks"] += len(block_ids)
+        for i in range(0, len(block_ids), self.batch_blocks):
+            self._sweep_batch(block_ids[i:i + self.batch_blocks], start, stop, saved_ids)
+        return self.stats["saved"] - saved_before
+
+    def report(self):
+        """Summarize the sweeps run so far."""
+        return "\n".join([
+            f"blocks: {self.stats['blocks']} ({self.stats['dead_blocks']} dead, skipped after sampling)",
+            f"lookups: {self.stats['lookups']} ({self.stats['found']} found, {self.stats['absent']} absent), "
+            f"{self.stats['skipped']} numbers already settled",
+            f"inmates saved: {self.stats['saved']}",
+        ])
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,187 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets; the last bucket is +Inf.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+class Metrics:
+    """Timers, counters and latency histograms for the crawl's stages.
+
+    Wrap a stage in `with metrics.timer("detail_fetch"):` to record its latency,
+    and an error if it raises. count() bumps a named counter, section_error()
+    counts a detail page table (GVCommitment, GVInfractions, ...) that failed
+    to parse. Updates are a lock, a bisect and a few additions, cheap enough to
+    leave on for every request.
+
+    Every `interval` seconds, and on close(), a snapshot is appended to
+    jsonl_path as one JSON object and written to prom_path in the Prometheus
+    text format (replaced atomically, for a node_exporter textfile collector).
+    """
+
+    def __init__(self, jsonl_path=None, prom_path=None, interval=60.0, prefix="inmate_scraper"):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self.prefix = prefix
+        self.started = time.time()
+        self.histograms = {}
+        self.errors = {}
+        self.counters = {}
+        self.section_errors = {}
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._last_export = time.monotonic()
+
+    def timer(self, stage):
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+        self._maybe_export()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def section_error(self, table_id, error=None):
+        """Count one failed table; matches parse_inmate_details' errors hook."""
+        with self._lock:
+            self.section_errors[table_id] = self.section_errors.get(table_id, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "time": time.time(),
+                "uptime": time.time() - self.started,
+                "stages": {
+                    stage: {
+                        "count": h.count,
+                        "errors": self.errors.get(stage, 0),
+                        "sum": h.total,
+                        "p50": h.quantile(0.5),
+                        "p99": h.quantile(0.99),
+                        "buckets": list(h.counts),
+                    }
+                    for stage, h in self.histograms.items()
+                },
+                "counters": dict(self.counters),
+                "section_errors": dict(self.section_errors),
+            }
+
+    def _maybe_export(self):
+        if time.monotonic() - self._last_export >= self.interval:
+            with self._export_lock:
+                # another thread may have exported while this one waited
+                if time.monotonic() - self._last_export >= self.interval:
+                    self._export()
+
+    def export(self):
+        """Append a JSON snapshot line and rewrite the Prometheus file now."""
+        with self._export_lock:
+            return self._export()
+
+    def _export(self):
+        """export(), with the export lock held so snapshots are written one at a time and in order."""
+        self._last_export = time.monotonic()
+        snapshot = self.snapshot()
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snapshot) + "\n")
+        if self.prom_path:
+            # a temporary file of its own, in case several processes export to the same path
+            directory, name = os.path.split(os.path.abspath(self.prom_path))
+            fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus_text(snapshot))
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, self.prom_path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+        return snapshot
+
+    def prometheus_text(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds Latency of each crawl stage.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        for stage, s in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), s["buckets"]):
+                cumulative += n
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+
+        lines += [f"# HELP {p}_stage_errors_total Stage runs that raised.", f"# TYPE {p}_stage_errors_total counter"]
+        for stage, s in sorted(snapshot["stages"].items()):
+            lines.append(f'{p}_stage_errors_total{{stage="{stage}"}} {s["errors"]}')
+
+        lines += [f"# HELP {p}_section_errors_total Detail page tables that failed to parse.",
+                  f"# TYPE {p}_section_errors_total counter"]
+        for table_id, n in sorted(snapshot["section_errors"].items()):
+            lines.append(f'{p}_section_errors_total{{section="{table_id}"}} {n}')
+
+        lines += [f"# HELP {p}_events_total Crawl event counters.", f"# TYPE {p}_events_total counter"]
+        for name, n in sorted(snapshot["counters"].items()):
+            lines.append(f'{p}_events_total{{event="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        self.export()
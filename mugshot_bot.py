@@ -1,49 +1,62 @@
+import contextlib
 import os
-import pandas as pd
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+
+from change_capture import ChangeCapture
+from checkpoint import CrawlCheckpoint
+from columnar_store import ColumnarWriter, iter_inmates as iter_columnar_inmates, load_table
+from crawl_pipeline import CrawlPipeline
+from driver_pool import start_driver
+from feature_store import FeatureStore
+from http_engine import HttpSearchEngine, InmateNotFound, search_form_fields
+from instrumentation import Metrics
+from page_parser import next_page, parse_detail_identity, parse_form_state, parse_inmate_details, parse_results_page
+from response_cache import ResponseCache, content_hash, detail_key, search_key
+from photo_store import PhotoFetcher, PhotoStore
+from query_planner import QueryPlanner, ResultsTruncated
+from result_writer import CHILD_TABLES, ResultWriter, iter_inmates, read_table
+from scheduler import RequestScheduler
+
+# Seconds a browser wait gives up after when there is no RequestScheduler to size it.
+WAIT_TIMEOUT = 10
+
+
+def _lookup_row(inmate_id):
+    """A results row for an inmate reached by ADC number; _fetch_detail fills it in from the detail page."""
+    return {"inmate_id": str(inmate_id), "postback_target": None, "photo_url": None, "last_name": "",
+            "first_name_middle_initial": "", "admitted_date": "", "lookup": True}
 
 class InmateScraper:
-    def __init__(self, output_dir="inmate_data"):
-        chrome_options = Options()
-        
-        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
-        chrome_options.add_argument(f'user-agent={user_agent}')
-        
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        
-        self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-            "userAgent": user_agent,
-            "acceptLanguage": "en-US,en;q=0.9"
-        })
-        
-        self.driver.execute_cdp_cmd('Network.setExtraHTTPHeaders', {
-            'headers': {
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Cache-Control': 'max-age=0',
-                'Connection': 'keep-alive',
-                'Sec-Ch-Ua': '"Not A(Brand";v="99", "Google Chrome";v="121", "Chromium";v="121"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"Windows"',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'Upgrade-Insecure-Requests': '1',
-                'Referer': 'https://www.google.com/'
-            }
-        })
-        
-        self.base_url = "https://inmatedatasearch.azcorrections.gov/"
+    def __init__(self, output_dir="inmate_data", engine="selenium", base_url="https://inmatedatasearch.azcorrections.gov/",
+                 detail_workers=0, rate_limiter=None, checkpoint_path=None, cache_dir=None,
+                 cache_ttl=7 * 24 * 3600, change_store=None, fast_profile=False, driver_pool=None,
+                 metrics=None, scheduler=None, output_format="csv", feature_store=None, number_search=False):
+        self.base_url = base_url
+        self.engine = engine
+        self.detail_workers = detail_workers
+        self.rate_limiter = rate_limiter
+        self.scheduler = scheduler
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown output_format {output_format!r}, expected 'csv' or 'parquet'")
+        self.output_format = output_format
+        self.number_search = number_search
+        self.driver = None
+        self.http = None
+        self.driver_pool = driver_pool
+        self.metrics = metrics
+        if scheduler is not None and scheduler.metrics is None:
+            # retries, circuit trips and limit cuts are counted with the crawl's own metrics
+            scheduler.metrics = metrics
+
+        if engine == "selenium":
+            self.driver = driver_pool.acquire() if driver_pool is not None else start_driver(fast=fast_profile)
+        elif engine == "http":
+            self.http = self._new_http_engine()
+        elif engine != "offline":
+            raise ValueError(f"Unknown engine {engine!r}, expected 'selenium', 'http' or 'offline'")
         
         self.output_dir = output_dir
         if not os.path.exists(output_dir):
@@ -52,443 +65,704 @@ class InmateScraper:
         self.photos_dir = os.path.join(output_dir, "photos")
         if not os.path.exists(self.photos_dir):
             os.makedirs(self.photos_dir)
+        self.photos = PhotoStore(self.photos_dir)
+        self.photo_fetcher = None
             
-        self.results_df = pd.DataFrame(columns=["inmate_id", "last_name", "first_name_middle_initial", "admitted_date", "photo_filename"])
+        self.checkpoint = CrawlCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.cache = ResponseCache(cache_dir, ttl=cache_ttl) if cache_dir else None
+        self.changes = None
+        if change_store:
+            self.changes = ChangeCapture(change_store, os.path.join(output_dir, "changes.jsonl"))
+        self.features = FeatureStore(feature_store) if feature_store else None
+        self._page_hashes = {}
+        self.writer = self._open_writer()
+    
+    def _open_writer(self):
+        """Open the result writer, resuming the checkpoint's output files if there is one.
+        
+        With a response cache or a change store the crawl is incremental: inmates.csv
+        is appended to like the child tables, and only inmates whose detail page
+        changed are written.
+        """
+        incremental = self.cache is not None or self.changes is not None
+        overwrite = () if incremental else ("inmates",)
+        if self.checkpoint is None:
+            return self._new_writer(overwrite)
+        
+        sizes = self.checkpoint.committed_sizes()
+        writer = self._new_writer(() if sizes else overwrite)
+        if sizes:
+            print(f"Resuming crawl from {self.checkpoint.path}")
+            writer.truncate(sizes)
+        else:
+            writer.start_fresh()
+            self.checkpoint.commit([], writer.file_sizes())
+        return writer
+    
+    def _new_writer(self, overwrite):
+        """A ResultWriter (CSV) or, with output_format="parquet", a ColumnarWriter."""
+        if self.output_format == "parquet":
+            return ColumnarWriter(self.output_dir, overwrite=overwrite, on_flush=self._on_flush, metrics=self.metrics)
+        return ResultWriter(self.output_dir, overwrite=overwrite, on_flush=self._on_flush)
+    
+    def _on_flush(self, inmate_ids, file_sizes):
+        if self.checkpoint is not None:
+            self.checkpoint.commit(inmate_ids, file_sizes)
+        if self.cache is not None:
+            hashes = {inmate_id: self._page_hashes.pop(inmate_id)
+                      for inmate_id in inmate_ids if inmate_id in self._page_hashes}
+            self.cache.record_hashes(hashes)
+        if self.changes is not None:
+            self.changes.commit(inmate_ids)
+        if self.features is not None:
+            self.features.commit(inmate_ids)
+    
+    def _new_http_engine(self):
+        return HttpSearchEngine(self.base_url, rate_limiter=self.rate_limiter, scheduler=self.scheduler)
+    
+    def _timed(self, stage):
+        """Time a crawl stage on the metrics, if any."""
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.timer(stage)
+    
+    def _count(self, name, n=1):
+        if self.metrics is not None:
+            self.metrics.count(name, n)
+    
+    def _throttle(self):
+        """Wait for the shared rate limiter before a browser request."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+    
+    def _wait(self, endpoint):
+        """A WebDriverWait as long as the scheduler's timeout for endpoint (WAIT_TIMEOUT without one)."""
+        timeout = self.scheduler.timeout(endpoint) if self.scheduler is not None else WAIT_TIMEOUT
+        return WebDriverWait(self.driver, timeout)
+    
+    def _browser_request(self, endpoint, action, stale=None):
+        """Run a browser action that loads a page and wait until the page has loaded.
+        
+        stale is an element of the current page, which goes stale once a postback
+        replaces the page. With a scheduler the action counts as one request to
+        endpoint; it is not retried, since a click cannot be replayed blindly, so a
+        timeout fails the search key instead (and a checkpoint retries it). Timed out
+        waits are counted as wait_timeouts on the metrics.
+        """
+        def request():
+            self._throttle()
+            action()
+            wait = self._wait(endpoint)
+            try:
+                if stale is not None:
+                    wait.until(EC.staleness_of(stale))
+                wait.until(lambda driver: driver.execute_script("return document.readyState") != "loading")
+            except TimeoutException:
+                self._count("wait_timeouts")
+                raise
+        
+        if self.scheduler is None:
+            return request()
+        return self.scheduler.call(endpoint, request, retries=0)
     
     def search_inmates(self, last_names, first_initials, gender="Male", status="Active"):
-        self.driver.get(self.base_url)
+        """Search every last name / first initial pair and stream the inmates to inmates.csv.
+        
+        Returns the number of inmates found; read them back with iter_inmates().
+        """
+        keys = [(last_name, first_initial, gender, status)
+                for last_name in last_names for first_initial in first_initials]
+        return self.search_keys(keys)
+    
+    def search_keys(self, keys):
+        """Run one search per (last_name, first_initial, gender, status) key.
+        
+        With detail_workers > 0 the crawl runs as a CrawlPipeline: every results page
+        is harvested first and detail pages are fetched by that many workers.
+        With a checkpoint, keys already done are skipped and failed keys are
+        retried up to the checkpoint's max_attempts.
+        """
+        if self.checkpoint is not None:
+            self.checkpoint.add_keys(keys)
+            keys = self.checkpoint.pending_keys(keys)
         
-        for last_name in last_names:
-            for first_initial in first_initials:
-                print(f"Searching for {last_name}, {first_initial}")
+        if self.detail_workers > 0:
+            found = CrawlPipeline(self, workers=self.detail_workers).run(keys)
+            self.writer.flush()
+            return found
+        
+        found = 0
+        for key in keys:
+            last_name, first_initial, gender, status = key
+            print(f"Searching for {last_name}, {first_initial}")
+            
+            self._start_key(key)
+            try:
+                inmates = self._perform_search(last_name, first_initial, gender, status)
+                found += len(inmates)
+                self._finish_key(key)
                 
-                try:
-                    inmates = self._perform_search(last_name, first_initial, gender, status)
-                    
-                    for inmate in inmates:
-                        self.results_df = pd.concat([self.results_df, pd.DataFrame([inmate])], ignore_index=True)
-                    
-                    self.results_df.to_csv(os.path.join(self.output_dir, "inmates.csv"), index=False)
-                    
-                except Exception as e:
-                    print(f"Error searching for {last_name}, {first_initial}: {e}")
+            except Exception as e:
+                print(f"Error searching for {last_name}, {first_initial}: {e}")
+                self._finish_key(key, error=e)
         
-        return self.results_df
+        self.writer.flush()
+        return found
     
-    def _perform_search(self, last_name, first_initial, gender, status):
-        self.driver.get(self.base_url)
+    def _start_key(self, key):
+        if self.checkpoint is not None:
+            self.checkpoint.start_key(key)
+    
+    def _finish_key(self, key, error=None):
+        """Flush the key's inmates, then mark it done (or failed) in the checkpoint."""
+        if self.checkpoint is None:
+            return
+        self.writer.flush()
+        if error is None:
+            self.checkpoint.finish_key(key)
+        else:
+            self.checkpoint.fail_key(key, error)
+    
+    def iter_inmates(self):
+        """Yield every inmate written to inmates.csv so far, one dict at a time."""
+        self.writer.flush()
+        if self.output_format == "parquet":
+            return iter_columnar_inmates(self.output_dir)
+        return iter_inmates(self.output_dir)
+    
+    @property
+    def results_df(self):
+        """inmates.csv loaded as a DataFrame, one row per inmate; prefer iter_inmates for large crawls."""
+        self.writer.flush()
+        if self.output_format == "parquet":
+            return load_table(self.output_dir, "inmates", latest=True).drop(columns="crawl_date")
+        return read_table(self.output_dir, "inmates")
+    
+    def _open_search_form(self):
+        """Bring up the name search form and return its last name input.
         
-        try:
-            search_by_name_btn = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//input[@value='Search by Name']"))
-            )
-            search_by_name_btn.click()
-            
-            last_name_input = WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_element_located((By.XPATH, "//input[@name='txtLName']"))
-            )
+        Results pages keep the form, so a warm driver searches again from where it
+        is instead of reloading the landing page.
+        """
+        inputs = self.driver.find_elements(By.XPATH, "//input[@name='txtLName']")
+        if inputs and inputs[0].is_displayed():
+            return inputs[0]
+        
+        self._browser_request("search", lambda: self.driver.get(self.base_url))
+        
+        search_by_name_btn = self._wait("search").until(
+            EC.element_to_be_clickable((By.XPATH, "//input[@value='Search by Name']"))
+        )
+        self._browser_request("search", search_by_name_btn.click, stale=search_by_name_btn)
+        
+        return self._wait("search").until(
+            EC.visibility_of_element_located((By.XPATH, "//input[@name='txtLName']"))
+        )
+    
+    def _submit_search_form(self, last_name, first_initial, gender, status):
+        """Open the name search form in the browser, submit it and wait for the results page to load."""
+        last_name_input = self._open_search_form()
+        
+        last_name_input.clear()
+        last_name_input.send_keys(last_name)
+        
+        first_initial_input = self.driver.find_element(By.XPATH, "//input[@name='txtFName']")
+        first_initial_input.clear()
+        first_initial_input.send_keys(first_initial)
+        
+        if gender == "Male":
+            self.driver.find_element(By.XPATH, "//input[@value='Male']").click()
+        else:
+            self.driver.find_element(By.XPATH, "//input[@value='Female']").click()
             
-            last_name_input.clear()
-            last_name_input.send_keys(last_name)
+        if status == "Active":
+            self.driver.find_element(By.XPATH, "//input[@value='Active']").click()
+        else:
+            self.driver.find_element(By.XPATH, "//input[@value='Inactive']").click()
+        
+        search_btn = self.driver.find_element(By.XPATH, "//input[@value='Search']")
+        self._browser_request("search", search_btn.click, stale=search_btn)
+    
+    def _harvest_search(self, last_name, first_initial, gender, status, truncation_limit=None, pages=None):
+        """Yield (row, results_state) for every row on every results page of one search.
+        
+        results_state is the form state of the page the row came from, which is all
+        HttpSearchEngine.inmate_details needs to open the row's detail page later.
+        With truncation_limit, a search whose first page shows it reaches that many
+        rows raises ResultsTruncated instead of walking the pages. pages, if given,
+        is a list the number of every results page read is appended to.
+        """
+        search_fields = search_form_fields(last_name, first_initial, gender, status)
+        if self.http is not None:
+            with self._timed("search_submit"):
+                html = self._cached_results_page(
+                    (last_name, first_initial, gender, status), 1,
+                    lambda: self.http.search(last_name, first_initial, gender, status))
+        else:
+            with self._timed("search_submit"):
+                self._submit_search_form(last_name, first_initial, gender, status)
+            html = self.driver.page_source
+        
+        page_count = 0
+        while True:
+            if pages is not None:
+                pages.append(page_count + 1)
+            results = parse_results_page(html)
+            if results is None:
+                print(f"No results found for {last_name}, {first_initial}")
+                return
+            rows, pager = results
+            if truncation_limit and page_count == 0 and len(rows) * max(len(pager), 1) >= truncation_limit:
+                raise ResultsTruncated(rows, len(pager))
             
-            first_initial_input = self.driver.find_element(By.XPATH, "//input[@name='txtFName']")
-            first_initial_input.clear()
-            first_initial_input.send_keys(first_initial)
+            state = dict(parse_form_state(html), **search_fields)
+            for row in rows:
+                yield row, state
             
-            if gender == "Male":
-                self.driver.find_element(By.XPATH, "//input[@value='Male']").click()
-            else:
-                self.driver.find_element(By.XPATH, "//input[@value='Female']").click()
-                
-            if status == "Active":
-                self.driver.find_element(By.XPATH, "//input[@value='Active']").click()
-            else:
-                self.driver.find_element(By.XPATH, "//input[@value='Inactive']").click()
+            page_link = next_page(pager, page_count)
+            if page_link is None or page_link[1] is None:
+                print(f"No more pages to process. Total pages processed: {page_count + 1}")
+                return
+            page_count += 1
             
-            self.driver.find_element(By.XPATH, "//input[@value='Search']").click()
+            with self._timed("results_page"):
+                if self.http is not None:
+                    html = self._cached_results_page(
+                        (last_name, first_initial, gender, status), page_count + 1,
+                        lambda: self.http.results_page(*page_link[1]))
+                else:
+                    table = self.driver.find_element(By.XPATH, "//table[@id='gvInmate']")
+                    self._browser_request(
+                        "results_page",
+                        lambda: self.driver.execute_script("__doPostBack(arguments[0], arguments[1]);", *page_link[1]),
+                        stale=table)
+                    html = self.driver.page_source
+    
+    def _cached_results_page(self, key, page_number, fetch):
+        """Return a results page from the response cache, or fetch and cache it.
+        
+        On a hit the HTTP engine is pointed at the cached page's form state, so the
+        next pager postback continues from it.
+        """
+        if self.cache is None:
+            return fetch()
+        cache_key = search_key(*key, page_number)
+        html = self.cache.get(cache_key)
+        if html is None:
+            html = fetch()
+            self.cache.put(cache_key, html)
+        else:
+            self._count("cache_hits")
+            self.http.restore_results_page(html, search_form_fields(*key))
+        return html
+    
+    def _fetch_detail(self, engine, row, state, retries=None):
+        """Return a row's detail page HTML from the response cache, or fetch and cache it.
+        
+        A lookup row (see lookup_inmates) is fetched by ADC number search and
+        filled in with the name, photo and admission date on its detail page;
+        InmateNotFound is raised when there is no such inmate.
+        """
+        html = self.cache.get(detail_key(row["inmate_id"])) if self.cache is not None else None
+        fetched = html is None
+        if fetched:
+            with self._timed("detail_fetch"):
+                if row.get("lookup"):
+                    html = engine.lookup(row["inmate_id"], retries=retries)
+                else:
+                    html = engine.inmate_details(row["postback_target"], state=state, retries=retries)
+        else:
+            self._count("cache_hits")
+        if row.get("lookup"):
+            identity = parse_detail_identity(html)
+            if identity is None:
+                raise InmateNotFound(row["inmate_id"])
+            row.update(identity)
+        if fetched:
+            # a hit is left as stored, so its fetched_at keeps counting towards the TTL
+            self._cache_detail(row, html)
+        return html
+    
+    def _cache_detail(self, row, html):
+        if self.cache is not None:
+            summary = {k: row[k] for k in ("last_name", "first_name_middle_initial", "admitted_date", "photo_url")}
+            self.cache.put(detail_key(row["inmate_id"]), html, meta=summary)
+    
+    def _detail_unchanged(self, inmate_id, html):
+        """True if the inmate was already saved from a detail page with the same content."""
+        unchanged = (
+            (self.cache is not None and self.cache.is_unchanged(inmate_id, html))
+            or (self.changes is not None and self.changes.is_unchanged(inmate_id, content_hash(html)))
+        )
+        if not unchanged:
+            return False
+        print(f"Inmate {inmate_id} unchanged since the last crawl, skipping")
+        self._count("inmates_unchanged")
+        return True
+    
+    def _session_cookies(self):
+        """Snapshot the search session's cookies for HTTP detail fetchers."""
+        if self.http is not None:
+            return self.http.session.cookies.copy()
+        return self.driver.get_cookies()
+    
+    def _perform_search(self, last_name, first_initial, gender, status):
+        if self.http is not None:
+            return self._perform_http_search(last_name, first_initial, gender, status)
+        
+        try:
+            with self._timed("search_submit"):
+                self._submit_search_form(last_name, first_initial, gender, status)
             
             inmates = []
             page_count = 0
             
             while True:
-                try:
-                    table = WebDriverWait(self.driver, 5).until(
+                # the results page has loaded by now, so a missing table means there are no rows
+                tables = self.driver.find_elements(By.XPATH, "//table[@id='gvInmate']")
+                if not tables:
+                    print(f"No results found for {last_name}, {first_initial}")
+                    break
+                table = tables[0]
+                
+                rows = table.find_elements(By.XPATH, "//tr[@class='GridViewRow']")
+                num_rows = len(rows)
+                
+                for i in range(num_rows):
+                    table = self._wait("results_page").until(
                         EC.presence_of_element_located((By.XPATH, "//table[@id='gvInmate']"))
                     )
-                    
                     rows = table.find_elements(By.XPATH, "//tr[@class='GridViewRow']")
-                    num_rows = len(rows)
-                    
-                    for i in range(num_rows):
-                        table = WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.XPATH, "//table[@id='gvInmate']"))
-                        )
-                        rows = table.find_elements(By.XPATH, "//tr[@class='GridViewRow']")
-                        cells = rows[i].find_elements(By.TAG_NAME, "td")[1:]
-                        if len(cells) >= 5:
-                            try:
-                                inmate_id_link = cells[0].find_element(By.TAG_NAME, "a")
-                                inmate_id = inmate_id_link.text.strip()
-                                
-                            except Exception as e:
-                                print(f"Error accessing inmate details for {inmate_id}: {e}")
-                                inmate_id = cells[0].text.strip()
-                                photo_filename = None
+                    cells = rows[i].find_elements(By.TAG_NAME, "td")[1:]
+                    if len(cells) >= 5:
+                        try:
+                            inmate_id_link = cells[0].find_element(By.TAG_NAME, "a")
+                            inmate_id = inmate_id_link.text.strip()
                             
-                            try:
-                                photo_element = cells[1].find_element(By.TAG_NAME, "input")
-                                photo_url = photo_element.get_attribute("src")
-                                photo_filename = f"{inmate_id}.jpg"
-                                self._download_photo(photo_url, photo_filename)
-                            except Exception:
-                                print(f"No inmate photo for inmate {inmate_id}")
-                                photo_filename = "None"
-                            
-                            last_name = cells[2].text.strip()
-                            first_name_middle_initial = cells[3].text.strip()
-                            admitted_date = cells[4].text.strip()
-                            
-                            print(f"Navigating to detailed page for inmate {inmate_id}")
-                            inmate_id_link.click()
+                        except Exception as e:
+                            print(f"Error accessing inmate details for {inmate_id}: {e}")
+                            inmate_id = cells[0].text.strip()
+                        
+                        if self._already_saved(inmate_id):
+                            print(f"Skipping inmate {inmate_id}, already saved in this crawl")
+                            continue
+                        
+                        photo_url = None
+                        photo = None
+                        try:
+                            photo_element = cells[1].find_element(By.TAG_NAME, "input")
+                            photo_url = photo_element.get_attribute("src")
+                            photo = self._queue_photo(inmate_id, photo_url)
+                        except Exception:
+                            print(f"No inmate photo for inmate {inmate_id}")
+                        
+                        last_name = cells[2].text.strip()
+                        first_name_middle_initial = cells[3].text.strip()
+                        admitted_date = cells[4].text.strip()
+                        
+                        print(f"Navigating to detailed page for inmate {inmate_id}")
+                        with self._timed("detail_fetch"):
+                            self._browser_request("detail", inmate_id_link.click, stale=inmate_id_link)
                             
                             # Wait for detailed page to load (look for first info table)
-                            WebDriverWait(self.driver, 10).until(
+                            self._wait("detail").until(
                                 EC.presence_of_element_located((By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GridView8']"))
                             )
                             
+                            detail_html = self.driver.page_source
+                        self._cache_detail({
+                            "inmate_id": inmate_id,
+                            "last_name": last_name,
+                            "first_name_middle_initial": first_name_middle_initial,
+                            "admitted_date": admitted_date,
+                            "photo_url": photo_url,
+                        }, detail_html)
+                        unchanged = self._detail_unchanged(inmate_id, detail_html)
+                        if not unchanged:
                             print(f"Collecting detailed inmate information for inmate {inmate_id}")
-                            detailed_info = self._collect_inmate_details()
-                            
-                            # Save detailed information to respective CSV files
-                            self._save_detailed_info(inmate_id, detailed_info)
-                            
-                            # Go back to search results using browser history
-                            self._go_back()
-                                                        
-                            inmate_data = {
-                                "inmate_id": inmate_id,
-                                "last_name": last_name,
-                                "first_name_middle_initial": first_name_middle_initial,
-                                "admitted_date": admitted_date,
-                                "photo_filename": photo_filename
-                            }
-                            inmate_data.update(detailed_info['basic_info'])
-                            
-                            inmates.append(inmate_data)
-                            print(f"Found inmate: {first_name_middle_initial} {last_name} (ID: {inmate_id})")
-                    try:
-                        table = WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.XPATH, "//table[@id='gvInmate']"))
-                        )                    
-                        page_table = table.find_element(By.XPATH, "//td[@colspan='6']")
-                        page_links = page_table.find_elements(By.TAG_NAME, "td")
-                        if page_links[page_count].text.strip() != str(page_count + 1) or page_count >= len(page_links) - 1:
-                            print(f"No more pages to process. Total pages processed: {page_count + 1}")
-                            break
-                        else:
-                            page_count += 1
-                            next_page_btn = self.driver.find_element(By.XPATH, f"//a[contains(text(), '{page_count + 1}')]")
-                            next_page_btn.click()
-                    except Exception:
-                        break
-
-                except Exception as e:
-                    print(f"No results found or error: {e}")
+                            detailed_info = self._collect_inmate_details(detail_html)
+                        
+                        # Go back to search results using browser history
+                        self._go_back()
+                        if unchanged:
+                            if photo is not None:
+                                photo.cancel()
+                            continue
+                        
+                        inmate_data = {
+                            "inmate_id": inmate_id,
+                            "last_name": last_name,
+                            "first_name_middle_initial": first_name_middle_initial,
+                            "admitted_date": admitted_date,
+                            "photo_filename": photo.result() if photo is not None else "None"
+                        }
+                        inmate_data.update(detailed_info['basic_info'])
+                        
+                        # Save the inmate and its detailed information to the CSV files
+                        self._save_inmate(inmate_data, detailed_info, page_hash=content_hash(detail_html))
+                        inmates.append(inmate_data)
+                        print(f"Found inmate: {first_name_middle_initial} {last_name} (ID: {inmate_id})")
+                table = self._wait("results_page").until(
+                    EC.presence_of_element_located((By.XPATH, "//table[@id='gvInmate']"))
+                )
+                # a single page of results has no pager row; any other failure fails the key
+                page_tables = table.find_elements(By.XPATH, "//td[@colspan='6']")
+                page_links = page_tables[0].find_elements(By.TAG_NAME, "td") if page_tables else []
+                if (page_count >= len(page_links) - 1
+                        or page_links[page_count].text.strip() != str(page_count + 1)):
+                    print(f"No more pages to process. Total pages processed: {page_count + 1}")
                     break
+                else:
+                    page_count += 1
+                    next_page_btn = self.driver.find_element(By.XPATH, f"//a[contains(text(), '{page_count + 1}')]")
+                    with self._timed("results_page"):
+                        self._browser_request("results_page", next_page_btn.click, stale=table)
             
             return inmates
             
         except Exception as e:
             print(f"Error during search: {e}")
-            return []
+            self._count("search_errors")
+            raise
     
-    def _download_photo(self, url, filename):
+    def _perform_http_search(self, last_name, first_initial, gender, status):
+        """Same walk as _perform_search, replayed as postbacks on the HTTP engine."""
         try:
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[1])
-            self.driver.get(url)
-            
-            img_element = self.driver.find_element(By.TAG_NAME, "img")
-            img_element.screenshot(os.path.join(self.photos_dir, filename))
+            inmates = []
+            for row, state in self._harvest_search(last_name, first_initial, gender, status):
+                if self._already_saved(row["inmate_id"]):
+                    print(f"Skipping inmate {row['inmate_id']}, already saved in this crawl")
+                    continue
+                inmate_data = self._save_row(self.http, row, state)
+                if inmate_data is not None:
+                    inmates.append(inmate_data)
             
-            self.driver.close()
-            self.driver.switch_to.window(self.driver.window_handles[0])
+            return inmates
             
-            print(f"Downloaded photo: {filename}")
-            return True
         except Exception as e:
-            print(f"Error downloading photo {filename}: {e}")
-            if len(self.driver.window_handles) > 1:
-                self.driver.close()
-                self.driver.switch_to.window(self.driver.window_handles[0])
-            return False
+            print(f"Error during search: {e}")
+            raise
     
-    def close(self):
-        self.driver.quit()
-
-    def _collect_inmate_details(self):
-        """Collect all detailed information from the inmate's page."""
-        details = {
-            'basic_info': {},
-            'sentences': [],
-            'infractions': [],
-            'appeals': [],
-            'classifications': [],
-            'work_programs': [],
-            'detainers': [],
-            'parole_actions': []
+    def _save_row(self, engine, row, state):
+        """Fetch, parse and save one harvested results row; returns its inmates.csv record, or None if unchanged."""
+        inmate_id = row["inmate_id"]
+        print(f"Navigating to detailed page for inmate {inmate_id}")
+        detail_html = self._fetch_detail(engine, row, state)
+        if self._detail_unchanged(inmate_id, detail_html):
+            return None
+        
+        photo = None
+        if row["photo_url"]:
+            photo = self._queue_photo(inmate_id, row["photo_url"])
+        else:
+            print(f"No inmate photo for inmate {inmate_id}")
+        
+        print(f"Collecting detailed inmate information for inmate {inmate_id}")
+        detailed_info = self._collect_inmate_details(detail_html)
+        
+        inmate_data = {
+            "inmate_id": inmate_id,
+            "last_name": row["last_name"],
+            "first_name_middle_initial": row["first_name_middle_initial"],
+            "admitted_date": row["admitted_date"],
+            "photo_filename": photo.result() if photo is not None else "None"
         }
+        inmate_data.update(detailed_info['basic_info'])
+        
+        self._save_inmate(inmate_data, detailed_info, page_hash=content_hash(detail_html))
+        print(f"Found inmate: {row['first_name_middle_initial']} {row['last_name']} (ID: {inmate_id})")
+        return inmate_data
+    
+    def crawl_rows(self, rows):
+        """Fetch and save the detail pages of a stream of harvested (row, results_state) pairs.
+        
+        Used by QueryPlanner, which harvests its own results pages. Detail pages are
+        posted over HTTP, so under the Selenium engine they go through an HTTP session
+        carrying the browser's cookies. Returns the number of inmates saved.
+        """
+        return self._crawl_rows(rows)[0]
+    
+    def lookup_inmates(self, inmate_ids):
+        """Fetch and save inmates by ADC number, without a name search.
+        
+        Each detail page is reached with one number search POST instead of a
+        name search and a click, and with detail_workers > 0 the lookups are
+        pipelined like any other detail fetch. Numbers with no inmate are
+        skipped. Returns the number of inmates saved.
+        
+        The number search form's control names are not verified against the
+        live site (see http_engine.NUMBER_SEARCH_TARGET), so lookups need the
+        scraper to be created with number_search=True.
+        """
+        return self._lookup(inmate_ids)[0]
+    
+    def _lookup(self, inmate_ids):
+        """lookup_inmates, returning (saved, inmate_ids found, inmate_ids with no inmate)."""
+        if not self.number_search:
+            raise ValueError("ADC number lookups need number_search=True (the number search form is unverified)")
+        return self._crawl_rows((_lookup_row(inmate_id), None) for inmate_id in inmate_ids)
+    
+    def _crawl_rows(self, rows):
+        """crawl_rows, returning (saved, inmate_ids found, inmate_ids with no inmate) for lookup rows too."""
+        if self.detail_workers > 0:
+            pipeline = CrawlPipeline(self, workers=self.detail_workers)
+            saved = pipeline.run(rows=rows)
+            self.writer.flush()
+            return saved, pipeline.found, pipeline.absent
         
+        engine = self.http
+        saved = 0
+        found, absent = set(), set()
         try:
-            try:
-                basic_info_table_1 = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GridView8']")
-                basic_info_row_1 = basic_info_table_1.find_element(By.XPATH, ".//tr[@class='GridViewRow']")
-                cells = basic_info_row_1.find_elements(By.TAG_NAME, "td")
-                details['basic_info'] = {
-                    'gender': cells[0].text.strip(),
-                    'height': cells[1].text.strip(),
-                    'weight': cells[2].text.strip(),
-                    'hair_color': cells[3].text.strip()
-                }
-            except Exception as e:
-                print(f"Error collecting first row info: {e}")
-                
-            try:
-                basic_info_table_2 = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GridView9']")
-                basic_info_row_2 = basic_info_table_2.find_element(By.XPATH, ".//tr[@class='GridViewRow']")
-                cells = basic_info_row_2.find_elements(By.TAG_NAME, "td")
-                details['basic_info'].update({
-                    'eye_color': cells[0].text.strip(),
-                    'ethnic_origin': cells[1].text.strip(),
-                    'custody_class': cells[2].text.strip(),
-                    'admission': cells[3].text.strip(),
-                })
-            except Exception as e:
-                print(f"Error collecting second row info: {e}")
-            
-            try:
-                basic_info_table_3 = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GridView11']")
-                basic_info_row_3 = basic_info_table_3.find_element(By.XPATH, ".//tr[@class='GridViewRow']")
-                cells = basic_info_row_3.find_elements(By.TAG_NAME, "td")
-                details['basic_info'].update({
-                    'release_date': cells[0].text.strip(),
-                    'release_type': cells[1].text.strip()
-                })
-            except Exception as e:
-                print(f"Error collecting third row info: {e}")
-                
-            try:
-                basic_info_table_4 = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GridView12']")
-                basic_info_row_4 = basic_info_table_4.find_element(By.XPATH, ".//tr[@class='GridViewRow']")
-                cells = basic_info_row_4.find_elements(By.TAG_NAME, "td")
-                details['basic_info'].update({
-                    'complex': cells[0].text.strip(),
-                    'unit': cells[1].text.strip(),
-                    'last_movement': cells[2].text.strip(),
-                    'status': cells[3].text.strip()
-                })
-            except Exception as e:
-                print(f"Error collecting fourth row info: {e}")
-                
-        except Exception as e:
-            print(f"Error collecting inmate details: {e}")
-
-        # Helper function to get record count from section header
-        def get_record_count(section_id):
-            try:
-                header = self.driver.find_element(By.XPATH, f"//span[@id='lbl{section_id}']")
-                count_text = header.text.strip()
-                return int(count_text.split()[0])
-            except Exception:
-                return 0
-
-        # Sentences
-        sentence_count = get_record_count('Commit')
-        if sentence_count > 0:
-            try:
-                sentence_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVCommitment']")
-                sentence_rows = sentence_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in sentence_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['sentences'].append({
-                        'commit_num': cells[0].text.strip(),
-                        'sentence_length': cells[1].text.strip(),
-                        'county': cells[2].text.strip(),
-                        'cause_num': cells[3].text.strip(),
-                        'offense_date': cells[4].text.strip(),
-                        'sentence_date': cells[5].text.strip(),
-                        'sentence_status': cells[6].text.strip(),
-                        'crime': cells[7].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting inmate sentences: {e}")
-
-        # Infractions
-        infraction_count = get_record_count('Infraction')
-        if infraction_count > 0:
-            try:
-                infraction_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVInfractions']")
-                infraction_rows = infraction_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in infraction_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['infractions'].append({
-                        'violation_date': cells[0].text.strip(),
-                        'infraction': cells[1].text.strip(),
-                        'verdict_date': cells[2].text.strip(),
-                        'verdict': cells[3].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting inmate infractions: {e}")
-
-        # Disciplinary Appeals
-        appeal_count = get_record_count('Outcome')
-        if appeal_count > 0:
-            try:
-                appeal_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVAppeal']")
-                appeal_rows = appeal_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in appeal_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['appeals'].append({
-                        'appeal_date': cells[0].text.strip(),
-                        'outcome': cells[1].text.strip(),
-                        'as_of_date': cells[2].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting disciplinary appeals: {e}")
-
-        # Classifications
-        class_count = get_record_count('Profile')
-        if class_count > 0:
-            try:
-                class_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVProfileClass']")
-                class_rows = class_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in class_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['classifications'].append({
-                        'complete_date': cells[0].text.strip(),
-                        'classification_type': cells[1].text.strip(),
-                        'custody_risk': cells[2].text.strip(),
-                        'internal_risk': cells[3].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting inmate classifications: {e}")
-
-        # Parole Actions
-        parole_count = get_record_count('ParolAction')
-        if parole_count > 0:
-            try:
-                parole_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVParoleAction']")
-                parole_rows = parole_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in parole_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['parole_actions'].append({
-                        'hearing_date': cells[0].text.strip(),
-                        'statute': cells[1].text.strip(),
-                        'action': cells[2].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting parole actions: {e}")
-
-        # Work Programs
-        work_count = get_record_count('Work')
-        if work_count > 0:
-            try:
-                work_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVWorkProgram']")
-                work_rows = work_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in work_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['work_programs'].append({
-                        'assigned_date': cells[0].text.strip(),
-                        'completed_date': cells[1].text.strip(),
-                        'work_assignment': cells[2].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting inmate work programs: {e}")
-
-        # Detainers
-        detainer_count = get_record_count('Detainer')
-        if detainer_count > 0:
-            try:
-                detainer_table = self.driver.find_element(By.XPATH, ".//table[contains(@class, 'BorderGridView') and @id='GVDetainer']")
-                detainer_rows = detainer_table.find_elements(By.XPATH, ".//tr[@class='GridViewRow']")
-                for row in detainer_rows:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    details['detainers'].append({
-                        'detainer_date': cells[0].text.strip(),
-                        'detainer_type': cells[1].text.strip(),
-                        'charges': cells[2].text.strip(),
-                        'authority': cells[3].text.strip(),
-                        'agreement_date': cells[4].text.strip()
-                    })
-            except Exception as e:
-                print(f"Error collecting inmate detainers: {e}")
+            for row, state in rows:
+                if self._already_saved(row["inmate_id"]):
+                    continue
+                if engine is None:
+                    engine = self._new_http_engine()
+                    engine.copy_cookies(self._session_cookies())
+                try:
+                    if self._save_row(engine, row, state) is not None:
+                        saved += 1
+                    found.add(row["inmate_id"])
+                except InmateNotFound:
+                    absent.add(row["inmate_id"])
+                except Exception as e:
+                    print(f"Error fetching detailed page for inmate {row['inmate_id']}: {e}")
+        finally:
+            if engine is not None and engine is not self.http:
+                engine.close()
+        self.writer.flush()
+        return saved, found, absent
+    
+    def reparse_from_cache(self):
+        """Rebuild every output table from the detail pages in the response cache.
+        
+        Nothing is fetched, so a parser or schema change can be applied to a whole
+        crawl offline (engine="offline"). Photos already on disk are kept.
+        Returns the number of inmates written.
+        """
+        if self.cache is None:
+            raise ValueError("reparse_from_cache needs a cache_dir")
+        self.writer.close()
+        self.writer = self._new_writer(["inmates", *CHILD_TABLES])
+        self.writer.start_fresh()
+        
+        count = 0
+        for inmate_id, html, meta in self.cache.iter_details():
+            detailed_info = self._collect_inmate_details(html)
+            photo_filename = self.photos.filename(inmate_id) or "None"
+            inmate_data = {
+                "inmate_id": inmate_id,
+                "last_name": meta.get("last_name", ""),
+                "first_name_middle_initial": meta.get("first_name_middle_initial", ""),
+                "admitted_date": meta.get("admitted_date", ""),
+                "photo_filename": photo_filename
+            }
+            inmate_data.update(detailed_info['basic_info'])
+            self._save_inmate(inmate_data, detailed_info, page_hash=content_hash(html))
+            count += 1
+        self.writer.flush()
+        return count
+    
+    def _queue_photo(self, inmate_id, url):
+        """Start downloading an inmate's photo in the background and return a future for its file name.
+        
+        Photos are fetched as raw bytes on their own pooled HTTP session, which
+        carries the browser's cookies when the Selenium engine is active.
+        """
+        if self.photo_fetcher is None:
+            engine = self._new_http_engine()
+            if self.driver is not None:
+                engine.copy_cookies(self.driver.get_cookies())
+            self.photo_fetcher = PhotoFetcher(self.photos, engine, metrics=self.metrics)
+        return self.photo_fetcher.submit(inmate_id, url)
+    
+    def close(self):
+        if self.photo_fetcher is not None:
+            self.photo_fetcher.close()
+        self.photos.close()
+        self.writer.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.changes is not None:
+            self.changes.close()
+        if self.features is not None:
+            self.features.close()
+        if self.metrics is not None:
+            self.metrics.export()
+        if self.driver is not None:
+            if self.driver_pool is not None:
+                self.driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
+        if self.http is not None:
+            self.http.close()
 
-        return details
+    def _collect_inmate_details(self, html=None):
+        """Collect all detailed information from the inmate's page (the browser's current page by default)."""
+        if html is None:
+            html = self.driver.page_source
+        errors = self.metrics.section_error if self.metrics is not None else None
+        with self._timed("parse"):
+            return parse_inmate_details(html, errors=errors)
+    
+    def _save_inmate(self, inmate_data, details, page_hash=None):
+        """Write an inmate's child table rows, then its inmates.csv row.
+        
+        page_hash, the content_hash of the detail page, is recorded in the response
+        cache once the rows are flushed. With a change store the inmate is diffed
+        against its last known state, and the changes are logged at the same flush.
+        With a feature store the inmate's features are updated at that flush too.
+        """
+        with self._timed("persist"):
+            if page_hash is not None and self.cache is not None:
+                self._page_hashes[inmate_data["inmate_id"]] = page_hash
+            if self.changes is not None:
+                self.changes.capture(inmate_data, details, page_hash=page_hash)
+            self._save_detailed_info(inmate_data["inmate_id"], details)
+            self.writer.write_inmate(inmate_data)
+            if self.features is not None:
+                self.features.update(inmate_data, details)
+        self._count("inmates_saved")
+    
+    def _already_saved(self, inmate_id):
+        """True if a checkpointed crawl has already saved this inmate."""
+        if self.checkpoint is None:
+            return False
+        return self.checkpoint.is_committed(inmate_id) or inmate_id in self.writer.pending_ids
     
     def _save_detailed_info(self, inmate_id, details):
         """Save detailed information to respective CSV files."""
         try:
-            # Create DataFrames for each type of information
-            sentences_df = pd.DataFrame(details['sentences'])
-            infractions_df = pd.DataFrame(details['infractions'])
-            appeals_df = pd.DataFrame(details['appeals'])
-            classifications_df = pd.DataFrame(details['classifications'])
-            work_programs_df = pd.DataFrame(details['work_programs'])
-            detainers_df = pd.DataFrame(details['detainers'])
-            parole_actions_df = pd.DataFrame(details['parole_actions'])
-            
-            # Add inmate_id to each DataFrame
-            for df in [sentences_df, infractions_df, appeals_df, classifications_df, 
-                      work_programs_df, detainers_df, parole_actions_df]:
-                if not df.empty:
-                    df.insert(0, 'inmate_id', inmate_id)
-            
-            # Save to CSV files
-            self._append_to_csv(sentences_df, 'sentences.csv')
-            self._append_to_csv(infractions_df, 'infractions.csv')
-            self._append_to_csv(appeals_df, 'appeals.csv')
-            self._append_to_csv(classifications_df, 'classifications.csv')
-            self._append_to_csv(work_programs_df, 'work_programs.csv')
-            self._append_to_csv(detainers_df, 'detainers.csv')
-            self._append_to_csv(parole_actions_df, 'parole_actions.csv')
-            
+            self.writer.write_details(inmate_id, details)
         except Exception as e:
             print(f"Error saving detailed information: {e}")
     
-    def _append_to_csv(self, df, filename):
-        """Append DataFrame to CSV file."""
-        if df.empty:
-            return
-            
-        filepath = os.path.join(self.output_dir, filename)
-        if not os.path.exists(filepath):
-            df.to_csv(filepath, index=False)
-        else:
-            df.to_csv(filepath, mode='a', header=False, index=False)
-            
     def _go_back(self):
         """Navigate back using browser history instead of the BTIDS button."""
         print("Navigating back...")
-        self.driver.execute_script("window.history.go(-1)")
+        page = self.driver.find_element(By.TAG_NAME, "html")
+        with self._timed("go_back"):
+            self._browser_request("results_page", lambda: self.driver.execute_script("window.history.go(-1)"),
+                                  stale=page)
 
 if __name__ == "__main__":
-    scraper = InmateScraper()
-    
-    last_names = ["Smith", "Johnson", "Williams", "Brown", "Jones", 
-                 "Garcia", "Miller", "Davis", "Rodriguez", "Wilson",
-                 "Martinez", "Hernandez", "Lopez", "Gonzalez", "Perez",
-                 "Taylor", "Anderson", "Thomas", "Jackson", "White"]
-    first_initials = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J",
-                    "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T",
-                    "U", "V", "W", "X", "Y", "Z"] 
+    metrics = Metrics(jsonl_path=os.path.join("inmate_data", "metrics.jsonl"),
+                      prom_path=os.path.join("inmate_data", "metrics.prom"))
+    scraper = InmateScraper(metrics=metrics, scheduler=RequestScheduler(metrics=metrics))
+    planner = QueryPlanner(scraper, plan_path=os.path.join(scraper.output_dir, "query_plan.sqlite"))
     
     try:
-        results = scraper.search_inmates(last_names, first_initials)
+        found = planner.run()
+        print(planner.report())
         
-        print(f"\nFound {len(results)} inmates:")
-        for _, inmate in results.iterrows():
-            print(f"{inmate['first_name']} {inmate['last_name']} (ID: {inmate['inmate_id']})")
+        print(f"\nFound {found} inmates:")
+        for inmate in scraper.iter_inmates():
+            print(f"{inmate['first_name_middle_initial']} {inmate['last_name']} (ID: {inmate['inmate_id']})")
     finally:
+        planner.close()
         scraper.close()
 
 
@@ -0,0 +1,162 @@
+import re
+
+import pandas as pd
+import pyarrow as pa
+
+from result_writer import CHILD_TABLES, INMATE_COLUMNS, SAVED_AT, read_table
+
+DATE = "date"
+HEIGHT = "height"
+INTEGER = "integer"
+SENTENCE = "sentence"
+CATEGORY = "category"
+
+# table -> {column: kind}; columns not listed stay strings
+FIELD_KINDS = {
+    "inmates": {
+        "admitted_date": DATE, "admission": DATE, "release_date": DATE, "last_movement": DATE,
+        "height": HEIGHT, "weight": INTEGER,
+        "gender": CATEGORY, "hair_color": CATEGORY, "eye_color": CATEGORY, "ethnic_origin": CATEGORY,
+        "custody_class": CATEGORY, "release_type": CATEGORY, "complex": CATEGORY, "unit": CATEGORY,
+        "status": CATEGORY,
+    },
+    "sentences": {
+        "sentence_length": SENTENCE, "county": CATEGORY, "offense_date": DATE, "sentence_date": DATE,
+        "sentence_status": CATEGORY, "crime": CATEGORY,
+    },
+    "infractions": {"violation_date": DATE, "infraction": CATEGORY, "verdict_date": DATE, "verdict": CATEGORY},
+    "appeals": {"appeal_date": DATE, "outcome": CATEGORY, "as_of_date": DATE},
+    "classifications": {
+        "complete_date": DATE, "classification_type": CATEGORY, "custody_risk": CATEGORY, "internal_risk": CATEGORY,
+    },
+    "parole_actions": {"hearing_date": DATE, "statute": CATEGORY, "action": CATEGORY},
+    "work_programs": {"assigned_date": DATE, "completed_date": DATE, "work_assignment": CATEGORY},
+    "detainers": {
+        "detainer_date": DATE, "detainer_type": CATEGORY, "authority": CATEGORY, "agreement_date": DATE,
+    },
+}
+
+# Values that are not dates but mean something: they become NaT without counting as malformed.
+DATE_MARKERS = {"Active Classification"}
+
+HEIGHT_RE = r"^(\d+)\s*f(?:ee)?t?\.?\s*(?:(\d+)\s*(?:in)?\.?)?$"
+SENTENCE_RE = r"^(\d+)\s*Y\s*/\s*(\d+)\s*M\s*/\s*(\d+)\s*D$"
+
+_ARROW_TYPES = {
+    DATE: pa.date32(),
+    INTEGER: pa.int16(),
+    CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+def _strings(series):
+    return series.astype("string").str.strip().replace("", pd.NA)
+
+
+def to_dates(series):
+    """Parse MM/DD/YYYY (or MM/DD/YY) strings; anything else is NaT. Returns (dates, malformed mask)."""
+    values = _strings(series)
+    dates = pd.Series(pd.NaT, index=series.index, dtype="datetime64[s]")
+    for pattern, date_format in ((r"\d{1,2}/\d{1,2}/\d{4}", "%m/%d/%Y"), (r"\d{1,2}/\d{1,2}/\d{2}", "%m/%d/%y")):
+        match = values.str.fullmatch(pattern).fillna(False).astype(bool)
+        if match.any():
+            dates[match] = pd.to_datetime(values[match], format=date_format, errors="coerce")
+    return dates, values.notna() & dates.isna() & ~values.isin(DATE_MARKERS).fillna(False).astype(bool)
+
+
+def height_to_inches(series):
+    """Parse heights like "5 f 9" into inches. Returns (Int16 inches, malformed mask)."""
+    values = _strings(series)
+    parts = values.str.extract(HEIGHT_RE, flags=re.IGNORECASE)
+    feet = pd.to_numeric(parts[0], errors="coerce")
+    inches = pd.to_numeric(parts[1], errors="coerce").fillna(0)
+    result = (feet * 12 + inches).astype("Int16")
+    return result, values.notna() & result.isna()
+
+
+def to_integers(series):
+    values = _strings(series)
+    result = pd.to_numeric(values, errors="coerce")
+    malformed = values.notna() & (result.isna() | (result % 1 != 0).fillna(False))
+    return result.where(~malformed).astype("Int16"), malformed
+
+
+def sentence_to_days(series):
+    """Parse "008 Y/06 M/00 D" sentence lengths into days.
+
+    Returns (Int32 days, life flags, death flags, malformed mask). Life and
+    death sentences have no length and are not malformed.
+    """
+    values = _strings(series)
+    upper = values.str.upper()
+    life = upper.str.contains("LIFE", regex=False).fillna(False).astype(bool)
+    death = upper.str.contains("DEATH", regex=False).fillna(False).astype(bool)
+    parts = values.str.extract(SENTENCE_RE, flags=re.IGNORECASE).apply(pd.to_numeric, errors="coerce")
+    days = (parts[0] * 365.25 + parts[1] * 30.4375 + parts[2]).round().astype("Int32")
+    return days, life, death, values.notna() & days.isna() & ~life & ~death
+
+
+def normalized_schema(name):
+    """Arrow schema of a normalized table: the columns of normalize_table(name, ...) and their types."""
+    columns = (INMATE_COLUMNS if name == "inmates" else ["inmate_id"] + CHILD_TABLES[name]) + [SAVED_AT]
+    kinds = FIELD_KINDS.get(name, {})
+    fields = []
+    for column in columns:
+        kind = kinds.get(column)
+        if kind == HEIGHT:
+            fields.append((f"{column}_in", pa.int16()))
+        elif kind == SENTENCE:
+            fields += [("sentence_days", pa.int32()), ("life_sentence", pa.bool_()), ("death_sentence", pa.bool_())]
+        else:
+            fields.append((column, _ARROW_TYPES.get(kind, pa.string())))
+    return pa.schema(fields)
+
+
+def normalize_table(name, df, malformed=None):
+    """Type a whole batch of one table's raw string rows at once.
+
+    Dates become datetime64, height becomes height_in (inches), weight an
+    integer, sentence_length becomes sentence_days plus life_sentence and
+    death_sentence flags, and low-cardinality fields categoricals. Values
+    that do not parse become missing and are counted in malformed, a dict
+    of {(table, column): count}, instead of raising.
+    """
+    kinds = FIELD_KINDS.get(name, {})
+    out = {}
+    for column in df.columns:
+        kind = kinds.get(column)
+        bad = None
+        if kind == DATE:
+            out[column], bad = to_dates(df[column])
+        elif kind == HEIGHT:
+            out[f"{column}_in"], bad = height_to_inches(df[column])
+        elif kind == INTEGER:
+            out[column], bad = to_integers(df[column])
+        elif kind == SENTENCE:
+            out["sentence_days"], out["life_sentence"], out["death_sentence"], bad = sentence_to_days(df[column])
+        elif kind == CATEGORY:
+            out[column] = _strings(df[column]).astype("category")
+        else:
+            out[column] = df[column]
+        if malformed is not None and bad is not None and bad.any():
+            malformed[(name, column)] = malformed.get((name, column), 0) + int(bad.sum())
+    return pd.DataFrame(out, index=df.index)
+
+
+def to_arrow(name, df):
+    """A normalized DataFrame as an Arrow table with normalized_schema(name), without pandas metadata."""
+    schema = normalized_schema(name)
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    return table.replace_schema_metadata(None)
+
+
+def arrow_to_pandas(table):
+    """Arrow to pandas keeping nullable integers and date columns as datetime64."""
+    return table.to_pandas(date_as_object=False, types_mapper={
+        pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(),
+    }.get)
+
+
+def read_csv_typed(output_dir, name, columns=None, malformed=None):
+    """Read output_dir/<name>.csv, each inmate's last save only (see read_table), and normalize it."""
+    return normalize_table(name, read_table(output_dir, name, columns), malformed)
@@ -0,0 +1,210 @@
+import re
+
+import lxml.html
+from lxml import etree
+
+POSTBACK_RE = re.compile(r"__doPostBack\('([^']*)','([^']*)'\)")
+
+# (table id, field names, label used in error messages)
+BASIC_INFO_TABLES = [
+    ("GridView8", ["gender", "height", "weight", "hair_color"], "first row info"),
+    ("GridView9", ["eye_color", "ethnic_origin", "custody_class", "admission"], "second row info"),
+    ("GridView11", ["release_date", "release_type"], "third row info"),
+    ("GridView12", ["complex", "unit", "last_movement", "status"], "fourth row info"),
+]
+
+# (details key, record count label suffix, table id, field names, label used in error messages)
+SECTIONS = [
+    ("sentences", "Commit", "GVCommitment",
+     ["commit_num", "sentence_length", "county", "cause_num", "offense_date",
+      "sentence_date", "sentence_status", "crime"], "inmate sentences"),
+    ("infractions", "Infraction", "GVInfractions",
+     ["violation_date", "infraction", "verdict_date", "verdict"], "inmate infractions"),
+    ("appeals", "Outcome", "GVAppeal",
+     ["appeal_date", "outcome", "as_of_date"], "disciplinary appeals"),
+    ("classifications", "Profile", "GVProfileClass",
+     ["complete_date", "classification_type", "custody_risk", "internal_risk"], "inmate classifications"),
+    ("parole_actions", "ParolAction", "GVParoleAction",
+     ["hearing_date", "statute", "action"], "parole actions"),
+    ("work_programs", "Work", "GVWorkProgram",
+     ["assigned_date", "completed_date", "work_assignment"], "inmate work programs"),
+    ("detainers", "Detainer", "GVDetainer",
+     ["detainer_date", "detainer_type", "charges", "authority", "agreement_date"], "inmate detainers"),
+]
+
+
+def _text(element):
+    """Return the visible text of an element with whitespace collapsed, like WebElement.text."""
+    return " ".join(element.text_content().split())
+
+
+def parse_form_state(html):
+    """Return the hidden ASP.NET form fields (__VIEWSTATE, __EVENTVALIDATION, ...) of a page."""
+    doc = lxml.html.fromstring(html)
+    return {
+        field.get("name"): field.get("value", "")
+        for field in doc.xpath("//form//input[@type='hidden'][@name]")
+    }
+
+
+def parse_results_page(html):
+    """Parse a gvInmate results page into (rows, pager).
+
+    rows is a list of dicts with the summary columns, the __doPostBack target of the
+    inmate's detail link and the photo URL. pager is a list of (label, postback)
+    tuples where postback is None for the current page. Returns None when the page
+    has no results table.
+    """
+    doc = lxml.html.fromstring(html)
+    tables = doc.xpath("//table[@id='gvInmate']")
+    if not tables:
+        return None
+    table = tables[0]
+
+    rows = []
+    for row in table.xpath(".//tr[@class='GridViewRow']"):
+        cells = row.findall("td")[1:]
+        if len(cells) < 5:
+            continue
+        links = cells[0].xpath(".//a")
+        postback_target = None
+        if links:
+            inmate_id = _text(links[0])
+            match = POSTBACK_RE.search(links[0].get("href", ""))
+            if match:
+                postback_target = match.group(1)
+        else:
+            inmate_id = _text(cells[0])
+        photos = cells[1].xpath(".//input")
+        rows.append({
+            "inmate_id": inmate_id,
+            "postback_target": postback_target,
+            "photo_url": photos[0].get("src") if photos else None,
+            "last_name": _text(cells[2]),
+            "first_name_middle_initial": _text(cells[3]),
+            "admitted_date": _text(cells[4]),
+        })
+
+    pager = []
+    pager_cells = table.xpath("//td[@colspan='6']")
+    if pager_cells:
+        for cell in pager_cells[0].xpath(".//td"):
+            links = cell.xpath(".//a")
+            postback = None
+            if links:
+                match = POSTBACK_RE.search(links[0].get("href", ""))
+                if match:
+                    postback = match.groups()
+            pager.append((_text(cell), postback))
+
+    return rows, pager
+
+
+def next_page(pager, page_count):
+    """Return the pager entry to follow after page_count, or None on the last page.
+
+    Mirrors the Selenium pagination check in InmateScraper._perform_search.
+    """
+    try:
+        if pager[page_count][0] != str(page_count + 1) or page_count >= len(pager) - 1:
+            return None
+    except IndexError:
+        return None
+    return pager[page_count + 1]
+
+
+# Compiled once and reused for every detail page: one pass collects every
+# BorderGridView table and every lbl* record count span by id.
+_DETAIL_TABLES = etree.XPath("//table[contains(@class, 'BorderGridView')][@id]")
+_RECORD_COUNTS = etree.XPath("//span[starts-with(@id, 'lbl')]")
+_GRID_ROWS = etree.XPath(".//tr[@class='GridViewRow']")
+_CELLS = etree.XPath("./td")
+
+
+def _record_count(text):
+    try:
+        return int(text.split()[0])
+    except Exception:
+        return 0
+
+
+def parse_inmate_details(html, errors=None):
+    """Parse an inmate detail page (driver.page_source or an HTTP body) into the details dict.
+
+    errors, if given, is called as errors(table_id, exception) for every table
+    that fails to parse.
+    """
+    details = {
+        'basic_info': {},
+        'sentences': [],
+        'infractions': [],
+        'appeals': [],
+        'classifications': [],
+        'work_programs': [],
+        'detainers': [],
+        'parole_actions': []
+    }
+    doc = lxml.html.fromstring(html)
+    tables = {}
+    for table in _DETAIL_TABLES(doc):
+        tables.setdefault(table.get("id"), table)
+    counts = {}
+    for span in _RECORD_COUNTS(doc):
+        counts.setdefault(span.get("id"), _text(span))
+
+    def grid_rows(table_id):
+        return [[_text(cell) for cell in _CELLS(row)] for row in _GRID_ROWS(tables[table_id])]
+
+    for table_id, fields, label in BASIC_INFO_TABLES:
+        try:
+            cells = grid_rows(table_id)[0]
+            details['basic_info'].update({field: cells[i] for i, field in enumerate(fields)})
+        except Exception as e:
+            print(f"Error collecting {label}: {e}")
+            if errors is not None:
+                errors(table_id, e)
+
+    for key, section_id, table_id, fields, label in SECTIONS:
+        if _record_count(counts.get(f"lbl{section_id}", "")) > 0:
+            try:
+                for cells in grid_rows(table_id):
+                    details[key].append({field: cells[i] for i, field in enumerate(fields)})
+            except Exception as e:
+                print(f"Error collecting {label}: {e}")
+                if errors is not None:
+                    errors(table_id, e)
+
+    return details
+
+_IDENTITY_LABEL = etree.XPath("//span[@id='lblInmage']")
+_IDENTITY_PHOTO = etree.XPath("//input[@id='ImgIMNOResult']")
+_IDENTITY_NAME = etree.XPath("//table[@id='GridView7']//tr[@class='GridViewRow']")
+_IDENTITY_ADMISSION = etree.XPath("//table[@id='GridView9']//tr[@class='GridViewRow']")
+
+
+def parse_detail_identity(html):
+    """Return who a detail page is about, in the results row's fields, or None if html is not a detail page.
+
+    The dict has inmate_id (from the "Inmate 123456" label), photo_url,
+    last_name, first_name_middle_initial ("FIRST, M.", as on results pages)
+    and admitted_date, the page's admission date.
+    """
+    doc = lxml.html.fromstring(html)
+    labels = _IDENTITY_LABEL(doc)
+    if not labels:
+        return None
+    words = _text(labels[0]).split()
+    if len(words) < 2 or not words[-1].isdigit():
+        return None
+    photos = _IDENTITY_PHOTO(doc)
+    name_rows, admission_rows = _IDENTITY_NAME(doc), _IDENTITY_ADMISSION(doc)
+    names = [_text(cell) for cell in _CELLS(name_rows[0])] if name_rows else []
+    admission = [_text(cell) for cell in _CELLS(admission_rows[0])] if admission_rows else []
+    first_name = ", ".join(name for name in names[1:3] if name)
+    return {
+        "inmate_id": words[-1],
+        "photo_url": photos[0].get("src") if photos else None,
+        "last_name": names[0] if names else "",
+        "first_name_middle_initial": first_name,
+        "admitted_date": admission[3] if len(admission) > 3 else "",
+    }
@@ -0,0 +1,160 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+
+from photo_store import PhotoStore
+from result_writer import CHILD_TABLES, ResultWriter, iter_inmates, read_table
+
+
+class SharedRateLimiter:
+    """Token spacing shared by every process: at most `rate` requests per second in total."""
+
+    def __init__(self, rate, context=multiprocessing):
+        self.interval = 1.0 / rate
+        self._next = context.Value("d", 0.0)
+        self._lock = context.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.value)
+            self._next.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def shard_keys(keys, shards):
+    """Deal the search keys round-robin into `shards` lists."""
+    return [keys[i::shards] for i in range(shards)]
+
+
+def _run_shard(keys, shard_dir, engine, base_url, detail_workers, rate_limiter):
+    # imported here so the parent process never starts a browser
+    from mugshot_bot import InmateScraper
+
+    scraper = InmateScraper(output_dir=shard_dir, engine=engine, base_url=base_url,
+                            detail_workers=detail_workers, rate_limiter=rate_limiter)
+    try:
+        scraper.search_keys(keys)
+    finally:
+        scraper.close()
+
+
+def merge_shards(shard_dirs, output_dir):
+    """Merge per-worker output into output_dir, keeping each inmate once.
+
+    An inmate's inmates.csv row and child table rows are all taken from the
+    first shard that saved it (its last save there), so overlapping searches
+    never duplicate rows. Every table of output_dir is started over. A photo
+    missing from its shard is counted and skipped. Returns the number of
+    inmates merged.
+    """
+    photos = PhotoStore(os.path.join(output_dir, "photos"))
+
+    owner = {}
+    missing_photos = 0
+    with ResultWriter(output_dir, overwrite=("inmates", *CHILD_TABLES)) as writer:
+        # a table no shard has rows for is never flushed, so clear it up front
+        writer.start_fresh()
+        for shard, shard_dir in enumerate(shard_dirs):
+            for inmate in iter_inmates(shard_dir):
+                if inmate["inmate_id"] not in owner:
+                    owner[inmate["inmate_id"]] = shard
+                    writer.write_inmate(inmate)
+                    if inmate["photo_filename"] != "None":
+                        # content addressed, so the file name is the same in the merged store
+                        try:
+                            with open(os.path.join(shard_dir, "photos", inmate["photo_filename"]), "rb") as f:
+                                photos.put(inmate["inmate_id"], f.read())
+                        except FileNotFoundError:
+                            missing_photos += 1
+
+            for name in CHILD_TABLES:
+                if not os.path.exists(os.path.join(shard_dir, f"{name}.csv")):
+                    continue
+                for record in read_table(shard_dir, name).to_dict("records"):
+                    if owner.get(record["inmate_id"]) == shard:
+                        writer.write_row(name, record)
+
+    photos.close()
+    if missing_photos:
+        print(f"{missing_photos} photos missing from the shards were not merged")
+    return len(owner)
+
+
+class ParallelRunner:
+    """Crawl a key space with one InmateScraper per process.
+
+    The (last_name, first_initial, gender, status) keys are sharded across
+    `processes` workers, each with its own driver or HTTP session and its own
+    output directory under output_dir/shards. All workers draw from one
+    SharedRateLimiter, so the total request rate against the site stays under
+    max_requests_per_second however many processes run. The shards are merged
+    into output_dir when every worker has finished.
+    """
+
+    def __init__(self, output_dir="inmate_data", processes=4, engine="http",
+                 base_url="https://inmatedatasearch.azcorrections.gov/", detail_workers=0,
+                 max_requests_per_second=5.0):
+        self.output_dir = output_dir
+        self.processes = processes
+        self.engine = engine
+        self.base_url = base_url
+        self.detail_workers = detail_workers
+        self.max_requests_per_second = max_requests_per_second
+
+    def run(self, keys):
+        """Crawl every key and return the number of distinct inmates merged into output_dir."""
+        context = multiprocessing.get_context("spawn")
+        rate_limiter = None
+        if self.max_requests_per_second:
+            rate_limiter = SharedRateLimiter(self.max_requests_per_second, context=context)
+
+        shards_root = os.path.join(self.output_dir, "shards")
+        shard_dirs = []
+        workers = []
+        for i, shard in enumerate(shard_keys(list(keys), self.processes)):
+            if not shard:
+                continue
+            shard_dir = os.path.join(shards_root, f"shard_{i}")
+            shutil.rmtree(shard_dir, ignore_errors=True)
+            shard_dirs.append(shard_dir)
+            workers.append(context.Process(
+                target=_run_shard,
+                args=(shard, shard_dir, self.engine, self.base_url, self.detail_workers, rate_limiter),
+            ))
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            if worker.exitcode != 0:
+                print(f"Worker {worker.name} exited with code {worker.exitcode}")
+
+        found = merge_shards(shard_dirs, self.output_dir)
+        shutil.rmtree(shards_root, ignore_errors=True)
+        return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the name grid with several scraper processes.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--engine", default="http", choices=["http", "selenium"])
+    parser.add_argument("--detail-workers", type=int, default=0)
+    parser.add_argument("--max-rps", type=float, default=5.0)
+    parser.add_argument("--output-dir", default="inmate_data")
+    args = parser.parse_args()
+
+    last_names = ["Smith", "Johnson", "Williams", "Brown", "Jones",
+                  "Garcia", "Miller", "Davis", "Rodriguez", "Wilson",
+                  "Martinez", "Hernandez", "Lopez", "Gonzalez", "Perez",
+                  "Taylor", "Anderson", "Thomas", "Jackson", "White"]
+    first_initials = [chr(c) for c in range(ord("A"), ord("Z") + 1)]
+    keys = [(last_name, first_initial, "Male", "Active")
+            for last_name in last_names for first_initial in first_initials]
+
+    runner = ParallelRunner(output_dir=args.output_dir, processes=args.processes, engine=args.engine,
+                            detail_workers=args.detail_workers, max_requests_per_second=args.max_rps)
+    print(f"Merged {runner.run(keys)} distinct inmates into {args.output_dir}")
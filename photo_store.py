@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_EXTENSIONS = ((b"\xff\xd8\xff", ".jpg"), (b"\x89PNG", ".png"), (b"GIF8", ".gif"))
+
+
+def _extension(data):
+    for magic, extension in _EXTENSIONS:
+        if data.startswith(magic):
+            return extension
+    return ".jpg"
+
+
+class PhotoStore:
+    """Content-addressed photo files under photos_dir, with an inmate_id -> hash index.
+
+    Each distinct image is written once, as <hash[:2]>/<sha256><ext>, so a
+    mugshot that has not changed is never rewritten and the site's shared
+    "no photo" placeholder is stored a single time. The file name returned by
+    put() is relative to photos_dir, like the photo_filename column has always
+    been. The index lives in photos_dir/index.sqlite.
+    """
+
+    def __init__(self, photos_dir):
+        self.photos_dir = photos_dir
+        os.makedirs(photos_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(photos_dir, "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS photos (
+                inmate_id TEXT PRIMARY KEY, hash TEXT NOT NULL, filename TEXT NOT NULL,
+                url TEXT, updated_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def put(self, inmate_id, data, url=None):
+        """Store one inmate's photo bytes and return its file name relative to photos_dir."""
+        digest = hashlib.sha256(data).hexdigest()
+        filename = f"{digest[:2]}/{digest}{_extension(data)}"
+        path = os.path.join(self.photos_dir, filename)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+        with self._lock:
+            row = self.conn.execute("SELECT hash FROM photos WHERE inmate_id = ?", (inmate_id,)).fetchone()
+            if row is None or row[0] != digest:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO photos (inmate_id, hash, filename, url, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (inmate_id, digest, filename, url, time.time()))
+        return filename
+
+    def filename(self, inmate_id):
+        """Return the inmate's photo file name, or None if no photo has been stored."""
+        with self._lock:
+            row = self.conn.execute("SELECT filename FROM photos WHERE inmate_id = ?", (inmate_id,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+class PhotoFetcher:
+    """Downloads photos as raw bytes on a small thread pool and stores them in a PhotoStore.
+
+    All downloads share one HttpSearchEngine, i.e. one pooled, rate limited
+    HTTP session. submit() returns at once with a future for the photo file
+    name, so the caller can fetch and parse the detail page in the meantime.
+    """
+
+    def __init__(self, store, engine, workers=4, metrics=None):
+        self.store = store
+        self.engine = engine
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo")
+
+    def submit(self, inmate_id, url):
+        return self.executor.submit(self._download, inmate_id, url)
+
+    def _download(self, inmate_id, url):
+        start = time.perf_counter()
+        error = False
+        try:
+            filename = self.store.put(inmate_id, self.engine.fetch_photo(url), url)
+            print(f"Downloaded photo: {filename}")
+            return filename
+        except Exception as e:
+            print(f"Error downloading photo for inmate {inmate_id}: {e}")
+            error = True
+            return "None"
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("photo_fetch", time.perf_counter() - start, error=error)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.engine.close()
@@ -0,0 +1,186 @@
+import sqlite3
+import string
+import threading
+import time
+
+
+class ResultsTruncated(Exception):
+    """A search reached the site's result limit, so its pages do not hold every match."""
+
+    def __init__(self, rows, pages):
+        super().__init__(f"{len(rows)} rows x {pages} pages reaches the result limit")
+        self.rows = rows
+        self.pages = pages
+
+
+class QueryPlanner:
+    """Enumerate the inmate population with surname-prefix searches instead of a fixed name grid.
+
+    The search form matches the start of the last and first name fields, and
+    the site stops returning rows at truncation_limit (40: eight pages of
+    five). Starting from one search per letter, a search whose first page
+    shows it was cut off is refined:
+
+    - by one more surname character (refine_alphabet, plus any other
+      character the page's surnames continue the prefix with), and
+    - by first name letter as well, when a row on that page has exactly the
+      prefix as its surname, since no longer prefix can reach those inmates.
+
+    The narrower searches are taken to reach every inmate of the truncated
+    one only if each row on its first page falls under one of them.
+
+    A truncated search is not walked past its first page unless refinement
+    runs out (max_last_prefix, max_first_prefix), in which case its pages
+    are kept as they are. The site's first name field takes one letter
+    (maxlength="1"), so a longer first name prefix would only repeat its
+    parent's search. A search with no rows is pruned, and every
+    inmate_id is passed on once however many searches return it, before any
+    detail page is fetched.
+
+    Every search's outcome is kept in a SQLite plan (plan_path). A later
+    crawl searches only the untruncated prefixes that returned rows last
+    time, plus empty prefixes not checked for recheck_empty_after seconds
+    and searches that failed (stored with no checked_at), and refines any
+    of them that has since become truncated.
+    """
+
+    def __init__(self, scraper, plan_path=None, truncation_limit=40, roots_alphabet=string.ascii_uppercase,
+                 refine_alphabet=string.ascii_uppercase + " '-", max_last_prefix=12, max_first_prefix=1,
+                 recheck_empty_after=30 * 24 * 3600):
+        self.scraper = scraper
+        self.truncation_limit = truncation_limit
+        self.roots_alphabet = roots_alphabet
+        self.refine_alphabet = refine_alphabet
+        self.max_last_prefix = max_last_prefix
+        self.max_first_prefix = max_first_prefix
+        self.recheck_empty_after = recheck_empty_after
+        self.stats = {"searches": 0, "result_pages": 0, "truncated": 0, "pruned": 0,
+                      "unresolved": 0, "failed": 0, "rows": 0, "duplicates": 0, "inmates": 0}
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(plan_path or ":memory:", check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prefixes (
+                last_prefix TEXT, first_prefix TEXT, gender TEXT, status TEXT,
+                rows INTEGER NOT NULL, truncated INTEGER NOT NULL, checked_at REAL,
+                PRIMARY KEY (last_prefix, first_prefix, gender, status)
+            )
+        """)
+        self.conn.commit()
+
+    def _start_nodes(self, gender, status):
+        """Searches to start from: the plan's productive leaves, or one per letter for a new plan."""
+        with self._lock:
+            known = self.conn.execute(
+                "SELECT last_prefix, first_prefix, rows, truncated, checked_at FROM prefixes "
+                "WHERE gender = ? AND status = ? ORDER BY last_prefix, first_prefix", (gender, status)).fetchall()
+        if not known:
+            return [(letter, "") for letter in self.roots_alphabet]
+        now = time.time()
+        return [
+            (last_prefix, first_prefix) for last_prefix, first_prefix, rows, truncated, checked_at in known
+            if checked_at is None or not truncated and (rows or now - checked_at >= self.recheck_empty_after)
+        ]
+
+    def _record(self, node, gender, status, rows, truncated, failed=False):
+        """Store a search's outcome; a failed one is stored unchecked, so the next crawl retries it."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO prefixes (last_prefix, first_prefix, gender, status, rows, truncated, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*node, gender, status, rows, int(truncated), None if failed else time.time()))
+
+    def _children(self, node, rows):
+        """Return (narrower searches, whether they reach every inmate the truncated search matches)."""
+        last_prefix, first_prefix = node
+        names = [(row["last_name"].upper(), row["first_name_middle_initial"].upper()) for row in rows]
+        children = []
+        alphabet = ""
+        if len(last_prefix) < self.max_last_prefix:
+            seen = {last[len(last_prefix)] for last, _ in names if len(last) > len(last_prefix)}
+            alphabet = self.refine_alphabet + "".join(sorted(seen - set(self.refine_alphabet)))
+            children += [(last_prefix + c, first_prefix) for c in alphabet]
+        # inmates whose surname is exactly the prefix are only reachable through the first name
+        by_first_name = not alphabet or any(last == last_prefix for last, _ in names)
+        if by_first_name and len(first_prefix) < self.max_first_prefix:
+            children += [(last_prefix, first_prefix + c) for c in string.ascii_uppercase]
+        else:
+            by_first_name = False
+
+        def covered(last, first):
+            if len(last) > len(last_prefix) and last[len(last_prefix)] in alphabet:
+                return True
+            return by_first_name and first[len(first_prefix):len(first_prefix) + 1] in set(string.ascii_uppercase)
+
+        return children, bool(children) and all(covered(last, first) for last, first in names)
+
+    def _search(self, node, gender, status, truncation_limit):
+        """Return [(row, state), ...] for one search, or raise ResultsTruncated; counts the pages read."""
+        self.stats["searches"] += 1
+        pages = []
+        try:
+            return list(self.scraper._harvest_search(*node, gender, status, truncation_limit=truncation_limit,
+                                                     pages=pages))
+        finally:
+            self.stats["result_pages"] += len(pages)
+
+    def harvest(self, genders=("Male",), statuses=("Active",)):
+        """Yield (row, results_state) once per distinct inmate_id across the whole plan."""
+        seen = set()
+        for gender in genders:
+            for status in statuses:
+                stack = list(reversed(self._start_nodes(gender, status)))
+                while stack:
+                    node = stack.pop()
+                    print(f"Searching for prefix {node[0]!r}, {node[1]!r}")
+                    try:
+                        try:
+                            pairs = self._search(node, gender, status, self.truncation_limit)
+                        except ResultsTruncated as e:
+                            children, complete = self._children(node, e.rows)
+                            self._record(node, gender, status, len(e.rows) * e.pages, truncated=complete)
+                            self.stats["truncated"] += 1
+                            stack.extend(reversed(children))
+                            if complete:
+                                continue
+                            # the narrower searches miss some matches: keep what the site shows
+                            self.stats["unresolved"] += 1
+                            pairs = self._search(node, gender, status, None)
+                        else:
+                            self._record(node, gender, status, len(pairs), truncated=False)
+                            if not pairs:
+                                self.stats["pruned"] += 1
+                    except Exception as e:
+                        print(f"Error searching for prefix {node[0]!r}, {node[1]!r}: {e}")
+                        self._record(node, gender, status, 0, truncated=False, failed=True)
+                        self.stats["failed"] += 1
+                        continue
+
+                    for row, state in pairs:
+                        self.stats["rows"] += 1
+                        if row["inmate_id"] in seen:
+                            self.stats["duplicates"] += 1
+                            continue
+                        seen.add(row["inmate_id"])
+                        self.stats["inmates"] += 1
+                        yield row, state
+
+    def run(self, genders=("Male",), statuses=("Active",)):
+        """Crawl every inmate the plan reaches through the scraper and return the number saved."""
+        return self.scraper.crawl_rows(self.harvest(genders, statuses))
+
+    def report(self, grid_searches=None):
+        """Summarize the last harvest; grid_searches is the search count of the name grid it replaces."""
+        lines = [
+            f"searches: {self.stats['searches']} ({self.stats['result_pages']} results pages)",
+            f"truncated and refined: {self.stats['truncated']}, pruned empty: {self.stats['pruned']}, "
+            f"left truncated: {self.stats['unresolved']}, failed (retried next crawl): {self.stats['failed']}",
+            f"distinct inmates: {self.stats['inmates']} "
+            f"({self.stats['duplicates']} duplicate rows dropped before any detail fetch)",
+        ]
+        if grid_searches:
+            lines.append(f"name grid: {grid_searches} searches")
+        return "\n".join(lines)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Hidden ASP.NET state differs between otherwise identical responses.
+_VOLATILE_FIELDS_RE = re.compile(
+    r'(<input[^>]*name="(?:__VIEWSTATE|__VIEWSTATEGENERATOR|__EVENTVALIDATION)"[^>]*?value=")[^"]*(")',
+    re.DOTALL)
+
+
+def content_hash(html):
+    """Hash a page's content, ignoring the hidden ASP.NET state fields."""
+    return hashlib.sha256(_VOLATILE_FIELDS_RE.sub(r"\1\2", html).encode("utf-8")).hexdigest()
+
+
+def search_key(last_name, first_initial, gender, status, page_number):
+    return f"search:{last_name}|{first_initial}|{gender}|{status}|{page_number}"
+
+
+def detail_key(inmate_id):
+    return f"detail:{inmate_id}"
+
+
+class ResponseCache:
+    """On-disk cache of raw search result and detail page HTML.
+
+    Pages are stored gzipped under cache_dir, keyed by request: search_key()
+    for a results page, detail_key() for an inmate's detail page. Entries
+    older than ttl seconds are refetched. When the stored pages grow past
+    max_bytes, the least recently used ones are evicted. An index in
+    cache_dir/index.sqlite also keeps the content hash of the detail page each
+    inmate was last saved from, so an unchanged page can skip parsing and CSV
+    writes entirely.
+    """
+
+    def __init__(self, cache_dir, ttl=7 * 24 * 3600, max_bytes=1024 ** 3):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY, filename TEXT NOT NULL, size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, meta TEXT
+            );
+            CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+            CREATE TABLE IF NOT EXISTS inmate_hashes (
+                inmate_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, saved_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _path(self, filename):
+        return os.path.join(self.cache_dir, filename[:2], filename)
+
+    def get(self, key, max_age=None):
+        """Return the cached HTML for key, or None when missing or older than the TTL."""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            row = self.conn.execute("SELECT filename, fetched_at FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row[1] > max_age:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        try:
+            with gzip.open(self._path(row[0]), "rt", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, html, meta=None):
+        """Store the HTML for key, with optional JSON-serializable metadata."""
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html.gz"
+        path = self._path(filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(tmp, path)
+        size = os.path.getsize(path)
+
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (key, filename, size, fetched_at, accessed_at, meta) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, filename, size, now, now, None if meta is None else json.dumps(meta)))
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes. Caller holds the lock."""
+        evicted = []
+        for key, filename, size in self.conn.execute("SELECT key, filename, size FROM pages ORDER BY accessed_at"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            evicted.append(key)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(filename))
+            except OSError:
+                pass
+        with self.conn:
+            self.conn.executemany("DELETE FROM pages WHERE key = ?", [(key,) for key in evicted])
+
+    def is_unchanged(self, inmate_id, html):
+        """True if the inmate was last saved from a detail page with the same content."""
+        with self._lock:
+            row = self.conn.execute("SELECT content_hash FROM inmate_hashes WHERE inmate_id = ?",
+                                    (inmate_id,)).fetchone()
+        return row is not None and row[0] == content_hash(html)
+
+    def record_hashes(self, hashes):
+        """Remember {inmate_id: content hash} for inmates whose rows are now on disk."""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO inmate_hashes (inmate_id, content_hash, saved_at) VALUES (?, ?, ?)",
+                [(inmate_id, page_hash, now) for inmate_id, page_hash in hashes.items()])
+
+    def iter_details(self):
+        """Yield (inmate_id, html, meta) for every cached detail page, regardless of age."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, filename, meta FROM pages WHERE key LIKE 'detail:%' ORDER BY fetched_at").fetchall()
+        for key, filename, meta in rows:
+            try:
+                with gzip.open(self._path(filename), "rt", encoding="utf-8") as f:
+                    html = f.read()
+            except OSError:
+                continue
+            yield key.split(":", 1)[1], html, json.loads(meta) if meta else {}
+
+    def close(self):
+        self.conn.close()
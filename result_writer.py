@@ -0,0 +1,224 @@
+import csv
+import os
+import time
+
+import pandas as pd
+
+from page_parser import BASIC_INFO_TABLES, SECTIONS
+
+INMATE_COLUMNS = ["inmate_id", "last_name", "first_name_middle_initial", "admitted_date", "photo_filename"] + [
+    field for _, fields, _ in BASIC_INFO_TABLES for field in fields
+]
+
+# details key -> columns of the matching child table (<key>.csv)
+CHILD_TABLES = {key: fields for key, _, _, fields, _ in SECTIONS}
+
+# Last column of every table: when the inmate was saved, shared by the inmates row and child rows of one save.
+SAVED_AT = "saved_at"
+
+
+def save_stamp():
+    return f"{time.time():.6f}"
+
+
+class _TableBuffer:
+    __slots__ = ("path", "columns", "rows", "overwrite", "header_checked")
+
+    def __init__(self, path, columns, overwrite=False):
+        self.path = path
+        self.columns = columns
+        self.rows = []
+        self.overwrite = overwrite
+        self.header_checked = False
+
+
+class ResultWriter:
+    """Buffered, append-only writer for inmates.csv and the seven child tables.
+
+    Rows are kept as plain tuples in a fixed column order and appended to the
+    CSV files once flush_rows rows are buffered or flush_interval seconds have
+    passed, so the cost of a write never depends on how much is already on disk.
+    Tables named in overwrite start over at their first flush; the rest are
+    appended to across runs.
+    Every flush is fsynced before returning. When a file already exists its
+    header is kept, and records missing fields are written with empty values.
+
+    write_details never triggers a flush, so an inmate's child rows and the
+    inmates.csv row written right after them always land in the same flush.
+    on_flush, if given, is called after every flush with the inmate_ids it made
+    durable and the new file sizes (see CrawlCheckpoint.commit).
+
+    Every row gets a saved_at column, the same for an inmate's child rows and
+    the inmates.csv row written after them, unless the record already has
+    one. A recrawled inmate is appended again, so readers keep only each
+    inmate's last save (see read_table and iter_inmates).
+    """
+
+    def __init__(self, output_dir, flush_rows=1000, flush_interval=30.0, overwrite=("inmates",), on_flush=None):
+        self.output_dir = output_dir
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.pending_ids = []
+        self._save = None
+
+        self.tables = {"inmates": _TableBuffer(os.path.join(output_dir, "inmates.csv"), INMATE_COLUMNS + [SAVED_AT],
+                                               overwrite="inmates" in overwrite)}
+        for name, columns in CHILD_TABLES.items():
+            self.tables[name] = _TableBuffer(os.path.join(output_dir, f"{name}.csv"),
+                                             ["inmate_id"] + columns + [SAVED_AT], overwrite=name in overwrite)
+
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def write_inmate(self, inmate):
+        """Buffer one inmates.csv record (a dict keyed by INMATE_COLUMNS)."""
+        self.pending_ids.append(inmate["inmate_id"])
+        record = {SAVED_AT: self._saved_at(inmate["inmate_id"]), **inmate}
+        self._save = None
+        self.write_row("inmates", record)
+
+    def write_row(self, name, record):
+        """Buffer one record for the "inmates" table or a CHILD_TABLES table."""
+        self._add(name, record)
+        self._maybe_flush()
+
+    def write_details(self, inmate_id, details):
+        """Buffer the child table rows of one inmate's details dict."""
+        saved_at = self._saved_at(inmate_id)
+        for name in CHILD_TABLES:
+            for record in details.get(name, []):
+                self._add(name, {SAVED_AT: saved_at, **record, "inmate_id": inmate_id})
+
+    def _saved_at(self, inmate_id):
+        """The saved_at of the save in progress: child rows first, then the inmate's row."""
+        if self._save is None or self._save[0] != inmate_id:
+            self._save = (inmate_id, save_stamp())
+        return self._save[1]
+
+    def _add(self, name, record):
+        table = self.tables[name]
+        table.rows.append(tuple(record.get(column, "") for column in table.columns))
+        self.buffered += 1
+
+    def _maybe_flush(self):
+        if self.buffered >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Append every buffered row to its CSV file and fsync it."""
+        wrote = False
+        for table in self.tables.values():
+            if table.rows:
+                if table.overwrite:
+                    self._start_file(table)
+                self._append(table)
+                wrote = True
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        if wrote and self.on_flush is not None:
+            self.on_flush(self.pending_ids, self.file_sizes())
+        self.pending_ids = []
+
+    def start_fresh(self):
+        """Start the overwritten tables over now instead of at their first flush."""
+        for table in self.tables.values():
+            if table.overwrite:
+                self._start_file(table)
+
+    def file_sizes(self):
+        """Return {path: size in bytes} for every output file, 0 if it does not exist yet."""
+        return {
+            table.path: os.path.getsize(table.path) if os.path.exists(table.path) else 0
+            for table in self.tables.values()
+        }
+
+    def truncate(self, sizes):
+        """Cut every output file back to the size recorded in sizes, dropping unflushed tails."""
+        for table in self.tables.values():
+            size = sizes.get(table.path)
+            if size is not None and os.path.exists(table.path) and os.path.getsize(table.path) > size:
+                with open(table.path, "r+b") as f:
+                    f.truncate(size)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def _start_file(self, table):
+        with open(table.path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(table.columns)
+            f.flush()
+            os.fsync(f.fileno())
+        table.overwrite = False
+        table.header_checked = True
+
+    def _append(self, table):
+        write_header = not os.path.exists(table.path) or os.path.getsize(table.path) == 0
+        if not write_header and not table.header_checked:
+            with open(table.path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), None)
+            if header and header != table.columns:
+                # keep the existing file's schema
+                index = {column: i for i, column in enumerate(table.columns)}
+                table.rows = [tuple(row[index[c]] if c in index else "" for c in header) for row in table.rows]
+                table.columns = header
+        table.header_checked = True
+
+        with open(table.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(table.columns)
+            writer.writerows(table.rows)
+            f.flush()
+            os.fsync(f.fileno())
+        table.rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_inmates(output_dir):
+    """Yield the last saved record of each inmate in output_dir/inmates.csv, one dict at a time."""
+    path = os.path.join(output_dir, "inmates.csv")
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        last = {row["inmate_id"]: i for i, row in enumerate(csv.DictReader(f))}
+    with open(path, newline="", encoding="utf-8") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if last[row["inmate_id"]] == i:
+                yield row
+
+
+def read_table(output_dir, name, columns=None):
+    """Read output_dir/<name>.csv as strings, keeping only the rows of each inmate's last save.
+
+    For inmates.csv that is each inmate's last row. Child table rows are
+    kept when their saved_at matches the inmate's last inmates.csv row, so
+    a section that came back empty on a recrawl is empty here too. Files
+    written before saved_at existed keep all their child rows.
+    """
+    read_columns = None if columns is None else list(dict.fromkeys(["inmate_id", *columns, SAVED_AT]))
+    df = _read_csv(output_dir, name, read_columns)
+    if name == "inmates":
+        df = df.drop_duplicates("inmate_id", keep="last")
+    elif SAVED_AT in df.columns and os.path.exists(os.path.join(output_dir, "inmates.csv")):
+        saves = _read_csv(output_dir, "inmates", ["inmate_id", SAVED_AT])
+        if SAVED_AT in saves.columns:
+            last = saves.drop_duplicates("inmate_id", keep="last").set_index("inmate_id")[SAVED_AT]
+            latest = df["inmate_id"].map(last)
+            df = df[latest.isna() | (df[SAVED_AT] == latest)]
+    df = df.reset_index(drop=True)
+    return df if columns is None else df[list(columns)]
+
+
+def _read_csv(output_dir, name, columns):
+    path = os.path.join(output_dir, f"{name}.csv")
+    header = pd.read_csv(path, dtype=str, nrows=0).columns
+    usecols = None if columns is None else [column for column in columns if column in header]
+    return pd.read_csv(path, dtype=str, keep_default_na=False, usecols=usecols)
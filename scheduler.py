@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import TimeoutException
+
+# Response statuses that mean "try again later" rather than "this request is wrong".
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    """True for timeouts, dropped connections and overload statuses."""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, TimeoutException))
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Endpoint:
+    """Latency estimate and circuit breaker state of one kind of request."""
+    __slots__ = ("latency", "deviation", "baseline", "failures", "opened_at", "open_for", "probing")
+
+    def __init__(self):
+        self.latency = None
+        self.deviation = 0.0
+        self.baseline = None
+        self.failures = 0
+        self.opened_at = None
+        self.open_for = 0.0
+        self.probing = False
+
+    def observe(self, seconds):
+        if self.latency is None:
+            self.latency = self.baseline = seconds
+            self.deviation = seconds / 2
+            return
+        self.deviation += 0.25 * (abs(seconds - self.latency) - self.deviation)
+        self.latency += 0.125 * (seconds - self.latency)
+        # the uncongested latency: follows drops at once and a slower server slowly
+        self.baseline = min(self.latency, self.baseline + 0.01 * (self.latency - self.baseline))
+
+
+class RequestScheduler:
+    """Paces every request the crawl makes from the server's own response times.
+
+    Wrap a request in `scheduler.call("detail", fn)`. Endpoints ("search",
+    "results_page", "detail", "photo", ...) share one concurrency limit, run
+    AIMD style: each success adds 1/limit, up to max_limit, and an error or a
+    smoothed latency above `tolerance` times the endpoint's uncongested
+    baseline halves it, at most once per round trip, down to min_limit.
+    Callers beyond the limit wait, so pipeline workers and photo threads only
+    add load as fast as the server keeps up.
+
+    A request that fails with a timeout, a dropped connection or a 429/5xx
+    status is retried up to `retries` times (max_retries by default) after an
+    exponential backoff with full jitter, or the server's Retry-After if that
+    is longer. Other errors are raised at once. Callers that requeue their
+    own work pass retries=0 and use backoff() for the delay.
+
+    Each endpoint has a circuit breaker: failure_threshold consecutive
+    failures open it, and its requests wait, rather than fail, for
+    reset_timeout seconds. Then one probe request is let through; success
+    closes the circuit, failure reopens it for twice as long (up to
+    max_delay).
+
+    timeout(endpoint) is a TCP-style timeout (smoothed latency plus four
+    mean deviations) for waits that would otherwise be hard-coded.
+    """
+
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=16, tolerance=2.0, max_retries=4,
+                 base_delay=0.5, max_delay=60.0, failure_threshold=5, reset_timeout=10.0,
+                 default_timeout=10.0, min_timeout=2.0, max_timeout=60.0, metrics=None):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.metrics = metrics
+        self.in_flight = 0
+        self._endpoints = {}
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _endpoint(self, name):
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            endpoint = self._endpoints[name] = _Endpoint()
+        return endpoint
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.count(name)
+
+    def call(self, endpoint, fn, *args, retries=None, **kwargs):
+        """Run fn(*args, **kwargs) as a request to endpoint, retrying transient errors."""
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            probe = self._acquire(endpoint)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                self._release(endpoint, probe, time.perf_counter() - start, failed=retryable)
+                if not retryable or attempt >= retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                print(f"Retrying {endpoint} request in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self._release(endpoint, probe, time.perf_counter() - start)
+                return result
+
+    def backoff(self, attempt, error=None):
+        """Seconds to wait before retry number attempt + 1 (counted as a retry on the metrics)."""
+        self._count("retries")
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def timeout(self, endpoint):
+        """Seconds to wait for a response from endpoint before giving up on it."""
+        with self._cond:
+            return self._timeout(self._endpoint(endpoint))
+
+    def _timeout(self, endpoint):
+        if endpoint.latency is None:
+            return self.default_timeout
+        return min(self.max_timeout, max(self.min_timeout, endpoint.latency + 4 * endpoint.deviation))
+
+    def _acquire(self, name):
+        """Wait for a concurrency slot and a closed (or probing) circuit; True if this request is the probe."""
+        probe = False
+        with self._cond:
+            while True:
+                endpoint = self._endpoint(name)
+                if endpoint.opened_at is not None and not probe:
+                    remaining = endpoint.opened_at + endpoint.open_for - time.monotonic()
+                    if remaining > 0 or endpoint.probing:
+                        self._cond.wait(remaining if remaining > 0 else endpoint.open_for)
+                        continue
+                    endpoint.probing = probe = True
+                if self.in_flight < max(int(self.limit), self.min_limit):
+                    self.in_flight += 1
+                    return probe
+                self._cond.wait()
+
+    def _release(self, name, probe, seconds, failed=False):
+        with self._cond:
+            self.in_flight -= 1
+            endpoint = self._endpoint(name)
+            now = time.monotonic()
+            if probe:
+                endpoint.probing = False
+            if failed:
+                endpoint.failures += 1
+                if probe or (endpoint.opened_at is None and endpoint.failures >= self.failure_threshold):
+                    endpoint.open_for = min(self.max_delay, endpoint.open_for * 2) if probe else self.reset_timeout
+                    endpoint.opened_at = now
+                    print(f"Too many {name} errors, pausing {name} requests for {endpoint.open_for:.1f}s")
+                    self._count("circuit_opened")
+                self._decrease(endpoint, now)
+            else:
+                endpoint.failures = 0
+                endpoint.opened_at = None
+                endpoint.observe(seconds)
+                if endpoint.latency > self.tolerance * endpoint.baseline:
+                    self._decrease(endpoint, now)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self, endpoint, now):
+        # one cut per round trip: the requests already in flight saw the same congestion
+        if now - self._last_decrease < (endpoint.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit / 2)
+        self._count("limit_decreases")
+
+    def snapshot(self):
+        """The current limit and each endpoint's latency, baseline, timeout and circuit state."""
+        with self._cond:
+            endpoints = {
+                name: {
+                    "latency": e.latency,
+                    "baseline": e.baseline,
+                    "timeout": self._timeout(e),
+                    "open": e.opened_at is not None,
+                }
+                for name, e in self._endpoints.items()
+            }
+            return {"limit": self.limit, "in_flight": self.in_flight, "endpoints": endpoints}
@@ -0,0 +1,77 @@
+import string
+
+from fixture_server import FixtureServer
+from mugshot_bot import InmateScraper
+from result_writer import read_table
+
+LETTERS = list(string.ascii_uppercase)
+
+
+def _searched(server):
+    return [form.get("txtLName", "") for method, _, form in server.requests
+            if method == "POST" and form.get("__EVENTTARGET") == "btnName"]
+
+
+def test_resumed_crawl_only_runs_the_keys_left_over(tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.sqlite")
+    with FixtureServer(population=60) as server:
+        expected = {str(100000 + inmate[3]) for inmate in server._population
+                    if inmate[4] == "Male" and inmate[5] == "Active"}
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url,
+                                checkpoint_path=checkpoint_path)
+        harvest_search = scraper._harvest_search
+
+        def failing(last_name, *args, **kwargs):
+            if last_name == "B":
+                raise ConnectionError("connection reset")
+            return harvest_search(last_name, *args, **kwargs)
+
+        try:
+            scraper._harvest_search = failing
+            scraper.search_inmates(LETTERS, [""])
+        finally:
+            scraper.close()
+        first = {row["inmate_id"] for row in read_table(str(tmp_path), "inmates").to_dict("records")}
+
+        server.requests.clear()
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url,
+                                checkpoint_path=checkpoint_path)
+        try:
+            scraper.search_inmates(LETTERS, [""])
+            assert scraper.checkpoint.key_counts() == {"done": len(LETTERS)}
+            inmates = [row["inmate_id"] for row in scraper.iter_inmates()]
+        finally:
+            scraper.close()
+
+    assert expected - first
+    assert _searched(server) == ["B"]
+    assert sorted(inmates) == sorted(expected)
+    sentences = read_table(str(tmp_path), "sentences")["inmate_id"].value_counts()
+    assert sentences.to_dict() == {inmate_id: 2 for inmate_id in expected}
+
+
+def test_resume_cuts_partly_written_rows_back_to_the_checkpoint(tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.sqlite")
+    with FixtureServer(population=20) as server:
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url,
+                                checkpoint_path=checkpoint_path)
+        try:
+            found = scraper.search_inmates(LETTERS, [""])
+        finally:
+            scraper.close()
+
+    sizes = {}
+    for name in ("inmates", "sentences"):
+        path = tmp_path / f"{name}.csv"
+        sizes[name] = path.stat().st_size
+        # a crash in the middle of a flush leaves half a row behind
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            f.write("199999,HALF")
+
+    scraper = InmateScraper(output_dir=str(tmp_path), engine="offline", checkpoint_path=checkpoint_path)
+    scraper.close()
+
+    for name, size in sizes.items():
+        assert (tmp_path / f"{name}.csv").stat().st_size == size
+    inmates = read_table(str(tmp_path), "inmates")
+    assert len(inmates) == found and "199999" not in set(inmates["inmate_id"])
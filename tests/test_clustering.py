@@ -0,0 +1,22 @@
+import numpy as np
+from scipy.cluster.hierarchy import is_valid_linkage, linkage
+
+from clustering import ward_tree
+
+
+def test_tied_distances_merge_like_scipy():
+    square = [[0, 0], [1, 0], [0, 1], [1, 1]]
+    grid = [[x, y] for x in range(4) for y in range(3)]
+    line = [[x] for x in range(7)]
+    scattered = [[0, 1], [1, 0], [2, 0], [0, 2], [1, 1]]
+    for points in (square, grid, line, scattered):
+        np.testing.assert_allclose(ward_tree(points), linkage(points, "ward"))
+
+
+def test_weights_stand_for_repeated_points_with_tied_distances():
+    points = [[0, 0], [2, 0], [0, 2], [2, 2]]
+    Z = ward_tree(points, weights=[2, 2, 2, 2])
+    repeated = linkage(np.repeat(points, 2, axis=0), "ward")
+
+    assert is_valid_linkage(Z)
+    np.testing.assert_allclose(Z[:, 2], repeated[-3:, 2])
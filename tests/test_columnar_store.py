@@ -0,0 +1,43 @@
+import pytest
+
+from columnar_store import ColumnarWriter, load_table
+from result_writer import INMATE_COLUMNS
+
+
+class Crash(Exception):
+    pass
+
+
+def _inmate(inmate_id):
+    return dict({column: "" for column in INMATE_COLUMNS}, inmate_id=str(inmate_id), last_name=f"Name{inmate_id}")
+
+
+def _crawl_until_compaction(output_dir, commits, record_compaction):
+    """Save two inmates, one flush each, crashing in the on_flush of the flush that compacts."""
+    def on_flush(inmate_ids, sizes):
+        if len(commits) == 1:
+            if record_compaction:
+                commits.append(sizes)
+            raise Crash
+        commits.append(sizes)
+
+    writer = ColumnarWriter(output_dir, flush_rows=100, overwrite=(), on_flush=on_flush, compact_parts=2,
+                            crawl_date="2024-01-01")
+    writer.write_inmate(_inmate(100001))
+    writer.flush()
+    writer.write_inmate(_inmate(100002))
+    with pytest.raises(Crash):
+        writer.flush()
+    writer.index.close()
+
+
+@pytest.mark.parametrize("record_compaction, expected", [(False, ["100001"]), (True, ["100001", "100002"])])
+def test_crash_between_compaction_and_commit(tmp_path, record_compaction, expected):
+    commits = []
+    _crawl_until_compaction(str(tmp_path), commits, record_compaction)
+
+    writer = ColumnarWriter(str(tmp_path), overwrite=(), crawl_date="2024-01-01")
+    writer.truncate(commits[-1])
+    writer.index.close()
+    assert sorted(load_table(str(tmp_path), "inmates")["inmate_id"]) == expected
+    assert sorted(load_table(str(tmp_path), "inmates", inmate_ids=expected)["inmate_id"]) == expected
@@ -0,0 +1,31 @@
+import os
+import string
+
+from fixture_server import FixtureServer
+from mugshot_bot import InmateScraper
+from page_parser import SECTIONS
+from result_writer import read_table
+
+
+def test_http_crawl_saves_the_whole_population(tmp_path):
+    sizes = {key: 2 for key, *_ in SECTIONS}
+    sizes.update(sentences=3, detainers=1)
+    with FixtureServer(population=60, section_sizes=sizes) as server:
+        expected = {str(100000 + inmate[3]): inmate for inmate in server._population
+                    if inmate[4] == "Male" and inmate[5] == "Active"}
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url)
+        try:
+            assert scraper.search_inmates(list(string.ascii_uppercase), [""]) == len(expected)
+            inmates = {row["inmate_id"]: row for row in scraper.iter_inmates()}
+        finally:
+            scraper.close()
+
+    assert inmates.keys() == expected.keys()
+    for inmate_id, (last_name, first_name, initial, *_) in expected.items():
+        row = inmates[inmate_id]
+        assert (row["last_name"], row["first_name_middle_initial"]) == (last_name, f"{first_name}, {initial}.")
+        assert (row["gender"], row["status"]) == ("Male", "Active")
+        assert os.path.exists(os.path.join(tmp_path, "photos", row["photo_filename"]))
+    for key, *_ in SECTIONS:
+        counts = read_table(str(tmp_path), key)["inmate_id"].value_counts().to_dict()
+        assert counts == {inmate_id: sizes[key] for inmate_id in expected}
@@ -0,0 +1,36 @@
+import pytest
+
+from fixture_server import FixtureServer
+from id_sweep import IdSweep
+from mugshot_bot import InmateScraper
+
+
+def test_number_search_is_opt_in(tmp_path):
+    scraper = InmateScraper(output_dir=str(tmp_path), engine="offline")
+    try:
+        with pytest.raises(ValueError):
+            scraper.lookup_inmates(["100000"])
+        with pytest.raises(ValueError):
+            IdSweep(scraper)
+    finally:
+        scraper.close()
+
+
+def test_sweep_finds_the_population_and_skips_it_next_time(tmp_path):
+    with FixtureServer(population=300) as server:
+        scraper = InmateScraper(output_dir=str(tmp_path / "out"), engine="http", base_url=server.url,
+                                number_search=True)
+        bitmap_path = str(tmp_path / "ids.sqlite")
+        try:
+            sweep = IdSweep(scraper, bitmap_path=bitmap_path, block_size=256)
+            assert sweep.run(99000, 101000) == 300
+            assert sweep.stats["dead_blocks"] > 0
+            sweep.close()
+
+            before = len(server.requests)
+            sweep = IdSweep(scraper, bitmap_path=bitmap_path, block_size=256)
+            assert sweep.run(99000, 101000) == 0
+            assert len(server.requests) == before
+            sweep.close()
+        finally:
+            scraper.close()
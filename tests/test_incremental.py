@@ -0,0 +1,40 @@
+import pytest
+
+from columnar_store import load_table
+from fixture_server import FixtureServer, _synthetic_detail_template
+from mugshot_bot import InmateScraper
+from normalize import read_csv_typed
+from page_parser import SECTIONS
+
+
+def _child_rows(scraper, name):
+    if scraper.output_format == "parquet":
+        return load_table(scraper.output_dir, name, latest=True)
+    return read_csv_typed(scraper.output_dir, name)
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+def test_recrawled_inmate_is_read_back_once(tmp_path, output_format):
+    with FixtureServer(population=20) as server:
+        inmate_ids = [str(100000 + inmate[3]) for inmate in server._population[:3]]
+        scraper = InmateScraper(output_dir=str(tmp_path / "out"), engine="http", base_url=server.url,
+                                cache_dir=str(tmp_path / "cache"), cache_ttl=0, output_format=output_format,
+                                number_search=True)
+        try:
+            assert scraper.lookup_inmates(inmate_ids) == 3
+            # the recrawl finds one more sentence and no infractions
+            sizes = {key: 2 for key, *_ in SECTIONS}
+            sizes.update(sentences=3, infractions=0)
+            server._detail_template = _synthetic_detail_template(server.detail_html.decode("utf-8"), sizes)
+            assert scraper.lookup_inmates(inmate_ids[:1]) == 1
+
+            results = scraper.results_df
+            assert sorted(results["inmate_id"]) == sorted(inmate_ids)
+            assert len(list(scraper.iter_inmates())) == 3
+            sentences = _child_rows(scraper, "sentences")["inmate_id"].value_counts()
+            assert sentences.to_dict() == {inmate_ids[0]: 3, inmate_ids[1]: 2, inmate_ids[2]: 2}
+            infractions = _child_rows(scraper, "infractions")
+            assert inmate_ids[0] not in set(infractions["inmate_id"])
+            assert len(infractions) == 4
+        finally:
+            scraper.close()
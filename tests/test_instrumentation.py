@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+import pytest
+import requests
+from selenium.common.exceptions import TimeoutException
+
+from instrumentation import Metrics
+from mugshot_bot import InmateScraper
+from scheduler import RequestScheduler
+
+
+def test_concurrent_exports_write_whole_snapshots(tmp_path):
+    metrics = Metrics(jsonl_path=str(tmp_path / "metrics.jsonl"), prom_path=str(tmp_path / "metrics.prom"),
+                      interval=3600)
+
+    def work():
+        for _ in range(50):
+            metrics.observe("detail_fetch", 0.01)
+            metrics.export()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(tmp_path / "metrics.jsonl", encoding="utf-8") as f:
+        counts = [json.loads(line)["stages"]["detail_fetch"]["count"] for line in f]
+    assert len(counts) == 400
+    assert counts == sorted(counts)
+    with open(tmp_path / "metrics.prom", encoding="utf-8") as f:
+        assert 'inmate_scraper_stage_seconds_count{stage="detail_fetch"} 400' in f.read()
+    assert sorted(os.listdir(tmp_path)) == ["metrics.jsonl", "metrics.prom"]
+
+
+class _LoadingDriver:
+    """A browser whose page never finishes loading."""
+
+    def execute_script(self, script, *args):
+        return "loading"
+
+
+def test_scheduler_and_browser_waits_count_on_the_crawl_metrics(tmp_path):
+    metrics = Metrics(interval=3600)
+    scheduler = RequestScheduler(base_delay=0.01, default_timeout=0.2)
+    scraper = InmateScraper(output_dir=str(tmp_path), engine="offline", metrics=metrics, scheduler=scheduler)
+    try:
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise requests.ConnectionError("dropped")
+            return "ok"
+
+        assert scheduler.call("detail", flaky) == "ok"
+
+        scraper.driver = _LoadingDriver()
+        with pytest.raises(TimeoutException):
+            scraper._browser_request("search", lambda: None)
+        scraper.driver = None
+    finally:
+        scraper.close()
+
+    assert metrics.counters["retries"] == 1
+    assert metrics.counters["wait_timeouts"] == 1
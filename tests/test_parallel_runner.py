@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import time
+
+from parallel_runner import SharedRateLimiter, merge_shards
+from result_writer import ResultWriter, read_table
+
+RATE = 50.0
+
+
+def _acquire(limiter, tokens, times):
+    for _ in range(tokens):
+        limiter.acquire()
+        times.put(time.monotonic())
+
+
+def test_rate_limit_is_shared_across_processes():
+    context = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(RATE, context=context)
+    times = context.Queue()
+    workers = [context.Process(target=_acquire, args=(limiter, 10, times)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    stamps = sorted(times.get(timeout=30) for _ in range(40))
+    for worker in workers:
+        worker.join()
+    assert stamps[-1] - stamps[0] >= 39 / RATE * 0.95
+
+
+def _shard(shard_dir, inmate_ids, photo_filename="None", sentences=True):
+    os.makedirs(shard_dir)
+    with ResultWriter(shard_dir) as writer:
+        for inmate_id in inmate_ids:
+            if sentences:
+                writer.write_details(inmate_id, {"sentences": [{"commit_num": "A01"}]})
+            writer.write_inmate({"inmate_id": inmate_id, "photo_filename": photo_filename})
+
+
+def test_merge_starts_every_table_over_and_skips_missing_photos(tmp_path, capsys):
+    output_dir = str(tmp_path / "merged")
+    _shard(output_dir, ["100001", "100009"])
+    shards = [str(tmp_path / "shard_0"), str(tmp_path / "shard_1")]
+    _shard(shards[0], ["100001", "100002"], photo_filename=os.path.join("ab", "gone.jpg"))
+    _shard(shards[1], ["100002", "100003"])
+
+    assert merge_shards(shards, output_dir) == 3
+    assert "2 photos missing" in capsys.readouterr().out
+    assert sorted(read_table(output_dir, "inmates")["inmate_id"]) == ["100001", "100002", "100003"]
+    assert sorted(read_table(output_dir, "sentences")["inmate_id"]) == ["100001", "100002", "100003"]
+
+
+def test_merge_clears_a_table_no_shard_has_rows_for(tmp_path):
+    output_dir = str(tmp_path / "merged")
+    _shard(str(tmp_path / "first"), ["100001"])
+    merge_shards([str(tmp_path / "first")], output_dir)
+    _shard(str(tmp_path / "second"), ["100002"], sentences=False)
+
+    assert merge_shards([str(tmp_path / "second")], output_dir) == 1
+    assert list(read_table(output_dir, "inmates")["inmate_id"]) == ["100002"]
+    assert read_table(output_dir, "sentences").empty
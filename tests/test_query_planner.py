@@ -0,0 +1,107 @@
+from fixture_server import FixtureServer
+from mugshot_bot import InmateScraper
+from query_planner import QueryPlanner
+
+
+def test_result_pages_counts_the_pages_read(tmp_path):
+    with FixtureServer(population=400) as server:
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url)
+        planner = QueryPlanner(scraper)
+        try:
+            inmates = list(planner.harvest())
+        finally:
+            planner.close()
+            scraper.close()
+        pages = sum(1 for method, _, form in server.requests
+                    if method == "POST" and form.get("__EVENTTARGET") in ("btnName", "gvInmate"))
+
+    assert inmates
+    assert planner.stats["truncated"] and planner.stats["pruned"]
+    assert planner.stats["result_pages"] == pages
+
+
+def test_first_name_prefix_is_one_letter_like_the_site(tmp_path):
+    with FixtureServer(population=3000) as server:
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url)
+        planner = QueryPlanner(scraper)
+        try:
+            # the form keeps one first name letter, so a longer prefix finds what its first letter does
+            jo = [row["inmate_id"] for row, _ in scraper._harvest_search("S", "JO", "Male", "Active")]
+            j = [row["inmate_id"] for row, _ in scraper._harvest_search("S", "J", "Male", "Active")]
+            assert jo == j
+            searches_before = len(server.requests)
+            list(planner.harvest())
+        finally:
+            planner.close()
+            scraper.close()
+        searches = [(form.get("txtLName", ""), form.get("txtFName", ""))
+                    for _, _, form in server.requests[searches_before:]
+                    if form and form.get("__EVENTTARGET") == "btnName"]
+
+    # only a node left truncated is searched twice, the second time to walk its pages
+    assert len(searches) - len(set(searches)) == planner.stats["unresolved"]
+
+
+def test_failed_search_is_retried_by_the_next_crawl(tmp_path):
+    with FixtureServer(population=400) as server:
+        expected = {str(100000 + inmate[3]) for inmate in server._population
+                    if inmate[0].startswith("B") and inmate[4] == "Male" and inmate[5] == "Active"}
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url)
+        plan_path = str(tmp_path / "plan.sqlite")
+        harvest_search = scraper._harvest_search
+
+        def failing(last_name, *args, **kwargs):
+            if last_name == "B":
+                raise ConnectionError("connection reset")
+            return harvest_search(last_name, *args, **kwargs)
+
+        try:
+            scraper._harvest_search = failing
+            planner = QueryPlanner(scraper, plan_path=plan_path)
+            first = {row["inmate_id"] for row, _ in planner.harvest()}
+            assert planner.stats["failed"] == 1
+            planner.close()
+
+            scraper._harvest_search = harvest_search
+            planner = QueryPlanner(scraper, plan_path=plan_path)
+            second = {row["inmate_id"] for row, _ in planner.harvest()}
+            planner.close()
+        finally:
+            scraper.close()
+
+    assert expected and not expected & first
+    assert expected <= second
+
+
+def test_multi_word_surnames_are_reached(tmp_path):
+    with FixtureServer(population=1500, max_results=5) as server:
+        expected = {str(100000 + inmate[3]) for inmate in server._population
+                    if inmate[4] == "Male" and inmate[5] == "Active"}
+        spaced = {str(100000 + inmate[3]) for inmate in server._population if " " in inmate[0]} & expected
+        scraper = InmateScraper(output_dir=str(tmp_path), engine="http", base_url=server.url)
+        planner = QueryPlanner(scraper, truncation_limit=5)
+        try:
+            found = {row["inmate_id"] for row, _ in planner.harvest()}
+        finally:
+            planner.close()
+            scraper.close()
+
+    assert spaced
+    assert spaced <= found
+
+
+def test_node_is_complete_only_when_its_children_cover_every_row():
+    planner = QueryPlanner(scraper=None, refine_alphabet="ABC")
+    try:
+        children, complete = planner._children(("DE", ""), [
+            {"last_name": "De La Rosa", "first_name_middle_initial": "Maria"},
+            {"last_name": "Dean", "first_name_middle_initial": "Ann"},
+        ])
+        assert ("DE ", "") in children and complete
+
+        children, complete = planner._children(("SMITH", "J"), [
+            {"last_name": "Smith", "first_name_middle_initial": "John"},
+        ])
+        assert not complete
+    finally:
+        planner.close()
@@ -0,0 +1,34 @@
+from unittest import mock
+
+import response_cache
+from fixture_server import FixtureServer
+from http_engine import NUMBER_SEARCH_TARGET
+from mugshot_bot import InmateScraper
+
+TTL = 3600
+
+
+def _lookups(server):
+    return sum(1 for method, _, form in server.requests if method == "POST" and form.get("__EVENTTARGET") == NUMBER_SEARCH_TARGET)
+
+
+def test_cache_hit_does_not_extend_ttl(tmp_path):
+    clock = [1000000.0]
+    with FixtureServer(population=50) as server, mock.patch.object(response_cache.time, "time", lambda: clock[0]):
+        inmate_id = str(100000 + server._population[0][3])
+        scraper = InmateScraper(output_dir=str(tmp_path / "out"), engine="http", base_url=server.url,
+                                cache_dir=str(tmp_path / "cache"), cache_ttl=TTL, number_search=True)
+        try:
+            assert scraper.lookup_inmates([inmate_id]) == 1
+            assert _lookups(server) == 1
+
+            clock[0] += TTL * 0.75
+            scraper.lookup_inmates([inmate_id])
+            assert _lookups(server) == 1
+
+            # past the TTL of the original fetch, though not of the hit
+            clock[0] += TTL * 0.75
+            scraper.lookup_inmates([inmate_id])
+            assert _lookups(server) == 2
+        finally:
+            scraper.close()